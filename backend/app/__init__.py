@@ -4,7 +4,6 @@ Flask application factory
 from flask import Flask
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask_talisman import Talisman
 from flask_wtf.csrf import CSRFProtect
 import sys
 import os
@@ -16,14 +15,15 @@ from config import config
 def create_app(config_name=None):
     """Create and configure Flask application"""
 
-    # Determine frontend dist path
-    frontend_dist = os.path.abspath(os.path.join(
+    # Determine frontend dist path (FRONTEND_DIST overrides, e.g. for load tests)
+    frontend_dist = os.environ.get('FRONTEND_DIST') or os.path.abspath(os.path.join(
         os.path.dirname(__file__), '../../frontend/dist'
     ))
 
-    app = Flask(__name__,
-                static_folder=frontend_dist if os.path.exists(frontend_dist) else None,
-                static_url_path='')
+    # Static files are served from a startup manifest (app.static_assets),
+    # so Flask's own /<path:filename> static route is not registered
+    app = Flask(__name__, static_folder=None)
+    app.static_folder = frontend_dist if os.path.exists(frontend_dist) else None
 
     # Load configuration
     if config_name is None:
@@ -39,12 +39,30 @@ def create_app(config_name=None):
     from app.logging_config import setup_logging
     setup_logging(app)
 
+    # Opt-in request profiler (wraps the whole Flask request stack)
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    # Stream drain and flush on SIGTERM (see gunicorn.conf.py)
+    from app.lifecycle import init_lifecycle
+    init_lifecycle(app)
+
+    # /livez and /readyz, answered without entering Flask. Wrapped after the
+    # profiler, so it is the outermost WSGI layer and probes are never profiled
+    from app.health import init_health
+    init_health(app)
+
+    # Request body caps and in-flight body budget (before anything reads a body)
+    from app.ingress import init_ingress
+    init_ingress(app)
+
     # CSRF Protection
     csrf = CSRFProtect(app)
     app.logger.info("CSRF protection enabled")
 
     # Security headers (Talisman) - only in production
     if app.config.get('FORCE_HTTPS'):
+        from flask_talisman import Talisman
         Talisman(app,
                 force_https=True,
                 strict_transport_security=True,
@@ -84,20 +102,35 @@ def create_app(config_name=None):
             ]
         )
 
+    # Flask-Limiter's route decorators only hold a weak reference
+    app.limiter = limiter
+
     # CORS (if needed)
     if app.config.get('CORS_ORIGINS'):
         from flask_cors import CORS
         CORS(app,
              origins=app.config['CORS_ORIGINS'],
              supports_credentials=True,
-             allow_headers=['Content-Type', 'Authorization', 'X-CSRFToken'],
+             allow_headers=['Content-Type', 'Authorization', 'X-CSRFToken', 'Last-Event-ID'],
+             expose_headers=['X-Stream-ID'],
              methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
         app.logger.info(f"CORS enabled for: {app.config['CORS_ORIGINS']}")
 
+    # Response compression (registered before routes so it runs after
+    # their after_request hooks)
+    if app.config.get('COMPRESS_ENABLED'):
+        from app.compression import init_compression
+        init_compression(app)
+
     # Register routes
     from app import routes
     routes.init_app(app, limiter)
 
+    # Under gunicorn --preload, import provider SDKs once in the master
+    if app.config.get('PRELOAD_SDKS'):
+        from app.llm_service import preload_provider_sdks
+        preload_provider_sdks(app.config)
+
     # Health check logging
     app.logger.info(f"Application started in {config_name} mode")
     app.logger.info(f"Static folder: {app.static_folder}")
@@ -0,0 +1,215 @@
+"""
+Chat Request Pipeline
+Turns a raw /api/chat or /api/chat/stream body into the provider message
+list through named, individually timed stages shared by both endpoints
+"""
+import logging
+import secrets
+import time
+
+from flask import g
+from pydantic import ValidationError
+
+from app.models import ChatRequest
+from app.knowledge_base import retrieve_knowledge, should_include_knowledge
+from app.prompt_registry import STABLE_SUFFIX
+from app.coalescing import make_coalesce_stage
+from app.middleware import get_tenant_from_request
+
+logger = logging.getLogger(__name__)
+
+# dynamic: knowledge is appended to the system prompt on keyword match
+# stable: system prompt is persona + compact knowledge on every turn, and
+#         retrieved knowledge goes after the history so the prefix stays cacheable
+PROMPT_LAYOUTS = ('dynamic', 'stable')
+
+
+class ChatPipelineError(Exception):
+    """A stage rejected the request; carries the JSON error body and status"""
+
+    def __init__(self, status, error, details=None):
+        super().__init__(error)
+        self.status = status
+        self.body = {'error': error}
+        if details is not None:
+            self.body['details'] = details
+
+
+class ChatContext:
+    """State handed from stage to stage"""
+
+    __slots__ = ('raw_body', 'request', 'tenant_id', 'tenant', 'prompt', 'profile',
+                 'retrieved', 'messages', 'timings', 'extras')
+
+    def __init__(self, raw_body):
+        self.raw_body = raw_body
+        self.request = None
+        self.tenant_id = None
+        self.tenant = None
+        self.prompt = None
+        self.profile = None
+        self.retrieved = None  # per-turn content placed after the history
+        self.messages = None
+        self.timings = {}
+        self.extras = {}  # scratch space for plugged-in stages
+
+    @property
+    def provider(self):
+        return self.request.provider
+
+    @property
+    def model(self):
+        return self.request.model
+
+    @property
+    def conversation_id(self):
+        """Client-supplied id, else a new random one (returned for the client to send back)"""
+        if not self.request.conversation_id:
+            self.request.conversation_id = secrets.token_urlsafe(12)
+        return self.request.conversation_id
+
+    def server_timing(self):
+        """Stage timings as a Server-Timing header value"""
+        return ', '.join(f'{name};dur={ms:.2f}' for name, ms in self.timings.items())
+
+
+class ChatPipeline:
+    """
+    Ordered list of ``(name, stage)`` callables, each taking a ChatContext
+
+    Stages mutate the context and raise ChatPipelineError to reject the
+    request. New steps (history compaction, response cache lookup, ...)
+    plug in with ``add_stage`` and apply to both chat endpoints.
+    """
+
+    def __init__(self, stages=()):
+        self.stages = list(stages)
+
+    def add_stage(self, name, stage, before=None):
+        """Add a stage at the end, or before the stage called ``before``"""
+        if before is None:
+            self.stages.append((name, stage))
+            return
+        index = next(i for i, (existing, _) in enumerate(self.stages) if existing == before)
+        self.stages.insert(index, (name, stage))
+
+    def run(self, raw_body):
+        ctx = ChatContext(raw_body)
+        for name, stage in self.stages:
+            start = time.perf_counter()
+            try:
+                stage(ctx)
+            finally:
+                ctx.timings[name] = (time.perf_counter() - start) * 1000
+        logger.debug(f"Chat pipeline timings (ms): {ctx.server_timing()}")
+        return ctx
+
+
+def validate_stage(ctx):
+    """Parse and validate the raw body in one pass, then release the body"""
+    try:
+        ctx.request = ChatRequest.model_validate_json(ctx.raw_body)
+    except ValidationError as e:
+        raise ChatPipelineError(400, 'Invalid input', e.errors(include_input=False, include_context=False))
+    # The history strings are the only copy we need; with up to 2.5 MB of
+    # history, holding the bytes too doubles memory for the whole LLM call
+    ctx.raw_body = None
+
+
+def make_tenant_stage(tenant_contexts, reject_unknown=False):
+    def resolve_tenant_stage(ctx):
+        """Tenant chats use the tenant's receptionist persona (cached)"""
+        ctx.tenant_id = g.tenant_id = get_tenant_from_request()
+        if ctx.tenant_id:
+            ctx.tenant = tenant_contexts.get(ctx.tenant_id)
+            if ctx.tenant is None:
+                if reject_unknown:
+                    raise ChatPipelineError(404, 'Unknown tenant')
+                # No tenant file (yet): answer with the default sales persona
+                logger.warning(f"No tenant data for {ctx.tenant_id}; using the default persona")
+    return resolve_tenant_stage
+
+
+def make_retrieve_stage(prompts, profiles, layout='dynamic'):
+    if layout not in PROMPT_LAYOUTS:
+        raise ValueError(f"Unknown prompt layout: {layout}")
+
+    def retrieve_stage(ctx):
+        """Pick the system prompt bundle, generation profile and retrieved content"""
+        if ctx.tenant:
+            # Tenant prompts always carry their knowledge, so they're already stable
+            ctx.prompt = ctx.tenant.prompt
+            ctx.profile = ctx.tenant.profile
+            return
+
+        ctx.profile = profiles.resolve('sales')
+        if layout == 'stable':
+            ctx.prompt = prompts.get('sales' + STABLE_SUFFIX)
+            ctx.retrieved = retrieve_knowledge(ctx.request.message)
+        else:
+            # Include company knowledge if the message is about the company
+            ctx.prompt = prompts.get('sales', with_knowledge=should_include_knowledge(ctx.request.message))
+    return retrieve_stage
+
+
+def make_compact_stage(max_history_tokens, chars_per_token=4):
+    def compact_stage(ctx):
+        """Drop the oldest history turns once history exceeds the token budget"""
+        history = ctx.request.history
+        if not history:
+            return
+        budget = max_history_tokens * chars_per_token
+        total = sum(len(msg['content']) for msg in history)
+        drop = 0
+        while total > budget and drop < len(history):
+            total -= len(history[drop]['content'])
+            drop += 1
+        if drop:
+            ctx.request.history = history[drop:]
+            ctx.extras['compacted_messages'] = drop
+    return compact_stage
+
+
+def build_messages_stage(ctx):
+    """
+    Assemble [system] + history + [retrieved] + user into a single new list
+
+    The list shares the validated history dicts (and their strings) with
+    ``ctx.request``; nothing downstream copies message text.
+    """
+    history = ctx.request.history or []  # already plain dicts
+    messages = []
+
+    # Add Aveena's system message if the client didn't send one
+    if not any(msg['role'] == 'system' for msg in history):
+        messages.append({"role": "system", "content": ctx.prompt.text})
+        logger.debug(f"Using prompt {ctx.prompt.name} v{ctx.prompt.version}")
+
+    messages.extend(history)
+    if ctx.retrieved:
+        messages.append({"role": "system", "content": ctx.retrieved})
+    messages.append({"role": "user", "content": ctx.request.message})
+    ctx.messages = messages
+
+
+def build_chat_pipeline(prompts, profiles, tenant_contexts, max_history_tokens=None, layout='dynamic',
+                        coalesce_max_chars=None, reject_unknown_tenants=False):
+    """
+    Default pipeline: validate -> resolve_tenant -> retrieve -> [compact] -> build_messages -> [coalesce]
+
+    ``compact`` is only added when a history token budget is configured and
+    ``coalesce`` when coalescing is enabled; ``layout`` is one of PROMPT_LAYOUTS.
+    Tenants without data get the default persona unless ``reject_unknown_tenants``
+    (then 404).
+    """
+    pipeline = ChatPipeline([
+        ('validate', validate_stage),
+        ('resolve_tenant', make_tenant_stage(tenant_contexts, reject_unknown_tenants)),
+        ('retrieve', make_retrieve_stage(prompts, profiles, layout)),
+        ('build_messages', build_messages_stage),
+    ])
+    if max_history_tokens:
+        pipeline.add_stage('compact', make_compact_stage(max_history_tokens), before='build_messages')
+    if coalesce_max_chars:
+        pipeline.add_stage('coalesce', make_coalesce_stage(coalesce_max_chars))
+    return pipeline
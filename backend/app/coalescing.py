@@ -0,0 +1,309 @@
+"""
+Request Coalescing (single-flight)
+Identical concurrent chat requests share one provider call: the first
+request drives the call and later ones subscribe to the same in-progress
+event stream. With Redis, coalescing also spans workers.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+COALESCE_MODES = ('off', 'local', 'redis')
+
+TERMINAL_EVENTS = ('done', 'error', 'result')
+
+
+def coalesce_key(provider, model, profile, messages):
+    """Hash of everything that determines the provider's response"""
+    payload = json.dumps([provider, model, profile.to_dict() if profile else None, messages],
+                         sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_coalesce_stage(max_chars=200):
+    def coalesce_stage(ctx):
+        """Mark short first-turn messages as eligible for coalescing"""
+        if ctx.request.history or len(ctx.request.message) > max_chars:
+            return
+        ctx.extras['coalesce_key'] = coalesce_key(ctx.provider, ctx.model, ctx.profile, ctx.messages)
+    return coalesce_stage
+
+
+class SharedStream:
+    """
+    An iterator of events replayed to any number of readers
+
+    There's no producer thread: whichever reader needs the next event
+    pulls it from the source while the others wait on the lock, so the
+    source keeps going as long as anyone is still reading.
+    """
+
+    def __init__(self, source, on_finish=None):
+        self.source = source
+        self.on_finish = on_finish
+        self.events = []
+        self.done = False
+        self.subscribers = 0
+        self.lock = threading.Lock()
+
+    def read(self, start=0):
+        index = start
+        while True:
+            if index < len(self.events):
+                yield self.events[index]
+                index += 1
+                continue
+            if self.done:
+                return
+            with self.lock:
+                if index < len(self.events) or self.done:
+                    continue
+                try:
+                    event = next(self.source)
+                except StopIteration:
+                    self._finish()
+                    continue
+                except Exception as e:
+                    logger.error(f"Shared stream failed: {str(e)}")
+                    event = {'type': 'error', 'error': str(e)}
+                self.events.append(event)
+                if event.get('type') in TERMINAL_EVENTS:
+                    self._finish()
+
+    def _finish(self):
+        self.done = True
+        if self.on_finish is not None:
+            self.on_finish(self)
+
+    def close(self):
+        close = getattr(self.source, 'close', None)
+        if close is not None:
+            close()
+
+
+def _lazy(factory):
+    yield from factory()
+
+
+class Coalescer:
+    """
+    Single-flight for chat calls keyed by ``coalesce_key``
+
+    ``stream`` shares a streaming call's events; ``call`` shares a
+    non-streaming call's result. Subscribers that joined an existing call
+    get ``coalesced: True`` on its final event/result. A call is only
+    shared while in progress - it's forgotten as soon as it finishes.
+    """
+
+    def __init__(self, mode='local', redis_url=None, timeout=30):
+        if mode not in COALESCE_MODES:
+            raise ValueError(f"Unknown coalesce mode: {mode}")
+        self.mode = mode
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._redis = RedisFlights(redis_url, timeout) if mode == 'redis' else None
+        self.leaders = 0
+        self.followers = 0
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def stream(self, key, factory):
+        """
+        Events of the call for ``key``, started with ``factory()`` if none is in flight
+
+        Args:
+            key: coalesce_key of the request
+            factory: Returns an iterator of LLMService stream events
+        """
+        if not self.enabled:
+            yield from factory()
+            return
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                # Lazy: the provider call starts on the first read, outside this lock
+                source = self._redis.stream(key, factory) if self._redis else _lazy(factory)
+                flight = self._flights[key] = SharedStream(source, lambda f: self._forget(key, f))
+                self.leaders += 1
+            else:
+                self.followers += 1
+            flight.subscribers += 1
+
+        try:
+            for event in flight.read():
+                if event.get('type') in TERMINAL_EVENTS and not leader and not event.get('coalesced'):
+                    event = dict(event, coalesced=True)
+                yield event
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                abandoned = flight.subscribers == 0 and not flight.done
+                if abandoned:
+                    self._flights.pop(key, None)
+            if abandoned:
+                flight.close()
+
+    def call(self, key, fn):
+        """Result of ``fn()`` for ``key``, shared with identical concurrent calls"""
+        def source():
+            yield {'type': 'result', 'result': fn()}
+
+        for event in self.stream(key, source):
+            if event['type'] == 'result':
+                result = event['result']
+                return dict(result, coalesced=True) if event.get('coalesced') else result
+            if event['type'] == 'error':
+                return {'success': False, 'error': event['error']}
+        return {'success': False, 'error': 'Coalesced call ended without a result'}
+
+    def _forget(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self):
+        stats = {
+            'mode': self.mode,
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'followers': self.followers,
+        }
+        if self._redis:
+            stats['redis_leaders'] = self._redis.leaders
+            stats['redis_followers'] = self._redis.followers
+        return stats
+
+
+class RedisEventLog:
+    """
+    Append-only event lists in Redis that other workers can tail
+
+    Each event is RPUSHed to ``key`` and a wake-up is published on the same
+    name; readers subscribe first, then read the list from where they are,
+    so nothing written before they joined is lost.
+    """
+
+    def __init__(self, url, timeout=30):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.timeout = timeout
+        self.ttl = int(timeout * 2)
+
+    def append(self, key, event, ttl=None):
+        pipe = self.client.pipeline()
+        pipe.rpush(key, json.dumps(event))
+        pipe.expire(key, ttl or self.ttl)
+        pipe.publish(key, '1')
+        pipe.execute()
+
+    def exists(self, key):
+        return bool(self.client.exists(key))
+
+    def follow(self, key, start=0):
+        """Events from index ``start`` until a terminal event (or ``timeout`` without one)"""
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(key)
+        try:
+            seen = start
+            last_event = time.monotonic()
+            while True:
+                for raw in self.client.lrange(key, seen, -1):
+                    seen += 1
+                    last_event = time.monotonic()
+                    event = json.loads(raw)
+                    yield event
+                    if event.get('type') in TERMINAL_EVENTS:
+                        return
+                if time.monotonic() - last_event > self.timeout:
+                    yield {'type': 'error', 'error': 'Upstream stream timed out'}
+                    return
+                pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        finally:
+            pubsub.close()
+
+
+class RedisFlights:
+    """
+    Cross-worker single-flight over Redis
+
+    The leader takes ``coalesce:<key>`` (SET NX, value = flight id) and
+    writes every event to the RedisEventLog ``coalesce:<key>:<flight id>``,
+    which followers in other workers tail.
+    """
+
+    def __init__(self, url, timeout=30):
+        if not url:
+            raise ValueError("COALESCE_MODE=redis requires COALESCE_REDIS_URL or REDIS_URL")
+        self.log = RedisEventLog(url, timeout)
+        self.client = self.log.client
+        self.ttl = self.log.ttl
+        self.leaders = 0
+        self.followers = 0
+
+    def stream(self, key, factory):
+        leader_key = f'coalesce:{key}'
+        flight_id = uuid.uuid4().hex
+        try:
+            leader = self.client.set(leader_key, flight_id, nx=True, ex=self.ttl)
+            existing = None if leader else self.client.get(leader_key)
+        except Exception as e:
+            # Redis unavailable: coalesce within this worker only
+            logger.warning(f"Redis coalescing unavailable: {str(e)}")
+            yield from factory()
+            return
+
+        if leader:
+            self.leaders += 1
+            yield from self._lead(leader_key, f'{leader_key}:{flight_id}', factory)
+            return
+        if existing is None:
+            # The leader finished between SET and GET; just make the call
+            yield from factory()
+            return
+        self.followers += 1
+        for event in self.log.follow(f'{leader_key}:{existing.decode()}'):
+            if event.get('type') in TERMINAL_EVENTS:
+                event = dict(event, coalesced=True)
+            yield event
+
+    def _lead(self, leader_key, events_key, factory):
+        finished = False
+        mirroring = True
+        try:
+            for event in factory():
+                if mirroring:
+                    try:
+                        self.log.append(events_key, event)
+                    except Exception as e:
+                        # Keep answering this client; new requests make their own call
+                        logger.warning(f"Redis coalescing mirror failed: {str(e)}")
+                        mirroring = False
+                        self._release(leader_key)
+                finished = event.get('type') in TERMINAL_EVENTS
+                yield event
+        finally:
+            try:
+                if not finished:
+                    # Don't leave remote followers waiting for the timeout
+                    self.log.append(events_key, {'type': 'error', 'error': 'Coalesced request cancelled'})
+            except Exception as e:
+                logger.warning(f"Redis coalescing cleanup failed: {str(e)}")
+            if mirroring:
+                self._release(leader_key)
+
+    def _release(self, leader_key):
+        try:
+            self.client.delete(leader_key)
+        except Exception as e:
+            logger.warning(f"Redis coalescing cleanup failed: {str(e)}")
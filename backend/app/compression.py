@@ -0,0 +1,129 @@
+"""
+Response compression (brotli/gzip) with SSE support
+
+Buffered responses are compressed once above a minimum size. Server-Sent
+Event streams are compressed incrementally and the compressor is flushed
+after every frame, so tokens still reach the client as soon as they are
+produced.
+"""
+import logging
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/javascript',
+    'text/event-stream',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'image/svg+xml',
+})
+
+
+class StreamCompressor:
+    """Incremental compressor that can be flushed at frame boundaries"""
+
+    def __init__(self, encoding, level=6, br_quality=4):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=br_quality)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        """Compress ``data`` and flush, so the output is decodable on its own"""
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_body(data, encoding, level=6, br_quality=4):
+    """One-shot compression of a buffered response body"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=br_quality)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def negotiate_encoding(accept_encodings):
+    """Pick br (if available) or gzip from a parsed Accept-Encoding header"""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def _compress_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield compressor.compress(chunk)
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_compression(app):
+    """Register the compression after_request hook"""
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+    level = app.config.get('COMPRESS_LEVEL', 6)
+    br_quality = app.config.get('COMPRESS_BR_QUALITY', 4)
+    compress_streams = app.config.get('COMPRESS_SSE', True)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough  # files (precompressed variants handled by StaticAssets)
+            or request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        streamed = response.is_streamed
+        if streamed and not (compress_streams and response.mimetype == 'text/event-stream'):
+            return response
+
+        encoding = negotiate_encoding(request.accept_encodings)
+        response.vary.add('Accept-Encoding')
+        if encoding is None:
+            return response
+
+        if streamed:
+            compressor = StreamCompressor(encoding, level, br_quality)
+            response.response = _compress_stream(response.response, compressor)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(compress_body(data, encoding, level, br_quality))
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    app.logger.info(
+        f"Response compression enabled: min_size={min_size}, "
+        f"brotli={'yes' if brotli is not None else 'no'}, sse={compress_streams}"
+    )
@@ -0,0 +1,113 @@
+"""
+Generation Profiles
+Per-persona model and sampling settings (model, max_tokens, temperature,
+penalties) with optional per-tenant overrides
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLAUDE_MODEL = 'claude-3-5-sonnet-20241022'
+
+
+class GenerationProfile:
+    """Model and sampling parameters for one persona/mode"""
+
+    __slots__ = ('name', 'model', 'claude_model', 'max_tokens', 'temperature',
+                 'top_p', 'presence_penalty', 'frequency_penalty')
+
+    FIELDS = __slots__[1:]
+
+    def __init__(self, name, model, max_tokens, temperature, top_p=None,
+                 presence_penalty=None, frequency_penalty=None, claude_model=DEFAULT_CLAUDE_MODEL):
+        self.name = name
+        self.model = model
+        self.claude_model = claude_model
+        self.max_tokens = int(max_tokens)
+        self.temperature = float(temperature)
+        self.top_p = top_p
+        self.presence_penalty = presence_penalty
+        self.frequency_penalty = frequency_penalty
+
+    @classmethod
+    def from_params(cls, name, params):
+        """Build from a get_aveena_config()-style dict"""
+        return cls(name, **{key: params[key] for key in cls.FIELDS if key in params})
+
+    def with_overrides(self, overrides):
+        """Copy of this profile with ``overrides`` applied (unknown keys ignored)"""
+        params = {key: getattr(self, key) for key in self.FIELDS}
+        params.update({key: value for key, value in overrides.items() if key in self.FIELDS})
+        return GenerationProfile(self.name, **params)
+
+    def openai_params(self):
+        """Sampling kwargs for chat.completions.create"""
+        params = {'max_tokens': self.max_tokens, 'temperature': self.temperature}
+        for key in ('top_p', 'presence_penalty', 'frequency_penalty'):
+            value = getattr(self, key)
+            if value is not None:
+                params[key] = value
+        return params
+
+    def claude_params(self):
+        """Sampling kwargs for messages.create (Anthropic has no penalties)"""
+        return {'max_tokens': self.max_tokens, 'temperature': min(self.temperature, 1.0)}
+
+    def to_dict(self):
+        return {'name': self.name, **{key: getattr(self, key) for key in self.FIELDS}}
+
+
+class ProfileStore:
+    """
+    Resolves the generation profile for a mode, optionally per tenant
+
+    Base profiles come from the prompt registry bundles; tenant overrides
+    are merged once and cached.
+
+    Args:
+        registry: PromptRegistry providing base params per mode
+        tenant_overrides: {tenant_id: {mode: {field: value}}}
+    """
+
+    def __init__(self, registry, modes, tenant_overrides=None):
+        self._base = {
+            mode: GenerationProfile.from_params(mode, registry.get(mode).params)
+            for mode in modes
+        }
+        self._tenant_overrides = tenant_overrides or {}
+        self._resolved = {}
+
+    def resolve(self, mode, tenant_id=None):
+        """
+        Get the profile for ``mode`` (and ``tenant_id`` if it has overrides)
+
+        Raises:
+            KeyError: If ``mode`` has no base profile
+        """
+        key = (mode, tenant_id)
+        profile = self._resolved.get(key)
+        if profile is None:
+            profile = self._base[mode]
+            overrides = self._tenant_overrides.get(tenant_id, {}).get(mode) if tenant_id else None
+            if overrides:
+                profile = profile.with_overrides(overrides)
+            self._resolved[key] = profile
+        return profile
+
+    def set_tenant_overrides(self, tenant_id, mode, overrides):
+        """Replace a tenant's overrides for one mode"""
+        self._tenant_overrides.setdefault(tenant_id, {})[mode] = overrides
+        self._resolved.pop((mode, tenant_id), None)
+
+
+def parse_tenant_overrides(raw):
+    """Parse the TENANT_PROFILE_OVERRIDES JSON setting"""
+    if not raw:
+        return {}
+    try:
+        overrides = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"Invalid TENANT_PROFILE_OVERRIDES, ignoring: {e}")
+        return {}
+    return overrides if isinstance(overrides, dict) else {}
@@ -0,0 +1,181 @@
+"""
+Liveness and Readiness
+``/livez`` and ``/readyz`` are answered in front of Flask from pre-encoded
+responses. Readiness comes from probes (Redis, database, LLM providers) run
+by a background thread every HEALTH_PROBE_INTERVAL seconds, so a health
+check never waits on, or adds load to, an upstream service.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+LIVEZ_BODY = b'{"status":"ok"}'
+LIVEZ_HEADERS = [('Content-Type', 'application/json'), ('Content-Length', str(len(LIVEZ_BODY))),
+                 ('Cache-Control', 'no-store')]
+
+
+def tcp_probe(url, default_port, timeout):
+    """Probe that opens (and closes) a TCP connection to ``url``'s host"""
+    parts = urlsplit(url if '//' in url else f'//{url}')
+    host, port = parts.hostname, parts.port or default_port
+
+    def probe():
+        socket.create_connection((host, port), timeout=timeout).close()
+        return f'{host}:{port}'
+    return probe
+
+
+def redis_probe(urls, timeout):
+    """Probe that PINGs each Redis URL"""
+    def probe():
+        import redis
+        for url in urls:
+            client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+            try:
+                client.ping()
+            finally:
+                client.close()
+        return f'{len(urls)} server(s)'
+    return probe
+
+
+def build_probes(config, timeout):
+    """
+    Probes for the services this deployment is configured to use
+
+    Returns:
+        Dict of name -> probe; a probe returns a short detail string or raises
+    """
+    probes = {}
+    redis_urls = []
+    for key in ('RATELIMIT_STORAGE_URL', 'JOB_REDIS_URL', 'COALESCE_REDIS_URL', 'STREAM_REPLAY_REDIS_URL'):
+        url = config.get(key)
+        if url and url.startswith(('redis://', 'rediss://')) and url not in redis_urls:
+            redis_urls.append(url)
+    if redis_urls:
+        probes['redis'] = redis_probe(redis_urls, timeout)
+    if config.get('DATABASE_URL'):
+        probes['database'] = tcp_probe(config['DATABASE_URL'], 5432, timeout)
+    if config.get('OPENAI_API_KEY'):
+        probes['openai'] = tcp_probe(os.environ.get('OPENAI_BASE_URL') or 'https://api.openai.com', 443, timeout)
+    if config.get('ANTHROPIC_API_KEY'):
+        probes['anthropic'] = tcp_probe(os.environ.get('ANTHROPIC_BASE_URL') or 'https://api.anthropic.com', 443,
+                                        timeout)
+    return probes
+
+
+class HealthMonitor:
+    """
+    Runs readiness probes in the background and caches the encoded result
+
+    Probes can be replaced or added with ``register`` (e.g. fakes in load
+    tests). Only ``critical`` probes decide readiness; the others are
+    reported. The thread starts on the first readiness check in each
+    process (so after fork under gunicorn).
+    """
+
+    def __init__(self, probes=None, critical=(), interval=15.0, lifecycle=None):
+        self.probes = dict(probes or {})
+        self.lifecycle = lifecycle
+        self.critical = set(critical)
+        self.interval = interval
+        self.results = {}
+        self.checked_at = None
+        self._encoded = (503, json.dumps({'status': 'starting'}).encode('utf-8'))
+        self._lock = threading.Lock()
+        self._thread_pid = None
+
+    def register(self, name, probe, critical=False):
+        self.probes[name] = probe
+        if critical:
+            self.critical.add(name)
+
+    def ensure_started(self):
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            threading.Thread(target=self._run, name='health-monitor', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def refresh(self):
+        """
+        Run every probe once and cache the result
+
+        ``results`` keeps each probe's detail and latency; the public
+        /readyz body only says ok or fail per probe (details are logged).
+        """
+        results = {}
+        for name, probe in list(self.probes.items()):
+            start = time.perf_counter()
+            try:
+                results[name] = {'ok': True, 'detail': probe()}
+            except Exception as e:
+                results[name] = {'ok': False, 'detail': f'{type(e).__name__}: {e}'}
+                if self.results.get(name, {}).get('ok', True):
+                    logger.warning(f"Readiness probe {name} failed: {results[name]['detail']}")
+            results[name]['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            results[name]['critical'] = name in self.critical
+
+        ready = all(result['ok'] for name, result in results.items() if name in self.critical)
+        self.results, self.checked_at = results, time.time()
+        body = {'status': 'ready' if ready else 'not ready', 'checked_at': self.checked_at,
+                'probes': {name: 'ok' if result['ok'] else 'fail' for name, result in results.items()}}
+        self._encoded = (200 if ready else 503, json.dumps(body).encode('utf-8'))
+        return ready
+
+    def readiness(self):
+        """(status code, JSON body) from the last refresh; 503 if overdue or draining"""
+        if self.lifecycle is not None and self.lifecycle.draining:
+            return 503, b'{"status": "draining"}'
+        self.ensure_started()
+        status, body = self._encoded
+        if self.checked_at is not None and time.time() - self.checked_at > 3 * self.interval + 30:
+            return 503, json.dumps({'status': 'stale', 'checked_at': self.checked_at}).encode('utf-8')
+        return status, body
+
+
+class HealthMiddleware:
+    """Answers ``/livez`` and ``/readyz`` without entering Flask"""
+
+    def __init__(self, wsgi_app, monitor):
+        self.wsgi_app = wsgi_app
+        self.monitor = monitor
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO')
+        if path == '/livez':
+            start_response('200 OK', LIVEZ_HEADERS)
+            return [LIVEZ_BODY]
+        if path == '/readyz':
+            status, body = self.monitor.readiness()
+            start_response('200 OK' if status == 200 else '503 Service Unavailable',
+                           [('Content-Type', 'application/json'), ('Content-Length', str(len(body))),
+                            ('Cache-Control', 'no-store')])
+            return [body]
+        return self.wsgi_app(environ, start_response)
+
+
+def init_health(app):
+    """Serve /livez and /readyz in front of the app"""
+    timeout = app.config['HEALTH_PROBE_TIMEOUT']
+    critical = [name.strip() for name in app.config['READYZ_CRITICAL'].split(',') if name.strip()]
+    monitor = HealthMonitor(build_probes(app.config, timeout), critical, app.config['HEALTH_PROBE_INTERVAL'],
+                            lifecycle=getattr(app, 'lifecycle', None))
+    app.wsgi_app = HealthMiddleware(app.wsgi_app, monitor)
+    app.health = monitor
+    app.logger.info(f"Readiness probes: {', '.join(monitor.probes) or 'none'} "
+                    f"(critical: {', '.join(sorted(monitor.critical & set(monitor.probes))) or 'none'})")
+    return monitor
@@ -0,0 +1,233 @@
+"""
+Request Ingress Guard
+Per-route request body caps, enforced by werkzeug while the body is read
+(not after buffering it), and a per-worker budget for request body bytes
+read and still held, so a burst of multi-MB posts is shed with a 503
+instead of growing worker RSS
+"""
+import json
+import logging
+import threading
+
+from flask import abort, current_app, jsonify, request, Request
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+def body_limit(max_bytes):
+    """
+    Cap a view's request body at ``max_bytes`` (default: MAX_CONTENT_LENGTH)
+
+    ``max_bytes`` may be a config key, read per request (for blueprints
+    defined before the app). Marks the view function, so it can go anywhere
+    in a decorator stack that uses functools.wraps.
+    """
+    def decorator(fn):
+        fn.body_limit = max_bytes
+        return fn
+    return decorator
+
+
+class IngressRequest(Request):
+    """Request whose ``max_content_length`` is the matched view's ``body_limit``"""
+
+    @property
+    def max_content_length(self):
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        limit = getattr(view, 'body_limit', None)
+        if isinstance(limit, str):
+            limit = current_app.config.get(limit)
+        return limit if limit is not None else super().max_content_length
+
+
+class IngressBusy(HTTPException):
+    """The worker's body budget is spent; answered with 503 + Retry-After"""
+    code = 503
+
+
+class MeteredInput:
+    """
+    ``wsgi.input`` that charges bytes to the guard as they are read
+
+    The first ``free_bytes`` of a body (the default cap, so beacons and
+    webhooks) are always admitted; beyond that, a read that would exceed the
+    budget raises IngressBusy. A client that declares a large body but
+    trickles it holds only what it has actually sent.
+    """
+
+    def __init__(self, stream, guard, free_bytes):
+        self._stream = stream
+        self._guard = guard
+        self._free_bytes = free_bytes
+        self.charged = 0
+
+    def _charge(self, data):
+        if data:
+            force = self.charged + len(data) <= self._free_bytes
+            if not self._guard.reserve(len(data), force=force):
+                raise IngressBusy()
+            self.charged += len(data)
+        return data
+
+    def read(self, *args):
+        return self._charge(self._stream.read(*args))
+
+    def readline(self, *args):
+        return self._charge(self._stream.readline(*args))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+    def close(self):
+        close = getattr(self._stream, 'close', None)
+        if close is not None:
+            close()
+
+
+class IngressGuard:
+    """
+    Tracks request body bytes per worker
+
+    Bytes are charged against ``budget`` as the body is read (see
+    MeteredInput) and released when the request ends. Requests whose reads
+    would exceed the budget get a 503.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.in_flight = 0
+        self.peak = 0
+        self.rejected_busy = 0
+        self.rejected_too_large = 0
+        self.endpoints = {}  # endpoint -> {'requests', 'bytes', 'max_bytes'}
+        self._lock = threading.Lock()
+
+    def reserve(self, size, force=False):
+        with self._lock:
+            if not force and self.in_flight and self.in_flight + size > self.budget:
+                self.rejected_busy += 1
+                return False
+            self.in_flight += size
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self, size):
+        with self._lock:
+            self.in_flight -= size
+
+    def reject_too_large(self):
+        with self._lock:
+            self.rejected_too_large += 1
+
+    def record(self, endpoint, size):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {'requests': 0, 'bytes': 0, 'max_bytes': 0})
+            stats['requests'] += 1
+            stats['bytes'] += size
+            stats['max_bytes'] = max(stats['max_bytes'], size)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'budget_bytes': self.budget,
+                'in_flight_bytes': self.in_flight,
+                'peak_bytes': self.peak,
+                'rejected_busy': self.rejected_busy,
+                'rejected_too_large': self.rejected_too_large,
+                'endpoints': {name: dict(stats) for name, stats in self.endpoints.items()},
+            }
+
+
+def init_ingress(app):
+    """Install the per-route body caps and the in-flight body budget"""
+    app.request_class = IngressRequest
+    guard = IngressGuard(app.config['INGRESS_MEMORY_BUDGET'])
+    app.ingress = guard
+
+    free_bytes = app.config.get('MAX_CONTENT_LENGTH') or 0
+
+    @app.before_request
+    def meter_body():
+        length = request.content_length
+        chunked = request.headers.get('Transfer-Encoding', '').lower() == 'chunked'
+        if not length and not chunked:
+            return None
+        limit = request.max_content_length
+        if length is not None and limit is not None and length > limit:
+            return payload_too_large(None)
+
+        # Runs before anything reads the body, so request.stream wraps this
+        metered = MeteredInput(request.environ['wsgi.input'], guard, free_bytes)
+        request.environ['wsgi.input'] = metered
+        request.environ['ingress.metered'] = metered
+        guard.record(request.endpoint or request.path, length or 0)
+        return None
+
+    @app.teardown_request
+    def release_body(exc):
+        metered = request.environ.pop('ingress.metered', None)
+        if metered is not None and metered.charged:
+            guard.release(metered.charged)
+
+    @app.errorhandler(IngressBusy)
+    def ingress_busy(e):
+        logger.warning(f"Ingress budget exhausted; shedding {request.path} ({request.content_length} bytes)")
+        response = jsonify({'error': 'Server busy', 'message': 'Too many large requests in progress. Please retry.'})
+        response.headers['Retry-After'] = '1'
+        # The rest of the body is unread
+        response.headers['Connection'] = 'close'
+        return response, 503
+
+    @app.errorhandler(413)
+    def payload_too_large(e):
+        guard.reject_too_large()
+        logger.warning(f"Payload too large: {request.path} ({request.content_length} bytes)")
+        return jsonify({'error': 'Payload too large', 'max_bytes': request.max_content_length}), 413
+
+    app.logger.info(f"Ingress guard enabled: default cap {app.config.get('MAX_CONTENT_LENGTH')} bytes, "
+                    f"budget {guard.budget} bytes")
+    return guard
+
+
+def read_body():
+    """
+    The request body, capped by the route's ``body_limit``
+
+    Raises:
+        RequestEntityTooLarge: If the body is over the cap
+    """
+    limit = request.max_content_length
+    if request.content_length is not None or limit is None:
+        # Content-Length was checked against the cap before the view ran
+        return request.get_data(cache=False)
+    if not request.environ.get('wsgi.input_terminated'):
+        return b''
+
+    # Chunked: werkzeug stops quietly at the cap, so read one byte past it
+    # to tell a body that fits exactly from one that doesn't
+    stream = request.input_stream
+    body = bytearray()
+    while True:
+        chunk = stream.read(min(64 * 1024, limit + 1 - len(body)))
+        if not chunk:
+            return bytes(body)
+        body += chunk
+        if len(body) > limit:
+            abort(413)
+
+
+def read_json():
+    """
+    Parse the request body as JSON regardless of Content-Type
+
+    Beacons arrive as text/plain (navigator.sendBeacon). The body is capped
+    by the route's ``body_limit`` while it is read.
+
+    Returns:
+        (data, None) on success, (None, error_response) otherwise
+    """
+    try:
+        return json.loads(read_body()), None
+    except ValueError:
+        return None, (jsonify({'error': 'Invalid input', 'details': 'Body must be valid JSON'}), 400)
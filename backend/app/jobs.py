@@ -0,0 +1,428 @@
+"""
+Background Job Queue
+Runs non-critical post-call work (cost/usage updates, tool execution logs,
+summaries, CRM sync) off the request path so webhook handlers can respond
+right away, with retries, a dead-letter list and queue-depth metrics
+"""
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_MODES = ('local', 'redis')
+
+# A process's processing list is requeued by others once its alive key expires
+HEARTBEAT_INTERVAL = 10
+ALIVE_TTL = 30
+
+# Task name -> (handler, max_retries or None for the queue default)
+TASKS = {}
+
+
+def task(name, max_retries=None):
+    """
+    Register a job handler under ``name``
+
+    Handlers take the keyword arguments given to ``enqueue`` (which must be
+    JSON-serializable for the Redis backend) and raise to request a retry.
+    Retried handlers may run more than once, so keep them idempotent.
+    """
+    def decorator(fn):
+        TASKS[name] = (fn, max_retries)
+        return fn
+    return decorator
+
+
+class JobQueueFull(Exception):
+    """The queue is at capacity"""
+
+
+class LocalJobBackend:
+    """Bounded in-process queue; jobs are lost if the process dies"""
+
+    def __init__(self, max_size=1000, dead_letter_size=1000):
+        self._queue = queue.Queue(maxsize=max_size)
+        self._delayed = []  # heap of (run_at, seq, job)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.dead_letters = deque(maxlen=dead_letter_size)
+        self.max_size = max_size
+
+    def put(self, job):
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise JobQueueFull()
+
+    def get(self, timeout):
+        self._release_due()
+        with self._lock:
+            if self._delayed:
+                # Wake up in time for the next retry
+                timeout = max(min(timeout, self._delayed[0][0] - time.time()), 0.01)
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def ack(self, job):
+        pass
+
+    def retry_later(self, job, delay):
+        with self._lock:
+            heapq.heappush(self._delayed, (time.time() + delay, next(self._seq), job))
+
+    def dead(self, job):
+        self.dead_letters.append(job)
+
+    def release_all(self):
+        """Make every waiting retry due now (on shutdown)"""
+        with self._lock:
+            self._delayed = [(0, seq, job) for _, seq, job in self._delayed]
+            heapq.heapify(self._delayed)
+
+    def take_pending(self):
+        """Remove and return every queued and waiting job"""
+        jobs = []
+        while True:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            jobs.extend(job for _, _, job in sorted(self._delayed))
+            self._delayed = []
+        return jobs
+
+    def _release_due(self):
+        now = time.time()
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, job = heapq.heappop(self._delayed)
+                try:
+                    self._queue.put_nowait(job)
+                except queue.Full:
+                    heapq.heappush(self._delayed, (now + 1, next(self._seq), job))
+                    break
+
+    def depth(self):
+        return {'queued': self._queue.qsize(), 'delayed': len(self._delayed), 'dead': len(self.dead_letters)}
+
+
+class RedisJobBackend:
+    """
+    Durable queue in Redis
+
+    Jobs move atomically from ``jobs:queue`` to this process's processing
+    list while running. Retries wait in the ``jobs:delayed`` sorted set, and
+    failed jobs go to ``jobs:dead``. A heartbeat thread keeps the process's
+    ``:alive`` key fresh however long a handler runs; processing lists whose
+    owner stopped heartbeating (crashed worker) are requeued.
+    """
+
+    QUEUE = 'jobs:queue'
+    DELAYED = 'jobs:delayed'
+    DEAD = 'jobs:dead'
+
+    def __init__(self, url, max_size=1000, dead_letter_size=1000):
+        if not url:
+            raise ValueError("JOB_QUEUE_MODE=redis requires JOB_REDIS_URL or REDIS_URL")
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_size = max_size
+        self.dead_letter_size = dead_letter_size
+        self._owner = None
+        self._owner_lock = threading.Lock()
+
+    @property
+    def processing(self):
+        # Per process, so a forked worker never acks its parent's jobs
+        return f'jobs:processing:{socket.gethostname()}:{os.getpid()}'
+
+    def put(self, job):
+        if self.client.llen(self.QUEUE) >= self.max_size:
+            raise JobQueueFull()
+        self.client.lpush(self.QUEUE, json.dumps(job, default=str))
+
+    def get(self, timeout):
+        self._heartbeat()
+        self._release_due()
+        raw = self.client.brpoplpush(self.QUEUE, self.processing, timeout=max(int(timeout), 1))
+        if raw is None:
+            return None
+        job = json.loads(raw)
+        job['_raw'] = raw
+        return job
+
+    def ack(self, job):
+        # Jobs run inline (queue full) were never in the processing list
+        if '_raw' in job:
+            self.client.lrem(self.processing, 1, job['_raw'])
+
+    def retry_later(self, job, delay):
+        raw = job.pop('_raw', None)
+        pipe = self.client.pipeline()
+        pipe.zadd(self.DELAYED, {json.dumps(job, default=str): time.time() + delay})
+        if raw is not None:
+            pipe.lrem(self.processing, 1, raw)
+        pipe.execute()
+
+    def dead(self, job):
+        raw = job.pop('_raw', None)
+        pipe = self.client.pipeline()
+        pipe.lpush(self.DEAD, json.dumps(job, default=str))
+        pipe.ltrim(self.DEAD, 0, self.dead_letter_size - 1)
+        if raw is not None:
+            pipe.lrem(self.processing, 1, raw)
+        pipe.execute()
+
+    @property
+    def dead_letters(self):
+        return [json.loads(raw) for raw in self.client.lrange(self.DEAD, 0, 99)]
+
+    def _release_due(self):
+        for raw in self.client.zrangebyscore(self.DELAYED, '-inf', time.time(), start=0, num=100):
+            # Only the worker whose ZREM succeeds requeues the job
+            if self.client.zrem(self.DELAYED, raw):
+                self.client.lpush(self.QUEUE, raw)
+
+    def _heartbeat(self):
+        """Start this process's heartbeat thread (once per process, so again after fork)"""
+        if self._owner == self.processing:
+            return
+        with self._owner_lock:
+            if self._owner == self.processing:
+                return
+            processing = self._owner = self.processing
+            self.client.set(f'{processing}:alive', 1, ex=ALIVE_TTL)
+            self._requeue_orphans()
+            threading.Thread(target=self._beat, args=(processing,), name='job-heartbeat', daemon=True).start()
+
+    def _beat(self, processing):
+        # Independent of get(): a handler running longer than ALIVE_TTL must
+        # not look like a crashed worker, or its job would run twice
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                self.client.set(f'{processing}:alive', 1, ex=ALIVE_TTL)
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {str(e)}")
+
+    def _requeue_orphans(self):
+        for key in self.client.scan_iter('jobs:processing:*'):
+            key = key.decode()
+            if key.endswith(':alive') or self.client.exists(f'{key}:alive'):
+                continue
+            moved = 0
+            while self.client.rpoplpush(key, self.QUEUE) is not None:
+                moved += 1
+            if moved:
+                logger.warning(f"Requeued {moved} jobs from stalled worker {key}")
+
+    def depth(self):
+        pipe = self.client.pipeline()
+        pipe.llen(self.QUEUE)
+        pipe.zcard(self.DELAYED)
+        pipe.llen(self.DEAD)
+        queued, delayed, dead = pipe.execute()
+        return {'queued': queued, 'delayed': delayed, 'dead': dead}
+
+
+class JobQueue:
+    """
+    Worker threads draining a job backend
+
+    Failed jobs are retried with exponential backoff (``retry_backoff * 2**n``
+    seconds) up to ``max_retries`` times, then moved to the dead-letter list.
+    Workers start on the first ``enqueue`` (and again after fork), so each
+    gunicorn worker runs its own. After ``stop`` jobs run inline.
+    """
+
+    def __init__(self, backend, workers=2, max_retries=3, retry_backoff=2.0):
+        self.backend = backend
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._threads = []
+        self._threads_pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.running = 0
+        self.counts = {'enqueued': 0, 'succeeded': 0, 'retried': 0, 'dead': 0, 'inline': 0}
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        if config['JOB_QUEUE_MODE'] not in JOB_QUEUE_MODES:
+            raise ValueError(f"Unknown job queue mode: {config['JOB_QUEUE_MODE']}")
+        if config['JOB_QUEUE_MODE'] == 'redis':
+            backend = RedisJobBackend(config.get('JOB_REDIS_URL'), config['JOB_QUEUE_SIZE'],
+                                      config['JOB_DEAD_LETTER_SIZE'])
+        else:
+            backend = LocalJobBackend(config['JOB_QUEUE_SIZE'], config['JOB_DEAD_LETTER_SIZE'])
+        return cls(backend, workers=config['JOB_WORKERS'], max_retries=config['JOB_MAX_RETRIES'],
+                   retry_backoff=config['JOB_RETRY_BACKOFF'])
+
+    def enqueue(self, name, inline_if_full=True, **kwargs):
+        """
+        Queue ``TASKS[name](**kwargs)`` for a worker
+
+        In Redis mode kwargs are JSON-encoded (non-JSON values such as UUIDs
+        become strings).
+
+        Args:
+            name: Registered task name
+            inline_if_full: Run the job's first attempt in the caller when
+                            the queue is full instead of raising JobQueueFull
+
+        Returns:
+            Job id
+        """
+        if name not in TASKS:
+            raise KeyError(f"Unknown task: {name}")
+        job = {'id': uuid.uuid4().hex, 'name': name, 'kwargs': kwargs, 'attempts': 0,
+               'enqueued_at': time.time()}
+        if self._stop.is_set():
+            # No workers will pick it up; a failure is dead-lettered
+            logger.warning(f"Job queue stopped; running {name} inline")
+            self._count('inline')
+            self._run(job)
+            return job['id']
+        self._ensure_workers()
+        try:
+            self.backend.put(job)
+        except JobQueueFull:
+            if not inline_if_full:
+                raise
+            # Backpressure: run it now; a failure is still retried/dead-lettered
+            logger.warning(f"Job queue full; running {name} inline")
+            self._count('inline')
+            self._run(job)
+            return job['id']
+        self._count('enqueued')
+        return job['id']
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _ensure_workers(self):
+        if self._threads and self._threads_pid == os.getpid():
+            return
+        with self._lock:
+            if self._threads and self._threads_pid == os.getpid():
+                return
+            self._threads_pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self.backend.get(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Job queue unavailable: {str(e)}")
+                self._stop.wait(5)
+                continue
+            if job is not None:
+                self._run(job)
+
+    def _run(self, job):
+        handler, max_retries = TASKS.get(job['name'], (None, None))
+        max_retries = self.max_retries if max_retries is None else max_retries
+        started = time.time()
+        with self._lock:
+            if job['attempts'] == 0:
+                self._wait_total += started - job['enqueued_at']
+            self.running += 1
+        job['attempts'] += 1
+        try:
+            if handler is None:
+                raise KeyError(f"Unknown task: {job['name']}")
+            handler(**job['kwargs'])
+        except Exception as e:
+            job['error'] = str(e)
+            if job['attempts'] > max_retries or self._stop.is_set():
+                logger.error(f"Job {job['name']} {job['id']} failed after {job['attempts']} attempts: {str(e)}")
+                self.backend.dead(job)
+                self._count('dead')
+            else:
+                delay = self.retry_backoff * 2 ** (job['attempts'] - 1)
+                logger.warning(f"Job {job['name']} {job['id']} failed (attempt {job['attempts']}), "
+                               f"retrying in {delay:.0f}s: {str(e)}")
+                self.backend.retry_later(job, delay)
+                self._count('retried')
+        else:
+            self.backend.ack(job)
+            self._count('succeeded')
+        finally:
+            with self._lock:
+                self.running -= 1
+                self._run_total += time.time() - started
+
+    def stats(self):
+        with self._lock:
+            counts, running = dict(self.counts), self.running
+            wait_total, run_total = self._wait_total, self._run_total
+        started = counts['enqueued'] + counts['inline']
+        finished = counts['succeeded'] + counts['retried'] + counts['dead']
+        return {
+            'mode': 'redis' if isinstance(self.backend, RedisJobBackend) else 'local',
+            'workers': self.workers,
+            'capacity': self.backend.max_size,
+            'running': running,
+            **self.backend.depth(),
+            **counts,
+            'avg_wait_ms': round(wait_total / started * 1000, 1) if started else None,
+            'avg_run_ms': round(run_total / finished * 1000, 1) if finished else None,
+        }
+
+    def dead_letters(self):
+        return [{key: value for key, value in job.items() if key != '_raw'} for job in self.backend.dead_letters]
+
+    def stop(self, timeout=5.0):
+        """
+        Stop the workers, finishing local jobs for up to ``timeout`` seconds
+
+        In local mode, queued jobs and waiting retries (without their
+        backoff) run until the deadline; whatever is left is dead-lettered
+        and logged, since it dies with the process. Redis mode leaves them in
+        Redis for other workers.
+        """
+        deadline = time.time() + timeout
+        local = isinstance(self.backend, LocalJobBackend) and self._threads_pid == os.getpid()
+        if local:
+            while time.time() < deadline:
+                self.backend.release_all()
+                depth = self.backend.depth()
+                with self._lock:
+                    running = self.running
+                if not (depth['queued'] or depth['delayed'] or running):
+                    break
+                time.sleep(0.05)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(max(deadline - time.time(), 0))
+        if isinstance(self.backend, LocalJobBackend):
+            for job in self.backend.take_pending():
+                logger.error(f"Job {job['name']} {job['id']} not run before shutdown "
+                             f"(attempts: {job['attempts']}); dead-lettered")
+                job['error'] = 'Not run before shutdown'
+                self.backend.dead(job)
+                self._count('dead')
@@ -120,6 +120,44 @@ Website: inboundai365.com
 We exist to pull business owners out of survival mode. We handle the work nobody wants to do so businesses can focus on what they do best.
 """
 
+# Always-on summary for the stable prompt layout: small enough to keep in the
+# cached prefix of every turn; the full COMPANY_KNOWLEDGE is still retrieved
+# per turn when the message asks about the company
+COMPACT_COMPANY_KNOWLEDGE = """
+# INBOUNDAI365 - QUICK FACTS
+- Aveena: 24/7 AI voice receptionist (English/Spanish), books appointments, sounds human
+- CRM: logs every call and customer interaction, appointment management, live dashboard
+- OHMNIC: business intelligence that watches operations and recommends improvements
+- Serves home services (HVAC, plumbing, roofing, cleaning, ...) and medical practices (dental, chiropractic, veterinary, ...)
+- Pricing: $599/month incl. 300 call minutes, $0.28/minute beyond, $499 one-time setup, OHMNIC free for 6 months then $199/month
+- Same-day setup, month-to-month, cancel anytime, keep your phone number
+- Website: inboundai365.com - 15-minute demo calls available
+"""
+
+# Sections of COMPANY_KNOWLEDGE retrieved per turn in the stable layout
+KNOWLEDGE_SECTION_KEYWORDS = {
+    'Company Overview': ('inboundai365', 'inbound ai', 'company', 'who are you', 'tell me about', 'what is'),
+    'Our Products': ('aveena', 'ohmnic', 'crm', 'product', 'service', 'features', 'capabilities',
+                     'what do you do', 'how does', 'can you'),
+    'Who We Serve': ('business', 'industry', 'dental', 'medical', 'hvac', 'plumb', 'clinic'),
+    'Pricing': ('price', 'cost', 'pricing', 'pay', 'fee', 'subscription', 'minute'),
+    'Key Benefits': ('why', 'better', 'compare', 'receptionist'),
+    'Setup Process': ('setup', 'install', 'start', 'begin'),
+    'Common Questions': ('cancel', 'contract', 'language', 'spanish', 'phone number', 'emergenc'),
+    'Contact': ('contact', 'website', 'demo'),
+}
+
+
+def _split_sections(knowledge):
+    sections = {}
+    for block in knowledge.split('\n## ')[1:]:
+        title, _, body = block.partition('\n')
+        sections[title.strip()] = f"## {title.strip()}\n{body.strip()}"
+    return sections
+
+
+KNOWLEDGE_SECTIONS = _split_sections(COMPANY_KNOWLEDGE)
+
 
 def get_company_knowledge():
     """Get company knowledge base for context"""
@@ -150,3 +188,25 @@ def should_include_knowledge(message):
     
     message_lower = message.lower()
     return any(keyword in message_lower for keyword in company_keywords)
+
+
+def retrieve_knowledge(message):
+    """
+    Only the COMPANY_KNOWLEDGE sections relevant to a message
+
+    Args:
+        message: User's message
+
+    Returns:
+        str with the matching sections (all knowledge if the message is
+        about the company but no section matches), or None
+    """
+    if not should_include_knowledge(message):
+        return None
+    message_lower = message.lower()
+    matched = [
+        KNOWLEDGE_SECTIONS[title]
+        for title, keywords in KNOWLEDGE_SECTION_KEYWORDS.items()
+        if any(keyword in message_lower for keyword in keywords)
+    ]
+    return '\n\n'.join(matched) if matched else COMPANY_KNOWLEDGE
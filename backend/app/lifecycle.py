@@ -0,0 +1,166 @@
+"""
+Worker Lifecycle
+Graceful drain for long-lived SSE streams. On SIGTERM the worker stops
+taking new streams (503 + Retry-After, /readyz reports draining), lets the
+streams in flight finish until STREAM_DRAIN_TIMEOUT, ends any still running
+(with a ``reconnect`` event when another worker can resume them via
+Last-Event-ID, else an error event), waits for upstreams still being drained
+into the shared replay log, then flushes write-behind work (job queue,
+telemetry, logs) before exiting.
+"""
+import logging
+import signal
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StreamLifecycle:
+    """
+    Counts active streams and background drains, and runs the shutdown sequence
+
+    Shutdown callbacks run in reverse order of registration, like atexit.
+    """
+
+    def __init__(self, drain_timeout=60.0, flush_timeout=10.0):
+        self.drain_timeout = drain_timeout
+        self.flush_timeout = flush_timeout
+        self.deadline = None  # time.monotonic() by which streams must end
+        self.active = 0
+        self.background = 0  # upstreams drained after their client left
+        self.peak = 0
+        self.started = 0
+        self.completed = 0
+        self.cut = 0
+        self.rejected = 0
+        self._callbacks = []
+        self._shut_down = False
+        self._cond = threading.Condition()
+
+    @property
+    def draining(self):
+        return self.deadline is not None
+
+    def past_deadline(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def stream_started(self):
+        with self._cond:
+            self.active += 1
+            self.started += 1
+            self.peak = max(self.peak, self.active)
+
+    def stream_finished(self, cut=False):
+        with self._cond:
+            self.active -= 1
+            if cut:
+                self.cut += 1
+            else:
+                self.completed += 1
+            self._cond.notify_all()
+
+    def background_started(self):
+        with self._cond:
+            self.background += 1
+
+    def background_finished(self):
+        with self._cond:
+            self.background -= 1
+            self._cond.notify_all()
+
+    def reject(self):
+        """Count a stream turned away while draining"""
+        with self._cond:
+            self.rejected += 1
+
+    def on_shutdown(self, name, callback):
+        """Run ``callback()`` after streams have drained"""
+        self._callbacks.append((name, callback))
+
+    def begin_drain(self):
+        """Stop taking new streams; running ones have ``drain_timeout`` seconds"""
+        with self._cond:
+            if self.deadline is None:
+                self.deadline = time.monotonic() + self.drain_timeout
+                logger.info(f"Draining: {self.active} active stream(s), deadline {self.drain_timeout:.0f}s")
+
+    def wait(self, timeout=None):
+        """Block until no streams are active; False if ``timeout`` passed first"""
+        return self._wait_for('active', timeout)
+
+    def wait_background(self, timeout=None):
+        """Block until no background drains are running; False if ``timeout`` passed first"""
+        return self._wait_for('background', timeout)
+
+    def _wait_for(self, counter, timeout):
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while getattr(self, counter):
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self):
+        """Drain streams, then run the shutdown callbacks (once)"""
+        if self._shut_down:
+            return
+        self._shut_down = True
+        self.begin_drain()
+        # Streams end themselves at the deadline; allow a little for the last chunk
+        if not self.wait(max(self.deadline - time.monotonic(), 0) + 2):
+            logger.warning(f"Shutting down with {self.active} stream(s) still open")
+        # Cut streams whose upstream is still being written to the shared
+        # replay log, for the client resuming on another worker
+        if not self.wait_background(self.flush_timeout):
+            logger.warning(f"Shutting down with {self.background} stream drain(s) still running")
+        logger.info(f"Streams drained: {self.completed} completed, {self.cut} cut at the deadline, "
+                    f"{self.rejected} rejected")
+
+        for name, callback in reversed(self._callbacks):
+            start = time.perf_counter()
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Shutdown step {name} failed: {str(e)}")
+                continue
+            logger.info(f"Shutdown step {name} done in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def install_signal_handler(self, signum=signal.SIGTERM):
+        """
+        Start draining on ``signum``, then call the previous handler
+
+        Must be called from the main thread (e.g. gunicorn's post_worker_init).
+        """
+        previous = signal.getsignal(signum)
+
+        def handler(sig, frame):
+            self.begin_drain()
+            if callable(previous):
+                previous(sig, frame)
+        signal.signal(signum, handler)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'active_streams': self.active,
+                'background_drains': self.background,
+                'peak_streams': self.peak,
+                'started': self.started,
+                'completed': self.completed,
+                'cut_at_deadline': self.cut,
+                'rejected_while_draining': self.rejected,
+                'draining': self.draining,
+                'drain_remaining_s': round(max(self.deadline - time.monotonic(), 0), 1) if self.draining else None,
+            }
+
+
+def init_lifecycle(app):
+    """Create ``app.lifecycle``; the log queue is flushed last on shutdown"""
+    from app.logging_config import stop_queue_logging
+    lifecycle = StreamLifecycle(app.config['STREAM_DRAIN_TIMEOUT'], app.config['SHUTDOWN_FLUSH_TIMEOUT'])
+    lifecycle.on_shutdown('logs', stop_queue_logging)
+    app.lifecycle = lifecycle
+    return lifecycle
@@ -1,40 +1,134 @@
 """
 LLM Service with streaming support
 Handles communication with OpenAI and Anthropic APIs
+
+Provider SDKs are imported and their clients built on first use, and only
+when the provider's API key is configured, so unused SDKs never slow down
+worker start.
 """
-import os
 import logging
-from openai import OpenAI
-from anthropic import Anthropic
+import threading
 
 logger = logging.getLogger(__name__)
 
+
+def preload_provider_sdks(config):
+    """
+    Import the SDKs of configured providers without creating clients
+
+    Meant for ``gunicorn --preload``: the master pays the import once and
+    workers share the loaded modules copy-on-write, while clients (and
+    their connection pools) are still created per worker after fork.
+    """
+    if config.get('OPENAI_API_KEY'):
+        import openai  # noqa: F401
+    if config.get('ANTHROPIC_API_KEY'):
+        import anthropic  # noqa: F401
+    logger.info("Provider SDKs preloaded")
+
+
+def _openai_usage(usage):
+    """Usage dict from an OpenAI usage object, including prefix-cached prompt tokens"""
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        'prompt_tokens': usage.prompt_tokens,
+        'completion_tokens': usage.completion_tokens,
+        'total_tokens': usage.total_tokens,
+        'cached_tokens': (getattr(details, 'cached_tokens', None) or 0) if details else 0
+    }
+
+
+def _claude_usage(usage):
+    """Usage dict from an Anthropic usage object, including prompt cache reads/writes"""
+    return {
+        'input_tokens': usage.input_tokens,
+        'output_tokens': usage.output_tokens,
+        'cache_read_input_tokens': getattr(usage, 'cache_read_input_tokens', None) or 0,
+        'cache_creation_input_tokens': getattr(usage, 'cache_creation_input_tokens', None) or 0
+    }
+
+
+def _cache_block(text):
+    """Anthropic text block marked as a prompt cache breakpoint"""
+    return {'type': 'text', 'text': text, 'cache_control': {'type': 'ephemeral'}}
+
+
+def _to_anthropic_messages(messages):
+    """
+    Split OpenAI-style messages into Anthropic's (system, messages)
+
+    The first system message becomes the system prompt; later ones (e.g.
+    retrieved knowledge placed after the history) are prepended to the
+    next user turn, since Anthropic has no mid-conversation system role.
+    """
+    system_msg = None
+    converted = []
+    pending = []
+    for message in messages:
+        if message['role'] == 'system':
+            if system_msg is None:
+                system_msg = message['content']
+            else:
+                pending.append(message['content'])
+        elif pending and message['role'] == 'user':
+            converted.append({'role': 'user', 'content': '\n\n'.join(pending + [message['content']])})
+            pending = []
+        else:
+            converted.append(message)
+    return system_msg, converted
+
+
 class LLMService:
     """Service for interacting with LLM providers"""
 
     def __init__(self, config):
         self.config = config
-        self.openai_client = None
-        self.anthropic_client = None
+        self._openai_client = None
+        self._anthropic_client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def openai_available(self):
+        """Whether OpenAI is configured (does not load the SDK)"""
+        return bool(self.config.get('OPENAI_API_KEY'))
+
+    @property
+    def anthropic_available(self):
+        """Whether Anthropic is configured (does not load the SDK)"""
+        return bool(self.config.get('ANTHROPIC_API_KEY'))
 
-        # Initialize OpenAI if key is available
-        if config.get('OPENAI_API_KEY'):
-            self.openai_client = OpenAI(api_key=config['OPENAI_API_KEY'])
-            logger.info("OpenAI client initialized")
+    @property
+    def openai_client(self):
+        """OpenAI client, created on first use; None if no key is configured"""
+        if self._openai_client is None and self.openai_available:
+            with self._client_lock:
+                if self._openai_client is None:
+                    from openai import OpenAI
+                    self._openai_client = OpenAI(api_key=self.config['OPENAI_API_KEY'])
+                    logger.info("OpenAI client initialized")
+        return self._openai_client
 
-        # Initialize Anthropic if key is available
-        if config.get('ANTHROPIC_API_KEY'):
-            self.anthropic_client = Anthropic(api_key=config['ANTHROPIC_API_KEY'])
-            logger.info("Anthropic client initialized")
+    @property
+    def anthropic_client(self):
+        """Anthropic client, created on first use; None if no key is configured"""
+        if self._anthropic_client is None and self.anthropic_available:
+            with self._client_lock:
+                if self._anthropic_client is None:
+                    from anthropic import Anthropic
+                    self._anthropic_client = Anthropic(api_key=self.config['ANTHROPIC_API_KEY'])
+                    logger.info("Anthropic client initialized")
+        return self._anthropic_client
 
-    def chat_openai(self, messages, model=None, stream=False):
+    def chat_openai(self, messages, model=None, stream=False, profile=None):
         """
         Send chat to OpenAI
 
         Args:
             messages: List of message dicts with 'role' and 'content'
-            model: Model name (default from config)
+            model: Model name (default from profile, then config)
             stream: Enable streaming responses
+            profile: GenerationProfile with model/sampling settings
+                     (default: MAX_TOKENS/TEMPERATURE from config)
 
         Returns:
             Generator if stream=True, dict if stream=False
@@ -42,12 +136,19 @@ class LLMService:
         if not self.openai_client:
             raise ValueError("OpenAI API key not configured")
 
-        model = model or self.config.get('DEFAULT_MODEL', 'gpt-4')
-        max_tokens = self.config.get('MAX_TOKENS', 1000)
-        temperature = self.config.get('TEMPERATURE', 0.7)
+        if profile is not None:
+            model = model or profile.model
+            params = profile.openai_params()
+        else:
+            model = model or self.config.get('DEFAULT_MODEL', 'gpt-4')
+            params = {
+                'max_tokens': self.config.get('MAX_TOKENS', 1000),
+                'temperature': self.config.get('TEMPERATURE', 0.7)
+            }
 
         try:
-            logger.info(f"OpenAI request: model={model}, stream={stream}")
+            logger.info(f"OpenAI request: model={model}, stream={stream}, "
+                        f"profile={profile.name if profile else None}, max_tokens={params['max_tokens']}")
 
             # Enable stream_options to get usage data during streaming
             stream_options = {"include_usage": True} if stream else None
@@ -55,10 +156,9 @@ class LLMService:
             response = self.openai_client.chat.completions.create(
                 model=model,
                 messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
                 stream=stream,
-                stream_options=stream_options
+                stream_options=stream_options,
+                **params
             )
 
             if stream:
@@ -68,11 +168,7 @@ class LLMService:
                     'success': True,
                     'message': response.choices[0].message.content,
                     'model': model,
-                    'usage': {
-                        'prompt_tokens': response.usage.prompt_tokens,
-                        'completion_tokens': response.usage.completion_tokens,
-                        'total_tokens': response.usage.total_tokens
-                    }
+                    'usage': _openai_usage(response.usage)
                 }
         except Exception as e:
             error_msg = str(e)
@@ -100,11 +196,7 @@ class LLMService:
 
                 # Capture usage data if available (comes in final chunk when stream_options is enabled)
                 if hasattr(chunk, 'usage') and chunk.usage is not None:
-                    usage_data = {
-                        'prompt_tokens': chunk.usage.prompt_tokens,
-                        'completion_tokens': chunk.usage.completion_tokens,
-                        'total_tokens': chunk.usage.total_tokens
-                    }
+                    usage_data = _openai_usage(chunk.usage)
                     logger.info(f"OpenAI usage captured: {usage_data}")
 
             # Send final done message with usage
@@ -114,14 +206,16 @@ class LLMService:
             logger.error(f"OpenAI streaming error: {str(e)}")
             yield {'type': 'error', 'error': str(e)}
 
-    def chat_claude(self, messages, model=None, stream=False):
+    def chat_claude(self, messages, model=None, stream=False, profile=None):
         """
         Send chat to Claude
 
         Args:
             messages: List of message dicts with 'role' and 'content'
-            model: Model name (default: claude-3-sonnet)
+            model: Model name (default from profile, then claude-3-5-sonnet)
             stream: Enable streaming responses
+            profile: GenerationProfile with model/sampling settings
+                     (default: MAX_TOKENS from config)
 
         Returns:
             Generator if stream=True, dict if stream=False
@@ -129,22 +223,37 @@ class LLMService:
         if not self.anthropic_client:
             raise ValueError("Anthropic API key not configured")
 
-        model = model or 'claude-3-5-sonnet-20241022'
-        max_tokens = self.config.get('MAX_TOKENS', 1000)
+        if profile is not None:
+            model = model or profile.claude_model
+            params = profile.claude_params()
+        else:
+            model = model or 'claude-3-5-sonnet-20241022'
+            params = {'max_tokens': self.config.get('MAX_TOKENS', 1000)}
 
         try:
-            logger.info(f"Claude request: model={model}, stream={stream}")
+            logger.info(f"Claude request: model={model}, stream={stream}, "
+                        f"profile={profile.name if profile else None}, max_tokens={params['max_tokens']}")
 
             # Convert OpenAI format to Anthropic format
-            system_msg = next((m['content'] for m in messages if m['role'] == 'system'), None)
-            user_messages = [m for m in messages if m['role'] != 'system']
+            system_msg, user_messages = _to_anthropic_messages(messages)
+            system = system_msg if system_msg else "You are a helpful assistant."
+            if self.config.get('PROMPT_LAYOUT') == 'stable':
+                # Cache breakpoints after the system prompt and after the history,
+                # so follow-up turns read everything but the new turn from cache
+                system = [_cache_block(system)]
+                if len(user_messages) > 1:
+                    previous = user_messages[-2]
+                    user_messages = user_messages[:-2] + [
+                        {'role': previous['role'], 'content': [_cache_block(previous['content'])]},
+                        user_messages[-1]
+                    ]
 
             response = self.anthropic_client.messages.create(
                 model=model,
-                max_tokens=max_tokens,
-                system=system_msg if system_msg else "You are a helpful assistant.",
+                system=system,
                 messages=user_messages,
-                stream=stream
+                stream=stream,
+                **params
             )
 
             if stream:
@@ -154,10 +263,7 @@ class LLMService:
                     'success': True,
                     'message': response.content[0].text,
                     'model': model,
-                    'usage': {
-                        'input_tokens': response.usage.input_tokens,
-                        'output_tokens': response.usage.output_tokens
-                    }
+                    'usage': _claude_usage(response.usage)
                 }
         except Exception as e:
             error_msg = str(e)
@@ -185,10 +291,7 @@ class LLMService:
                 elif event.type == 'message_start':
                     # Capture usage data from message start
                     if hasattr(event, 'message') and hasattr(event.message, 'usage'):
-                        usage_data = {
-                            'input_tokens': event.message.usage.input_tokens,
-                            'output_tokens': event.message.usage.output_tokens
-                        }
+                        usage_data = _claude_usage(event.message.usage)
                         logger.info(f"Claude usage (start): {usage_data}")
                 elif event.type == 'message_delta':
                     # Update usage with final counts
@@ -1,15 +1,237 @@
 """
 Logging configuration with structured JSON logging
+
+Records are handed to a bounded in-memory queue on the request path and
+formatted/written by a background QueueListener thread, so disk latency
+never stalls a request.
 """
+import atexit
 import logging
+import logging.handlers
 import os
-from pythonjsonlogger import jsonlogger
+import queue
+import random
+import threading
+import traceback
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+    import json
+
+# Attributes present on every LogRecord; anything else came in via ``extra=``
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_queue_handler = None
+_queue_logger = None
+_sampler = None
+_pid_file = None  # (LOG_FILE with '{pid}', config, its handler): reopened per process after fork
+
+
+def _dumps(payload):
+    """Serialize a log payload to a JSON string (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str).decode('utf-8')
+    return json.dumps(payload, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """Structured JSON formatter (timestamp, name, level, message + extras)"""
+
+    def format(self, record):
+        payload = {
+            'timestamp': self.formatTime(record),
+            'name': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+
+        # Preserve fields passed via extra={...}
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc_info'] = record.exc_text
+
+        return _dumps(payload)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Only resolve the message here; JSON formatting happens on the
+        # listener thread. Tracebacks are rendered now because the frames
+        # they reference are not safe to read after the request unwinds.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip('\n')
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class _BlockingStopListener(logging.handlers.QueueListener):
+    """QueueListener whose stop sentinel waits for room in a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LevelSampler(logging.Filter):
+    """
+    Per-level sampling filter for high-volume log lines
+
+    Args:
+        rates: Mapping of level number -> keep ratio (0.0-1.0). Levels not
+               listed are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {level: rate for level, rate in rates.items() if rate < 1.0}
+        self.sampled_out = 0
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+def _build_file_handler(log_file, config):
+    """Create a size- or time-rotating file handler from config"""
+    backup_count = int(config.get('LOG_BACKUP_COUNT', 5))
+    rotate_when = config.get('LOG_ROTATE_WHEN')
+
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count, delay=True
+        )
+
+    max_bytes = int(config.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, delay=True
+    )
+
+
+def start_queue_logging(logger, handlers, queue_size=10000, sample_rates=None):
+    """
+    Route a logger through a bounded queue to the given handlers
+
+    Returns:
+        The QueueHandler attached to ``logger``
+    """
+    global _listener, _queue_handler, _queue_logger, _sampler
+
+    stop_queue_logging()
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _sampler = None
+    if sample_rates:
+        _sampler = LevelSampler(sample_rates)
+        _queue_handler.addFilter(_sampler)
+
+    logger.addHandler(_queue_handler)
+    _queue_logger = logger
+
+    _listener = _BlockingStopListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    return _queue_handler
+
+
+def stop_queue_logging():
+    """Flush queued records and stop the background listener"""
+    global _listener, _queue_handler, _queue_logger
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+    if _queue_handler is not None:
+        _queue_logger.removeHandler(_queue_handler)
+        _queue_handler = None
+        _queue_logger = None
+
+
+def get_logging_stats():
+    """Queue depth and drop/sample counters for monitoring"""
+    if _queue_handler is None:
+        return {'enabled': False}
+    return {
+        'enabled': True,
+        'queue_depth': _queue_handler.queue.qsize(),
+        'queue_capacity': _queue_handler.queue.maxsize,
+        'dropped': _queue_handler.dropped,
+        'sampled_out': _sampler.sampled_out if _sampler else 0,
+    }
+
+
+def _restart_listener_after_fork():
+    """
+    Threads don't survive fork (gunicorn --preload); give the child its own
+    listener, and its own file when LOG_FILE has a '{pid}' placeholder (the
+    inherited handler was opened with the master's pid)
+    """
+    global _listener, _pid_file
+
+    if _listener is None:
+        return
+
+    handlers = list(_listener.handlers)
+    if _pid_file is not None and _pid_file[2] in handlers:
+        template, config, inherited = _pid_file
+        file_handler = _build_file_handler(template.replace('{pid}', str(os.getpid())), config)
+        file_handler.setFormatter(inherited.formatter)
+        file_handler.setLevel(inherited.level)
+        inherited.close()
+        handlers[handlers.index(inherited)] = file_handler
+        _pid_file = (template, config, file_handler)
+
+    log_queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+    _queue_handler.queue = log_queue
+    _queue_handler._lock = threading.Lock()
+    _listener = _BlockingStopListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(stop_queue_logging)
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
 
 def setup_logging(app):
     """Configure application logging"""
+    global _pid_file
 
     log_level = app.config.get('LOG_LEVEL', 'INFO')
-    log_file = app.config.get('LOG_FILE', 'logs/app.log')
+    # Allow a per-process file (e.g. logs/app.{pid}.log) so gunicorn
+    # workers don't contend on, or rotate underneath, the same file; forked
+    # workers reopen it under their own pid
+    log_file_template = app.config.get('LOG_FILE', 'logs/app.log')
+    log_file = log_file_template.replace('{pid}', str(os.getpid()))
 
     # Create logs directory if it doesn't exist
     log_dir = os.path.dirname(log_file)
@@ -21,18 +243,14 @@ def setup_logging(app):
     logger.setLevel(getattr(logging, log_level))
 
     # Remove existing handlers
+    stop_queue_logging()
     logger.handlers = []
 
-    # JSON formatter for structured logging
-    formatter = jsonlogger.JsonFormatter(
-        '%(asctime)s %(name)s %(levelname)s %(message)s',
-        rename_fields={'levelname': 'level', 'asctime': 'timestamp'}
-    )
-
-    # File handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    # File handler with structured JSON output
+    file_handler = _build_file_handler(log_file, app.config)
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    _pid_file = (log_file_template, app.config, file_handler) if '{pid}' in log_file_template else None
 
     # Console handler (for development)
     if app.debug:
@@ -40,8 +258,16 @@ def setup_logging(app):
         console_handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         ))
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    sample_rate = float(app.config.get('LOG_INFO_SAMPLE_RATE', 1.0))
+    start_queue_logging(
+        logger,
+        handlers,
+        queue_size=int(app.config.get('LOG_QUEUE_SIZE', 10000)),
+        sample_rates={logging.INFO: sample_rate}
+    )
 
-    app.logger.info(f"Logging configured: level={log_level}, file={log_file}")
+    app.logger.info(f"Logging configured: level={log_level}, file={log_file}, info_sample_rate={sample_rate}")
 
     return logger
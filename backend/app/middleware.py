@@ -3,7 +3,8 @@ Tenant Context Middleware
 Ensures all requests are properly scoped to a tenant
 """
 from functools import wraps
-from flask import request, g, abort, jsonify
+from flask import current_app, request, g, abort, jsonify
+import hmac
 import jwt
 import os
 import logging
@@ -16,16 +17,7 @@ def get_tenant_from_request():
     # 1. Check JWT token (primary method)
     auth_header = request.headers.get('Authorization')
     if auth_header and auth_header.startswith('Bearer '):
-        try:
-            token = auth_header.split(' ')[1]
-            payload = jwt.decode(
-                token, 
-                os.getenv('JWT_SECRET'), 
-                algorithms=['HS256']
-            )
-            return payload.get('tenant_id')
-        except jwt.InvalidTokenError as e:
-            logger.error(f"Invalid JWT: {e}")
+        return get_verified_tenant()
     
     # 2. Check custom header (for testing)
     if request.headers.get('X-Tenant-ID'):
@@ -33,13 +25,39 @@ def get_tenant_from_request():
     
     # 3. Check subdomain (for white-label)
     host = request.headers.get('Host', '')
-    if '.inboundai365.com' in host:
-        subdomain = host.split('.')[0]
-        # Look up tenant by subdomain (implement this)
-        # return get_tenant_by_subdomain(subdomain)
+    tenant_contexts = getattr(current_app, 'tenant_contexts', None)
+    if '.inboundai365.com' in host and tenant_contexts is not None:
+        context = tenant_contexts.get_by_subdomain(host.split('.')[0])
+        if context is not None:
+            return context.tenant_id
     
     return None
 
+def get_verified_tenant():
+    """
+    tenant_id from a verified ``Authorization: Bearer <jwt>`` header
+
+    Returns None if no bearer token was sent; aborts with 401 if one was
+    sent but can't be verified (bad signature, expired, or JWT_SECRET unset).
+    """
+    auth_header = request.headers.get('Authorization') or ''
+    if not auth_header.startswith('Bearer '):
+        return None
+    secret = os.getenv('JWT_SECRET')
+    if not secret:
+        logger.error("Bearer token received but JWT_SECRET is not configured")
+        abort(401, description='Token authentication is not available')
+    try:
+        payload = jwt.decode(auth_header[len('Bearer '):].strip(), secret, algorithms=['HS256'])
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Invalid JWT: {e}")
+        abort(401, description='Invalid or expired token')
+    tenant_id = payload.get('tenant_id')
+    if not isinstance(tenant_id, str) or not tenant_id:
+        abort(401, description='Token has no tenant')
+    return tenant_id
+
+
 def require_tenant(f):
     """Decorator to ensure tenant context is set"""
     @wraps(f)
@@ -61,6 +79,51 @@ def require_tenant(f):
     
     return decorated
 
+def admin_token_matches(token):
+    """Whether the request's X-Admin-Token equals ``token``"""
+    # Compare bytes: compare_digest raises TypeError on non-ASCII str
+    supplied = request.headers.get('X-Admin-Token', '').encode('utf-8')
+    return hmac.compare_digest(supplied, token.encode('utf-8'))
+
+def require_admin_token(f):
+    """Decorator for operator endpoints: X-Admin-Token must match ADMIN_TOKEN"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = current_app.config.get('ADMIN_TOKEN')
+        if not token:
+            abort(404)
+        if not admin_token_matches(token):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+
+    return decorated
+
+def require_verified_tenant(f):
+    """
+    Decorator for tenant data endpoints: the tenant must come from a verified
+    JWT, or from X-Tenant-ID on a request carrying X-Service-Token (matching
+    TOOL_SERVICE_TOKEN). A bare X-Tenant-ID is rejected.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        tenant_id = get_verified_tenant()
+        if tenant_id is None:
+            token = current_app.config.get('TOOL_SERVICE_TOKEN')
+            supplied = request.headers.get('X-Service-Token')
+            if token and supplied and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+                tenant_id = request.headers.get('X-Tenant-ID')
+        if not tenant_id:
+            logger.warning(f"Unauthenticated tenant request: {request.path}")
+            return jsonify({
+                'error': 'Authentication required',
+                'message': 'Send a bearer token or a service token with X-Tenant-ID'
+            }), 401
+
+        g.tenant_id = tenant_id
+        return f(*args, **kwargs)
+
+    return decorated
+
 def optional_tenant(f):
     """Decorator for endpoints that optionally use tenant context"""
     @wraps(f)
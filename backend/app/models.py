@@ -2,26 +2,40 @@
 Pydantic models for request validation
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Optional, List, Literal
+from typing_extensions import Annotated, TypedDict
 
+MESSAGE_MAX_CHARS = 5000
+HISTORY_MAX_MESSAGES = 50
+HISTORY_CONTENT_MAX_CHARS = 50000
 
-class Message(BaseModel):
-    """Single message in conversation history"""
-    role: str = Field(..., pattern="^(system|user|assistant)$")
-    content: str = Field(..., min_length=1, max_length=50000)
+
+class Message(TypedDict):
+    """
+    Single message in conversation history
+
+    A TypedDict rather than a model, so validated history is already the
+    list of plain dicts the provider SDKs expect.
+    """
+    role: Literal['system', 'user', 'assistant']
+    content: Annotated[str, Field(min_length=1, max_length=HISTORY_CONTENT_MAX_CHARS)]
 
 
 class ChatRequest(BaseModel):
-    """Validate chat API requests"""
+    """
+    Validate chat API requests
+
+    Use ``ChatRequest.model_validate_json(raw_body)`` to parse and validate
+    in a single pass.
+    """
     message: str = Field(
         ...,
         min_length=1,
-        max_length=5000,  # Reduced from 10000 for safety
+        max_length=MESSAGE_MAX_CHARS,  # Reduced from 10000 for safety
         description="User message (max 5000 characters)"
     )
-    provider: Optional[str] = Field(
+    provider: Optional[Literal['openai', 'claude']] = Field(
         default="openai",
-        pattern="^(openai|claude)$",
         description="LLM provider to use"
     )
     model: Optional[str] = Field(
@@ -31,8 +45,14 @@ class ChatRequest(BaseModel):
     )
     history: Optional[List[Message]] = Field(
         default_factory=list,
+        max_length=HISTORY_MAX_MESSAGES,
         description="Conversation history (max 50 messages)"
     )
+    conversation_id: Optional[str] = Field(
+        default=None,
+        pattern=r'^[A-Za-z0-9_-]{1,64}$',
+        description="Conversation id from a previous response (default: a new one)"
+    )
 
     @field_validator('message')
     @classmethod
@@ -42,10 +62,61 @@ class ChatRequest(BaseModel):
             raise ValueError('Message cannot be empty or whitespace only')
         return v.strip()
 
-    @field_validator('history')
+
+# Largest body a valid ChatRequest can arrive in: every character of the
+# message and a full history at 6 bytes (a \uXXXX-escaped BMP character, or
+# any unescaped UTF-8 one), plus keys and punctuation
+CHAT_REQUEST_MAX_BYTES = 6 * (MESSAGE_MAX_CHARS + HISTORY_MAX_MESSAGES * HISTORY_CONTENT_MAX_CHARS) + 64 * 1024
+
+
+WEB_VITAL_METRICS = ('lcp', 'inp', 'cls', 'fid', 'fcp', 'ttfb')
+
+
+class WebVitalEvent(BaseModel):
+    """Single Web Vitals measurement sent by the frontend RUM collector"""
+    metric: str = Field(..., max_length=16)
+    value: float = Field(..., ge=0, le=600000)  # ms for timings, unitless for CLS
+    url: Optional[str] = Field(default=None, max_length=2048)
+    release: Optional[str] = Field(default=None, max_length=64)
+    timestamp: Optional[int] = None
+
+    @field_validator('metric')
     @classmethod
-    def validate_history(cls, v: List[Message]) -> List[Message]:
-        """Validate conversation history"""
-        if len(v) > 50:
-            raise ValueError('Conversation history too long (max 50 messages)')
+    def known_metric(cls, v: str) -> str:
+        """Only accept metrics we aggregate"""
+        v = v.lower()
+        if v not in WEB_VITAL_METRICS:
+            raise ValueError(f'Unknown metric: {v}')
         return v
+
+
+class ClientError(BaseModel):
+    """Frontend error details (see src/js/error-boundary.js)"""
+    type: Optional[str] = Field(default=None, max_length=32)
+    message: Optional[str] = Field(default=None, max_length=2000)
+    source: Optional[str] = Field(default=None, max_length=2048)
+    url: Optional[str] = Field(default=None, max_length=2048)
+    stack: Optional[str] = Field(default=None, max_length=10000)
+
+    @field_validator('message', mode='before')
+    @classmethod
+    def coerce_message(cls, v):
+        """Promise rejections may carry a non-string reason"""
+        return v if v is None or isinstance(v, str) else str(v)[:2000]
+
+
+class ClientErrorReport(BaseModel):
+    """Validate /api/errors/critical beacons"""
+    error: ClientError
+    context: Optional[dict] = Field(default_factory=dict)
+
+
+class ToolCall(BaseModel):
+    """One CRM tool invocation (see app/tool_service.py)"""
+    tool_name: str = Field(..., pattern=r'^[A-Za-z0-9_]{1,64}$')
+    parameters: dict = Field(default_factory=dict)
+
+
+class ToolBatchRequest(BaseModel):
+    """Validate /api/crm/tools/batch requests"""
+    calls: List[ToolCall] = Field(..., min_length=1)
@@ -0,0 +1,139 @@
+"""
+Prefix Cache Tracking
+Records how much of each chat's prompt the provider served from its prefix
+cache, per conversation, along with time-to-first-token for first and
+follow-up turns
+"""
+import threading
+from collections import OrderedDict
+
+
+def prompt_cache_usage(usage):
+    """
+    Normalize provider usage to (prompt_tokens, cached_tokens)
+
+    OpenAI reports cached tokens as part of ``prompt_tokens``; Anthropic
+    reports cache reads/writes separately from ``input_tokens``.
+    """
+    if not usage:
+        return 0, 0
+    if 'prompt_tokens' in usage:
+        return usage['prompt_tokens'] or 0, usage.get('cached_tokens') or 0
+    cached = usage.get('cache_read_input_tokens') or 0
+    prompt = (usage.get('input_tokens') or 0) + cached + (usage.get('cache_creation_input_tokens') or 0)
+    return prompt, cached
+
+
+class ConversationCacheStats:
+    """Prefix cache counters for one conversation"""
+
+    __slots__ = ('turns', 'prompt_tokens', 'cached_tokens', 'prefix_version', 'prefix_changes',
+                 'first_ttft', 'follow_up_ttft', 'follow_up_ttft_count')
+
+    def __init__(self):
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.prefix_version = None
+        self.prefix_changes = 0
+        self.first_ttft = None
+        self.follow_up_ttft = 0.0
+        self.follow_up_ttft_count = 0
+
+    @property
+    def hit_ratio(self):
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def to_dict(self):
+        return {
+            'turns': self.turns,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'hit_ratio': round(self.hit_ratio, 4),
+            'prefix_version': self.prefix_version,
+            'prefix_changes': self.prefix_changes,
+            'first_ttft_ms': round(self.first_ttft * 1000, 1) if self.first_ttft is not None else None,
+            'follow_up_ttft_ms': (round(self.follow_up_ttft / self.follow_up_ttft_count * 1000, 1)
+                                  if self.follow_up_ttft_count else None),
+        }
+
+
+class PrefixCacheTracker:
+    """
+    Bounded LRU of per-conversation prefix cache stats
+
+    ``prefix_changes`` counts turns whose system prompt version differed
+    from the previous turn's - each one invalidates the provider's cache.
+    """
+
+    def __init__(self, max_conversations=10000):
+        self.max_conversations = max_conversations
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.prefix_changes = 0
+
+    def record(self, conversation_id, prefix_version, usage, ttft=None):
+        """
+        Record one completed turn
+
+        Args:
+            conversation_id: Conversation the turn belongs to
+            prefix_version: Version of the system prompt sent
+            usage: Provider usage dict from LLMService
+            ttft: Seconds to the first streamed token (streaming only)
+
+        Returns:
+            The conversation's ConversationCacheStats
+        """
+        prompt_tokens, cached_tokens = prompt_cache_usage(usage)
+        with self._lock:
+            stats = self._conversations.get(conversation_id)
+            if stats is None:
+                stats = self._conversations[conversation_id] = ConversationCacheStats()
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(conversation_id)
+
+            if stats.prefix_version is not None and stats.prefix_version != prefix_version:
+                stats.prefix_changes += 1
+                self.prefix_changes += 1
+            stats.prefix_version = prefix_version
+            stats.turns += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.cached_tokens += cached_tokens
+            if ttft is not None:
+                if stats.turns == 1:
+                    stats.first_ttft = ttft
+                else:
+                    stats.follow_up_ttft += ttft
+                    stats.follow_up_ttft_count += 1
+
+            self.turns += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+        return stats
+
+    def conversation(self, conversation_id):
+        stats = self._conversations.get(conversation_id)
+        return stats.to_dict() if stats is not None else None
+
+    def stats(self):
+        with self._lock:
+            conversations = list(self._conversations.values())
+        first = [s.first_ttft for s in conversations if s.first_ttft is not None]
+        follow_up_total = sum(s.follow_up_ttft for s in conversations)
+        follow_up_count = sum(s.follow_up_ttft_count for s in conversations)
+        return {
+            'conversations': len(conversations),
+            'turns': self.turns,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'hit_ratio': round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            'prefix_changes': self.prefix_changes,
+            'first_ttft_ms': round(sum(first) / len(first) * 1000, 1) if first else None,
+            'follow_up_ttft_ms': round(follow_up_total / follow_up_count * 1000, 1) if follow_up_count else None,
+        }
@@ -0,0 +1,211 @@
+"""
+Request Profiling
+Opt-in sampling profiler for single requests. A request is profiled when it
+carries the admin token in an ``X-Profile`` header or is picked by a random
+1-in-N sample; its thread's stack is sampled every few
+ms until the response (including a streamed SSE body) is closed, and saved
+as collapsed stacks (flamegraph.pl, speedscope) with a cap on kept files.
+When neither trigger is configured, nothing is installed. Samples are taken
+per OS thread, so the profiler only runs under the sync and gthread workers.
+"""
+import hmac
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from werkzeug.wsgi import ClosingIterator
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def _frame_label(code):
+    filename = code.co_filename
+    # Trim to the package-relative path (app/routes.py, flask/app.py)
+    for marker in ('site-packages' + os.sep, os.sep + 'backend' + os.sep, os.sep + 'lib' + os.sep):
+        if marker in filename:
+            filename = filename.rsplit(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame):
+    """Root-first ``;``-joined stack for one frame"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """
+    One background thread sampling the stacks of the threads being profiled
+
+    Runs only while at least one thread is registered.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._targets = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        stacks = Counter()
+        with self._lock:
+            self._targets[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        return stacks
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                for thread_id, stacks in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+
+class ProfileStore:
+    """Writes collapsed-stack files to ``directory``, keeping the newest ``max_files``"""
+
+    def __init__(self, directory, max_files=200):
+        self.directory = directory
+        self.max_files = max_files
+        self.saved = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, name, stacks):
+        path = os.path.join(self.directory, f'{name}.collapsed')
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        self.saved += 1
+        self._prune()
+        return path
+
+    def _prune(self):
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.collapsed')]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class ProfilingMiddleware:
+    """WSGI middleware profiling triggered requests from the first byte to response close"""
+
+    def __init__(self, wsgi_app, sampler, store, token=None, sample_rate=0):
+        self.wsgi_app = wsgi_app
+        self.sampler = sampler
+        self.store = store
+        self.token = token
+        self.sample_rate = sample_rate
+        self.counts = Counter()
+        self._ids = itertools.count(1)
+
+    def _trigger(self, environ):
+        if self.token:
+            # Header only: a query string token would end up in access logs.
+            # WSGI headers are latin-1 str; compare_digest needs bytes for non-ASCII
+            header = environ.get('HTTP_X_PROFILE')
+            if header and hmac.compare_digest(header.encode('latin-1'), self.token.encode('utf-8')):
+                return 'token'
+        if self.sample_rate and random.random() * self.sample_rate < 1:
+            return 'sample'
+        return None
+
+    def __call__(self, environ, start_response):
+        reason = self._trigger(environ)
+        if reason is None:
+            return self.wsgi_app(environ, start_response)
+
+        thread_id = threading.get_ident()
+        started = time.perf_counter()
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_')[:48] or 'root'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._ids)}-{environ.get('REQUEST_METHOD')}-{slug}"
+        self.sampler.start(thread_id)
+
+        def start_profiled_response(status, headers, exc_info=None):
+            if reason == 'token':
+                headers = list(headers) + [('X-Profile-Id', name)]
+            return start_response(status, headers, exc_info)
+
+        def finish():
+            stacks = self.sampler.stop(thread_id)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.counts[reason] += 1
+            if not stacks:
+                return
+            try:
+                path = self.store.save(f'{name}-{elapsed_ms:.0f}ms-{reason}', stacks)
+                logger.info(f"Profiled {environ.get('PATH_INFO')} ({elapsed_ms:.0f} ms, "
+                            f"{sum(stacks.values())} samples): {path}")
+            except OSError as e:
+                logger.warning(f"Could not save profile for {environ.get('PATH_INFO')}: {str(e)}")
+
+        try:
+            response = self.wsgi_app(environ, start_profiled_response)
+        except Exception:
+            finish()
+            raise
+        return ClosingIterator(response, [finish])
+
+    def stats(self):
+        return {
+            'profiled': dict(self.counts),
+            'saved': self.store.saved,
+            'sample_rate': self.sample_rate,
+            'interval_ms': self.sampler.interval * 1000,
+        }
+
+
+def _gevent_patched():
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def init_profiling(app):
+    """Wrap the WSGI app in the request profiler if a trigger is configured"""
+    token = app.config.get('PROFILE_TOKEN')
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+    if not token and not sample_rate:
+        app.profiler = None
+        return None
+    if app.config.get('GUNICORN_PRESET') == 'gevent' or _gevent_patched():
+        # Greenlets share one OS thread, so a thread's stack isn't the request's
+        app.logger.warning("Request profiling disabled: not supported with gevent workers")
+        app.profiler = None
+        return None
+
+    sampler = StackSampler(app.config['PROFILE_INTERVAL_MS'] / 1000)
+    store = ProfileStore(app.config['PROFILE_DIR'], app.config['PROFILE_MAX_FILES'])
+    profiler = ProfilingMiddleware(app.wsgi_app, sampler, store, token, sample_rate)
+    app.wsgi_app = profiler
+    app.profiler = profiler
+    app.logger.info(f"Request profiling enabled: token {'set' if token else 'unset'}, "
+                    f"1-in-{sample_rate or '-'} sampling, output in {store.directory}")
+    return profiler
@@ -0,0 +1,121 @@
+"""
+Prompt Registry
+Loads Aveena's system prompts once, versions them by content hash and
+bundles each with its generation parameters and precomputed token counts
+"""
+import hashlib
+import logging
+import math
+
+from app.aveena_receptionist import (
+    AVEENA_RECEPTIONIST_PROMPT,
+    AVEENA_SALES_DEMO_PROMPT,
+    get_aveena_config,
+)
+from app import aveena_identity
+from app.knowledge_base import COMPANY_KNOWLEDGE, COMPACT_COMPANY_KNOWLEDGE
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional, falls back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_FAMILIES = ('openai', 'claude')
+
+# Suffix of prompts registered for the stable (prefix-cache friendly) layout
+STABLE_SUFFIX = ':stable'
+
+
+# Average characters per token for English prose, used without tiktoken
+_CHARS_PER_TOKEN = {'openai': 4.0, 'claude': 3.5}
+
+
+def count_tokens(text, family):
+    """Token count for ``text`` under a model family (exact for OpenAI with tiktoken)"""
+    if family == 'openai' and tiktoken is not None:
+        return len(tiktoken.get_encoding('cl100k_base').encode(text))
+    return math.ceil(len(text) / _CHARS_PER_TOKEN[family])
+
+
+class PromptBundle:
+    """A system prompt with its version, generation params and token counts"""
+
+    __slots__ = ('name', 'text', 'version', 'params', 'token_counts')
+
+    def __init__(self, name, text, params):
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+        self.params = dict(params)
+        self.token_counts = {family: count_tokens(text, family) for family in MODEL_FAMILIES}
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'params': self.params,
+            'token_counts': self.token_counts,
+        }
+
+
+class PromptRegistry:
+    """
+    O(1) lookup of prompt bundles by (name, with_knowledge)
+
+    Knowledge-augmented variants are assembled at registration time, so
+    routes never concatenate prompt strings per request.
+    """
+
+    def __init__(self):
+        self._bundles = {}
+        self._versions = {}
+
+    def register(self, name, text, params, knowledge=None):
+        self._add((name, False), PromptBundle(name, text, params))
+        if knowledge:
+            self._add((name, True), PromptBundle(name, text + "\n\n" + knowledge, params))
+
+    def _add(self, key, bundle):
+        self._bundles[key] = bundle
+        self._versions[bundle.version] = bundle
+
+    def get(self, name, with_knowledge=False):
+        """
+        Get a prompt bundle
+
+        Raises:
+            KeyError: If no prompt is registered under ``name``
+        """
+        bundle = self._bundles.get((name, with_knowledge))
+        if bundle is None:
+            bundle = self._bundles[(name, False)]
+        return bundle
+
+    def by_version(self, version):
+        """Find a bundle by its content hash (for cache/log lookups)"""
+        return self._versions.get(version)
+
+    def describe(self):
+        return [
+            dict(bundle.to_dict(), with_knowledge=with_knowledge)
+            for (_, with_knowledge), bundle in self._bundles.items()
+        ]
+
+
+def build_default_registry():
+    """Registry with Aveena's built-in personas"""
+    registry = PromptRegistry()
+    registry.register('sales', AVEENA_SALES_DEMO_PROMPT, get_aveena_config(), knowledge=COMPANY_KNOWLEDGE)
+    # Persona + always-on compact knowledge, identical on every turn
+    registry.register('sales' + STABLE_SUFFIX, AVEENA_SALES_DEMO_PROMPT + "\n\n" + COMPACT_COMPANY_KNOWLEDGE,
+                      get_aveena_config())
+    registry.register('receptionist', AVEENA_RECEPTIONIST_PROMPT, get_aveena_config())
+    registry.register('identity', aveena_identity.AVEENA_SYSTEM_PROMPT, aveena_identity.get_aveena_config(),
+                      knowledge=COMPANY_KNOWLEDGE)
+
+    for bundle in registry.describe():
+        logger.info(f"Prompt registered: {bundle['name']} v{bundle['version']} "
+                    f"knowledge={bundle['with_knowledge']} tokens={bundle['token_counts']}")
+    return registry
@@ -1,15 +1,29 @@
 """
 API routes for the chatbot with streaming support
 """
-from flask import jsonify, request, send_from_directory, Response, stream_with_context, session
+from flask import abort, g, jsonify, request, Response, stream_with_context, session
 from flask_wtf.csrf import generate_csrf
 from pydantic import ValidationError
+from werkzeug.exceptions import HTTPException
 from app.llm_service import LLMService
-from app.models import ChatRequest
-from app.aveena_receptionist import get_aveena_system_message, get_aveena_config
-from app.knowledge_base import get_company_knowledge, should_include_knowledge
+from app.prompt_registry import build_default_registry
+from app.generation_profiles import ProfileStore, parse_tenant_overrides
+from app.tenant_context import TenantContextCache, FileTenantSource, RedisTenantInvalidation
+from app.chat_pipeline import build_chat_pipeline, ChatPipelineError
+from app.prefix_cache import PrefixCacheTracker
+from app.coalescing import Coalescer
+from app.jobs import JobQueue
+from app.stream_replay import StreamReplayBuffer
+from app.tool_service import ToolService
+from app.middleware import admin_token_matches, require_admin_token, require_tenant, require_verified_tenant
+from app.models import CHAT_REQUEST_MAX_BYTES, ToolBatchRequest, ToolCall
+from app.telemetry import TelemetryIngestor
+from app.static_assets import StaticAssets
+from app.ingress import body_limit, read_body, read_json
+import atexit
 import logging
 import json
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -19,49 +33,186 @@ def init_app(app, limiter):
     # Initialize LLM service
     llm_service = LLMService(app.config)
 
+    # System prompts, versioned and bundled with generation params
+    prompts = build_default_registry()
+    app.prompts = prompts
+
+    # Model/sampling settings per persona, overridable per tenant
+    profiles = ProfileStore(
+        prompts, modes=('sales', 'receptionist'),
+        tenant_overrides=parse_tenant_overrides(app.config.get('TENANT_PROFILE_OVERRIDES'))
+    )
+    app.generation_profiles = profiles
+
+    # Per-tenant receptionist prompt/knowledge, loaded once and kept warm
+    tenant_contexts = TenantContextCache(
+        FileTenantSource(app.config['TENANT_DATA_DIR'], index_ttl=app.config['TENANT_CACHE_REFRESH']),
+        prompts, profiles,
+        max_size=app.config['TENANT_CACHE_SIZE'],
+        refresh_after=app.config['TENANT_CACHE_REFRESH'],
+        ttl=app.config['TENANT_CACHE_TTL'],
+        broadcast=(RedisTenantInvalidation(app.config['TENANT_CACHE_REDIS_URL'])
+                   if app.config.get('TENANT_CACHE_REDIS_URL') else None)
+    )
+    app.tenant_contexts = tenant_contexts
+
+    # Identical concurrent first messages share one provider call
+    coalescer = Coalescer(
+        app.config['COALESCE_MODE'],
+        redis_url=app.config.get('COALESCE_REDIS_URL'),
+        timeout=app.config['COALESCE_TIMEOUT']
+    )
+    app.coalescer = coalescer
+
+    # Shared request -> messages pipeline for both chat endpoints
+    chat_pipeline = build_chat_pipeline(
+        prompts, profiles, tenant_contexts,
+        max_history_tokens=app.config.get('CHAT_HISTORY_TOKEN_BUDGET'),
+        layout=app.config['PROMPT_LAYOUT'],
+        coalesce_max_chars=app.config['COALESCE_MAX_CHARS'] if coalescer.enabled else None,
+        reject_unknown_tenants=app.config['REJECT_UNKNOWN_TENANTS']
+    )
+    app.chat_pipeline = chat_pipeline
+    server_timing = app.config['SERVER_TIMING']
+    chat_max_body = app.config.get('CHAT_MAX_BODY_BYTES') or CHAT_REQUEST_MAX_BYTES
+
+    # Provider prefix-cache hits and TTFT per conversation
+    prefix_cache = PrefixCacheTracker(max_conversations=app.config['PREFIX_CACHE_MAX_CONVERSATIONS'])
+    app.prefix_cache = prefix_cache
+
+    # Background work (webhook cost/usage updates, tool logs) off the request path
+    job_queue = JobQueue.from_config(app.config)
+    app.job_queue = job_queue
+    atexit.register(job_queue.stop)
+
+    # Streams drain on SIGTERM, then write-behind work is flushed
+    lifecycle = app.lifecycle
+    lifecycle.on_shutdown('jobs', lambda: job_queue.stop(timeout=lifecycle.flush_timeout))
+
+    # Chat stream events kept for Last-Event-ID resumption
+    stream_replay = StreamReplayBuffer(
+        ttl=app.config['STREAM_REPLAY_TTL'],
+        max_streams=app.config['STREAM_REPLAY_MAX_STREAMS'],
+        redis_url=app.config.get('STREAM_REPLAY_REDIS_URL'),
+        lifecycle=lifecycle
+    )
+    app.stream_replay = stream_replay
+
+    # CRM tools for the chat widget and voice agent (see webhooks.py)
+    tool_service = ToolService(max_workers=app.config['TOOL_WORKERS'])
+    app.tool_service = tool_service
+
+    reconnect_ms = app.config['STREAM_RECONNECT_MS']
+
+    def sse_response(stream_id, events, headers=None):
+        """
+        SSE response whose events carry ``id: <stream_id>:<seq>``
+
+        If the worker is still streaming at its drain deadline, the response
+        ends with a ``reconnect`` event when the replay log is shared (the
+        client resumes on another worker with Last-Event-ID), or else with a
+        terminal error event.
+        """
+        def generate():
+            lifecycle.stream_started()
+            cut = False
+            try:
+                for seq, event in events:
+                    yield f"id: {stream_id}:{seq}\ndata: {json.dumps(event)}\n\n"
+                    if lifecycle.past_deadline():
+                        cut = True
+                        if stream_replay.shared:
+                            reconnect = {'type': 'reconnect', 'stream_id': stream_id,
+                                         'last_event_id': f'{stream_id}:{seq}'}
+                            yield f"retry: {reconnect_ms}\nevent: reconnect\ndata: {json.dumps(reconnect)}\n\n"
+                        else:
+                            # This worker's replay buffer exits with it; nothing to resume
+                            error = {'type': 'error', 'error': 'Server restarting, please try again'}
+                            yield f"data: {json.dumps(error)}\n\n"
+                        return
+            finally:
+                lifecycle.stream_finished(cut)
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no',
+                'Connection': 'keep-alive',
+                'X-Stream-ID': stream_id,
+                **(headers or {})
+            }
+        )
+
+    # Frontend RUM/error aggregation (flushed in the background)
+    telemetry = TelemetryIngestor(app.config)
+    atexit.register(telemetry.stop)
+    lifecycle.on_shutdown('telemetry', telemetry.stop)
+
+    # Frontend assets, indexed once at startup
+    static_assets = StaticAssets(app.static_folder) if app.static_folder else None
+    app.static_assets = static_assets
+
+    # Security headers are identical for every response; build them once
+    security_headers = {
+        'X-Content-Type-Options': 'nosniff',
+        'X-Frame-Options': 'DENY',
+        'Referrer-Policy': 'strict-origin-when-cross-origin',
+        'X-XSS-Protection': '1; mode=block',
+        # Permissions Policy (restrict browser features)
+        'Permissions-Policy': (
+            'geolocation=(), microphone=(), camera=(), '
+            'payment=(), usb=(), magnetometer=(), gyroscope=()'
+        ),
+    }
+    # Strict-Transport-Security (only if HTTPS enabled)
+    if app.config.get('FORCE_HTTPS'):
+        security_headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+
+    api_cache_headers = {
+        'Cache-Control': 'no-store, no-cache, must-revalidate, private, max-age=0',
+        'Pragma': 'no-cache',
+        'Expires': '0',
+    }
+
     # SECURITY: Add Cache-Control and Security headers to all responses
     @app.after_request
     def add_security_headers(response):
         """Add security headers to all responses"""
-        # Cache Control for API responses
-        if request.path.startswith('/api/'):
-            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, private, max-age=0'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-
-        # Security Headers (all responses)
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-Frame-Options'] = 'DENY'
-        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        response.headers['X-XSS-Protection'] = '1; mode=block'
+        headers = response.headers
 
-        # Strict-Transport-Security (only if HTTPS enabled)
-        if app.config.get('FORCE_HTTPS'):
-            response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+        # Cache Control for API responses (unless they carry a validator and
+        # set their own, like the tenant bootstrap document)
+        if request.path.startswith('/api/') and 'ETag' not in headers:
+            for name, value in api_cache_headers.items():
+                headers[name] = value
 
-        # Permissions Policy (restrict browser features)
-        response.headers['Permissions-Policy'] = (
-            'geolocation=(), microphone=(), camera=(), '
-            'payment=(), usb=(), magnetometer=(), gyroscope=()'
-        )
+        # Security Headers (all responses)
+        for name, value in security_headers.items():
+            headers[name] = value
 
         return response
 
     # Serve PWA frontend
     @app.route('/')
     def index():
-        if app.static_folder:
-            return send_from_directory(app.static_folder, 'index.html')
+        if static_assets:
+            response = static_assets.serve('index.html')
+            if response is not None:
+                return response
         return jsonify({'message': 'Frontend not built yet. Run: cd frontend && npm run build'}), 404
 
     @app.route('/<path:path>')
     def serve_static(path):
-        if app.static_folder:
-            try:
-                return send_from_directory(app.static_folder, path)
-            except:
-                # SPA fallback - serve index.html for unknown routes
-                return send_from_directory(app.static_folder, 'index.html')
+        # Unknown API paths are real 404s, not SPA routes
+        if path.startswith('api/'):
+            abort(404)
+        if static_assets:
+            # SPA fallback - the manifest serves index.html for unknown routes
+            response = static_assets.serve(path)
+            if response is not None:
+                return response
         return jsonify({'error': 'Frontend not available'}), 404
 
     # Health check (no rate limit - used for monitoring)
@@ -73,8 +224,8 @@ def init_app(app, limiter):
             'status': 'healthy',
             'version': '1.0.0',
             'services': {
-                'openai': llm_service.openai_client is not None,
-                'claude': llm_service.anthropic_client is not None
+                'openai': llm_service.openai_available,
+                'claude': llm_service.anthropic_available
             }
         })
 
@@ -89,6 +240,7 @@ def init_app(app, limiter):
     # Chat endpoint (non-streaming)
     @app.route('/api/chat', methods=['POST'])
     @limiter.limit("10 per minute")
+    @body_limit(chat_max_body)
     def chat():
         """
         Main chat endpoint
@@ -101,141 +253,274 @@ def init_app(app, limiter):
         }
         """
         try:
-            # Validate input with Pydantic
             try:
-                req_data = ChatRequest.model_validate(request.get_json())
-            except ValidationError as e:
-                return jsonify({
-                    'error': 'Invalid input',
-                    'details': e.errors()
-                }), 400
-
-            user_message = req_data.message
-            provider = req_data.provider
-            model = req_data.model
-            history = [msg.model_dump() for msg in req_data.history] if req_data.history else []
-
-            # Build conversation
-            conversation = history + [{"role": "user", "content": user_message}]
-
-            # Add Aveena's system message if not present
-            if not any(msg['role'] == 'system' for msg in conversation):
-                system_message = get_aveena_system_message()
-                
-                # Include company knowledge if the message is about the company
-                if should_include_knowledge(user_message):
-                    system_message += "\n\n" + get_company_knowledge()
-                
-                conversation = [
-                    {"role": "system", "content": system_message}
-                ] + conversation
+                ctx = chat_pipeline.run(read_body())
+            except ChatPipelineError as e:
+                return jsonify(e.body), e.status
+
+            provider = ctx.provider
 
             # Call appropriate LLM
-            if provider == 'claude':
-                result = llm_service.chat_claude(conversation, model=model, stream=False)
-            else:
-                result = llm_service.chat_openai(conversation, model=model, stream=False)
+            def call():
+                if provider == 'claude':
+                    return llm_service.chat_claude(ctx.messages, model=ctx.model, stream=False, profile=ctx.profile)
+                return llm_service.chat_openai(ctx.messages, model=ctx.model, stream=False, profile=ctx.profile)
+
+            key = ctx.extras.get('coalesce_key')
+            result = coalescer.call('chat:' + key, call) if key else call()
 
             if result.get('success'):
-                logger.info(f"Chat successful: provider={provider}, tokens={result.get('usage', {}).get('total_tokens', 'N/A')}")
-                return jsonify({
+                logger.info(f"Chat successful: provider={provider}, tokens={result.get('usage', {}).get('total_tokens', 'N/A')}"
+                            f"{' (coalesced)' if result.get('coalesced') else ''}")
+                conversation_id = ctx.conversation_id
+                if not result.get('coalesced'):
+                    prefix_cache.record(conversation_id, ctx.prompt.version, result.get('usage'))
+                response = jsonify({
                     'message': result['message'],
                     'model': result['model'],
-                    'usage': result.get('usage')
+                    'usage': result.get('usage'),
+                    'conversation_id': conversation_id
                 })
+                if server_timing:
+                    response.headers['Server-Timing'] = ctx.server_timing()
+                return response
             else:
                 logger.error(f"LLM error: {result.get('error')}")
                 return jsonify({'error': 'Failed to get response from AI'}), 500
 
+        except HTTPException:
+            raise  # e.g. 413 from a chunked body over the cap
         except Exception as e:
             logger.error(f"Chat error: {str(e)}", exc_info=True)
             return jsonify({'error': 'Internal server error'}), 500
 
+    def draining_response():
+        """503 for new streams on a worker that is shutting down"""
+        lifecycle.reject()
+        response = jsonify({'error': 'Server restarting', 'message': 'Please retry.'})
+        response.headers['Retry-After'] = str(max(reconnect_ms // 1000, 1))
+        response.headers['Connection'] = 'close'
+        return response, 503
+
     # Chat endpoint (streaming)
     @app.route('/api/chat/stream', methods=['POST'])
     @limiter.limit("10 per minute")
+    @body_limit(chat_max_body)
     def chat_stream():
         """
         Streaming chat endpoint
         POST /api/chat/stream
         Returns Server-Sent Events (SSE)
         """
+        if lifecycle.draining:
+            return draining_response()
         try:
-            # Validate input with Pydantic
+            # Reconnect: replay/attach to the buffered stream instead of a new LLM call
+            last_event_id = request.headers.get('Last-Event-ID')
+            if last_event_id:
+                resumed = stream_replay.resume(last_event_id)
+                if resumed is not None:
+                    logger.info(f"Resuming stream {last_event_id}")
+                    return sse_response(*resumed)
+
             try:
-                req_data = ChatRequest.model_validate(request.get_json())
-            except ValidationError as e:
-                return jsonify({
-                    'error': 'Invalid input',
-                    'details': e.errors()
-                }), 400
-
-            user_message = req_data.message
-            provider = req_data.provider
-            model = req_data.model
-            history = [msg.model_dump() for msg in req_data.history] if req_data.history else []
-
-            # Build conversation
-            conversation = history + [{"role": "user", "content": user_message}]
-
-            # Add Aveena's system message if not present
-            if not any(msg['role'] == 'system' for msg in conversation):
-                system_message = get_aveena_system_message()
-                
-                # Include company knowledge if the message is about the company
-                if should_include_knowledge(user_message):
-                    system_message += "\n\n" + get_company_knowledge()
-                
-                conversation = [
-                    {"role": "system", "content": system_message}
-                ] + conversation
-
-            # Create streaming response
-            def generate():
+                ctx = chat_pipeline.run(read_body())
+            except ChatPipelineError as e:
+                return jsonify(e.body), e.status
+
+            provider, model, profile, messages = ctx.provider, ctx.model, ctx.profile, ctx.messages
+            conversation_id, prefix_version = ctx.conversation_id, ctx.prompt.version
+            key = ctx.extras.get('coalesce_key')
+
+            def start_stream():
+                # The request is sent before this returns; don't pin the
+                # history in memory for the rest of the stream
+                nonlocal messages
+                sent, messages = messages, None
+                if provider == 'claude':
+                    return llm_service.chat_claude(sent, model=model, stream=True, profile=profile)
+                return llm_service.chat_openai(sent, model=model, stream=True, profile=profile)
+
+            # Upstream events, pulled by whichever client (or drain thread) is reading
+            def upstream():
                 try:
-                    if provider == 'claude':
-                        stream = llm_service.chat_claude(conversation, model=model, stream=True)
-                    else:
-                        stream = llm_service.chat_openai(conversation, model=model, stream=True)
+                    start = time.perf_counter()
+                    ttft = None
+                    # Events may be shared with coalesced requests; copy before changing
+                    stream = coalescer.stream('stream:' + key, start_stream) if key else start_stream()
 
                     for chunk in stream:
-                        # Send as Server-Sent Event
-                        yield f"data: {json.dumps(chunk)}\n\n"
+                        if chunk['type'] == 'chunk' and ttft is None:
+                            ttft = time.perf_counter() - start
+                        elif chunk['type'] == 'done':
+                            chunk = dict(chunk, conversation_id=conversation_id)
+                            if not chunk.get('coalesced'):
+                                prefix_cache.record(conversation_id, prefix_version, chunk.get('usage'), ttft)
+                        yield chunk
 
                 except Exception as e:
                     logger.error(f"Streaming error: {str(e)}")
-                    yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
-
-            logger.info(f"Starting stream: provider={provider}, model={model}")
-
-            return Response(
-                stream_with_context(generate()),
-                mimetype='text/event-stream',
-                headers={
-                    'Cache-Control': 'no-cache',
-                    'X-Accel-Buffering': 'no',
-                    'Connection': 'keep-alive'
-                }
-            )
+                    yield {'type': 'error', 'error': str(e)}
+
+            logger.info(f"Starting stream: provider={provider}, model={model}, profile={profile.name}")
 
+            stream_id, events = stream_replay.open(upstream())
+            return sse_response(stream_id, events, {'Server-Timing': ctx.server_timing()} if server_timing else {})
+
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Stream setup error: {str(e)}", exc_info=True)
             return jsonify({'error': 'Internal server error'}), 500
 
+    @app.route('/api/chat/stream/resume')
+    @limiter.limit("30 per minute")
+    def chat_stream_resume():
+        """
+        Resume a dropped chat stream (EventSource reconnects)
+        GET /api/chat/stream/resume with Last-Event-ID header or ?last_event_id=
+        """
+        if lifecycle.draining:
+            return draining_response()
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        resumed = stream_replay.resume(last_event_id)
+        if resumed is None:
+            return jsonify({'error': 'Stream not found', 'message': 'Stream expired; send the message again.'}), 404
+        return sse_response(*resumed)
+
+    # Tenant bootstrap document for the PWA's first paint
+    bootstrap_cache_control = (
+        f"public, max-age={app.config['TENANT_BOOTSTRAP_MAX_AGE']}, "
+        f"stale-while-revalidate={app.config['TENANT_BOOTSTRAP_SWR']}"
+    )
+
+    @app.route('/api/tenants/<tenant_id>/bootstrap')
+    def tenant_bootstrap(tenant_id):
+        """
+        Branding, media slots, services, hours and greeting in one document
+        GET /api/tenants/<tenant_id>/bootstrap (If-None-Match -> 304)
+        """
+        return bootstrap_response(tenant_contexts.get(tenant_id))
+
+    @app.route('/api/subdomains/<subdomain>/bootstrap')
+    def subdomain_bootstrap(subdomain):
+        """
+        The bootstrap document of the tenant serving a PWA subdomain
+        GET /api/subdomains/<subdomain>/bootstrap (If-None-Match -> 304)
+        """
+        return bootstrap_response(tenant_contexts.get_by_subdomain(subdomain))
+
+    def bootstrap_response(context):
+        if context is None:
+            return jsonify({'error': 'Unknown tenant'}), 404
+
+        # Weak: compression may re-encode the body
+        headers = {'ETag': f'W/"{context.etag}"', 'Cache-Control': bootstrap_cache_control}
+        if request.if_none_match.contains_weak(context.etag):
+            return Response(status=304, headers=headers)
+        return Response(context.bootstrap, headers=headers, content_type='application/json')
+
+    @app.route('/api/tenants/<tenant_id>/invalidate', methods=['POST'])
+    @limiter.limit("30 per minute")
+    def invalidate_tenant(tenant_id):
+        """
+        Drop a tenant's cached prompt and bootstrap document after an edit
+        POST /api/tenants/<tenant_id>/invalidate with X-Admin-Token header
+        """
+        token = app.config.get('TENANT_ADMIN_TOKEN')
+        if not token:
+            abort(404)
+        if not admin_token_matches(token):
+            return jsonify({'error': 'Unauthorized'}), 401
+        tenant_contexts.invalidate(tenant_id)
+        logger.info(f"Tenant cache invalidated: {tenant_id}")
+        return jsonify({'status': 'invalidated', 'tenant_id': tenant_id})
+
+    # CRM tool execution, scoped to the tenant in the JWT (or X-Tenant-ID
+    # with X-Service-Token)
+    @app.route('/api/crm/tools/execute', methods=['POST'])
+    @limiter.limit("60 per minute")
+    @require_verified_tenant
+    def execute_tool():
+        """
+        Run one CRM tool
+        POST /api/crm/tools/execute {"tool_name": "get_services", "parameters": {}}
+        """
+        try:
+            call = ToolCall.model_validate_json(read_body())
+        except ValidationError as e:
+            return jsonify({'error': 'Invalid input', 'details': e.errors(include_input=False, include_context=False)}), 400
+
+        result = tool_service.execute_batch(g.tenant_id, [call.model_dump()])[0]
+        if not result['success']:
+            status = 404 if result['error'].startswith('Unknown tool') else 500
+            return jsonify({**result, 'message': result['error']}), status
+        return jsonify(result)
+
+    @app.route('/api/crm/tools/batch', methods=['POST'])
+    @limiter.limit("60 per minute")
+    @require_verified_tenant
+    def execute_tool_batch():
+        """
+        Run several CRM tools in one request (e.g. a chat widget's initial load)
+        POST /api/crm/tools/batch
+        {
+            "calls": [
+                {"tool_name": "get_services", "parameters": {}},
+                {"tool_name": "get_business_hours", "parameters": {}}
+            ]
+        }
+
+        Results come back in request order, each with its own success flag
+        and duration_ms; read-only tools run concurrently.
+        """
+        try:
+            batch = ToolBatchRequest.model_validate_json(read_body())
+        except ValidationError as e:
+            return jsonify({'error': 'Invalid input', 'details': e.errors(include_input=False, include_context=False)}), 400
+        if len(batch.calls) > app.config['TOOL_BATCH_MAX_CALLS']:
+            return jsonify({'error': 'Invalid input',
+                            'details': f"At most {app.config['TOOL_BATCH_MAX_CALLS']} calls per batch"}), 400
+
+        start = time.perf_counter()
+        results = tool_service.execute_batch(g.tenant_id, [call.model_dump() for call in batch.calls])
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        response = jsonify({
+            'success': all(result['success'] for result in results),
+            'results': results,
+            'duration_ms': duration_ms
+        })
+        if server_timing:
+            response.headers['Server-Timing'] = ', '.join(
+                [f"tool{i}-{result['tool_name']};dur={result['duration_ms']}" for i, result in enumerate(results)]
+                + [f'total;dur={duration_ms}']
+            )
+        return response
+
+    # Authenticated only by a header credential (bearer JWT, X-Service-Token,
+    # X-Admin-Token) that a cross-site form can't send, never by the session
+    # cookie, so CSRF tokens don't apply
+    csrf = app.extensions.get('csrf')
+    if csrf is not None:
+        csrf.exempt(execute_tool)
+        csrf.exempt(execute_tool_batch)
+        csrf.exempt(invalidate_tenant)
+
     # List available models
     @app.route('/api/models')
     def list_models():
         """List available LLM models"""
         return jsonify({
             'openai': [
-                {'id': 'gpt-4', 'name': 'GPT-4', 'available': llm_service.openai_client is not None},
-                {'id': 'gpt-4-turbo-preview', 'name': 'GPT-4 Turbo', 'available': llm_service.openai_client is not None},
-                {'id': 'gpt-3.5-turbo', 'name': 'GPT-3.5 Turbo', 'available': llm_service.openai_client is not None}
+                {'id': 'gpt-4', 'name': 'GPT-4', 'available': llm_service.openai_available},
+                {'id': 'gpt-4-turbo-preview', 'name': 'GPT-4 Turbo', 'available': llm_service.openai_available},
+                {'id': 'gpt-3.5-turbo', 'name': 'GPT-3.5 Turbo', 'available': llm_service.openai_available}
             ],
             'claude': [
-                {'id': 'claude-3-5-sonnet-20241022', 'name': 'Claude 3.5 Sonnet', 'available': llm_service.anthropic_client is not None},
-                {'id': 'claude-3-opus-20240229', 'name': 'Claude 3 Opus', 'available': llm_service.anthropic_client is not None},
-                {'id': 'claude-3-sonnet-20240229', 'name': 'Claude 3 Sonnet', 'available': llm_service.anthropic_client is not None}
+                {'id': 'claude-3-5-sonnet-20241022', 'name': 'Claude 3.5 Sonnet', 'available': llm_service.anthropic_available},
+                {'id': 'claude-3-opus-20240229', 'name': 'Claude 3 Opus', 'available': llm_service.anthropic_available},
+                {'id': 'claude-3-sonnet-20240229', 'name': 'Claude 3 Sonnet', 'available': llm_service.anthropic_available}
             ]
         })
 
@@ -308,6 +593,9 @@ def init_app(app, limiter):
     @app.errorhandler(Exception)
     def handle_unexpected_error(e):
         """Catch-all for unexpected errors"""
+        if isinstance(e, HTTPException):
+            # HTTP errors without their own handler (405, 413...) keep their status
+            return jsonify({'error': e.name, 'message': e.description}), e.code
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         # Never expose stack traces or internal details
         return jsonify({
@@ -317,31 +605,116 @@ def init_app(app, limiter):
 
     # Monitoring endpoints
     @app.route('/api/metrics', methods=['POST', 'OPTIONS'])
+    @body_limit(app.config['TELEMETRY_MAX_BYTES'])
     def receive_metrics():
         """Receive frontend performance metrics"""
         if request.method == 'OPTIONS':
             return '', 200
 
+        metrics, error = read_json()
+        if error:
+            return error
+
         try:
-            metrics = request.get_json()
-            # Log metrics (in production, send to monitoring service)
-            logger.info(f"Frontend metrics: {json.dumps(metrics)}")
-            return jsonify({'status': 'received'}), 200
+            accepted, rejected = telemetry.ingest_metrics(metrics)
+            return jsonify({'status': 'received', 'accepted': accepted, 'rejected': rejected}), 200
         except Exception as e:
             logger.error(f"Metrics error: {str(e)}")
             return jsonify({'error': 'Failed to process metrics'}), 500
 
+    @app.route('/api/metrics/vitals')
+    def query_vitals():
+        """
+        Aggregated Core Web Vitals
+        GET /api/metrics/vitals?page=/pricing&release=1.2.0&q=0.75
+        """
+        try:
+            quantile = float(request.args.get('q', 0.75))
+        except ValueError:
+            quantile = -1
+        if not 0 <= quantile <= 1:
+            return jsonify({'error': 'Invalid input', 'details': 'q must be between 0 and 1'}), 400
+
+        return jsonify({
+            'quantile': quantile,
+            'vitals': telemetry.vitals(
+                page=request.args.get('page'),
+                release=request.args.get('release'),
+                quantile=quantile
+            )
+        })
+
+    @app.route('/api/metrics/prefix-cache')
+    @require_admin_token
+    def query_prefix_cache():
+        """
+        Provider prefix-cache hit ratio and TTFT, overall or per conversation
+        GET /api/metrics/prefix-cache?conversation_id=abc123
+        """
+        conversation_id = request.args.get('conversation_id')
+        if conversation_id is None:
+            return jsonify({'layout': app.config['PROMPT_LAYOUT'], **prefix_cache.stats()})
+
+        stats = prefix_cache.conversation(conversation_id)
+        if stats is None:
+            return jsonify({'error': 'Unknown conversation'}), 404
+        return jsonify({'conversation_id': conversation_id, **stats})
+
+    @app.route('/api/metrics/coalescing')
+    @require_admin_token
+    def query_coalescing():
+        """Single-flight counters: calls made (leaders) vs requests that joined one (followers)"""
+        return jsonify(coalescer.stats())
+
+    @app.route('/api/metrics/streams')
+    @require_admin_token
+    def query_streams():
+        """SSE replay buffer counters, active/peak streams and drain state"""
+        return jsonify({**stream_replay.stats(), 'lifecycle': lifecycle.stats()})
+
+    @app.route('/api/metrics/ingress')
+    @require_admin_token
+    def query_ingress():
+        """Request body bytes in flight, shed requests and per-endpoint body sizes"""
+        return jsonify(app.ingress.stats())
+
+    @app.route('/api/metrics/profiling')
+    @require_admin_token
+    def query_profiling():
+        """Requests profiled per trigger and collapsed-stack files saved"""
+        if app.profiler is None:
+            return jsonify({'enabled': False})
+        return jsonify({'enabled': True, **app.profiler.stats()})
+
+    @app.route('/api/metrics/jobs')
+    @require_admin_token
+    def query_jobs():
+        """Background job queue depth and outcomes"""
+        return jsonify(job_queue.stats())
+
+    @app.route('/api/metrics/jobs/dead')
+    @require_admin_token
+    def query_dead_jobs():
+        """Recent dead letters; their kwargs can hold customer data, so admin only"""
+        return jsonify({'dead_letters': job_queue.dead_letters()})
+
     @app.route('/api/errors/critical', methods=['POST', 'OPTIONS'])
+    @body_limit(app.config['TELEMETRY_MAX_BYTES'])
     def receive_errors():
         """Receive frontend critical errors"""
         if request.method == 'OPTIONS':
             return '', 200
 
+        error_data, error = read_json()
+        if error:
+            return error
+
         try:
-            error_data = request.get_json()
-            # Log errors (in production, send to error tracking service like Sentry)
-            logger.error(f"Frontend critical error: {json.dumps(error_data)}")
-            return jsonify({'status': 'logged'}), 200
+            fingerprint = telemetry.ingest_error(error_data)
+            return jsonify({'status': 'logged', 'fingerprint': fingerprint}), 200
+        except ValidationError as e:
+            return jsonify({'error': 'Invalid input', 'details': e.errors(include_input=False, include_context=False)}), 400
         except Exception as e:
             logger.error(f"Error logging failed: {str(e)}")
             return jsonify({'error': 'Failed to log error'}), 500
+
@@ -0,0 +1,145 @@
+"""
+Static asset serving for the built PWA frontend
+Scans the dist folder once at startup into an in-memory manifest so each
+request is a dict lookup instead of filesystem probing
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+from flask import request, Response, send_from_directory
+from werkzeug.wsgi import wrap_file
+
+logger = logging.getLogger(__name__)
+
+# Bundles emitted with a content hash in the name (main.3f9a2b1c.js,
+# chunk-3f9a2b1c.css) never change, so they can be cached forever
+HASHED_NAME_RE = re.compile(r'[.-][0-9a-f]{8,}\.[a-z0-9]+$')
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticAsset:
+    """Manifest entry for one file in the dist folder"""
+
+    __slots__ = ('path', 'size', 'mtime', 'etag', 'content_type', 'cache_control', 'variants')
+
+    def __init__(self, path, size, mtime, etag, content_type, cache_control):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.variants = {}  # encoding -> (path, size)
+
+
+def _file_etag(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:20]
+
+
+def _content_type(name):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+class StaticAssets:
+    """
+    Manifest-backed static file server
+
+    Args:
+        root: Frontend dist folder
+        fallback: File served for unknown paths (SPA routing)
+    """
+
+    def __init__(self, root, fallback='index.html'):
+        self.root = root
+        self.fallback_name = fallback
+        self.assets = {}
+        self.scan()
+
+    def scan(self):
+        """Build the manifest: path -> size, mtime, ETag, type and .br/.gz variants"""
+        assets = {}
+        compressed = []
+
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                name = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+
+                if name.endswith(('.br', '.gz')):
+                    compressed.append((name, full_path))
+                    continue
+
+                stat = os.stat(full_path)
+                cache_control = IMMUTABLE_CACHE if HASHED_NAME_RE.search(filename) else REVALIDATE_CACHE
+                assets[name] = StaticAsset(
+                    full_path, stat.st_size, stat.st_mtime, _file_etag(full_path),
+                    _content_type(name), cache_control
+                )
+
+        for name, full_path in compressed:
+            for encoding, suffix in ENCODINGS:
+                if name.endswith(suffix) and name[:-len(suffix)] in assets:
+                    assets[name[:-len(suffix)]].variants[encoding] = (full_path, os.path.getsize(full_path))
+
+        self.assets = assets
+        self.fallback = assets.get(self.fallback_name)
+        logger.info(f"Static manifest built: {len(assets)} assets, "
+                    f"{sum(1 for a in assets.values() if a.variants)} precompressed")
+
+    def serve(self, path):
+        """
+        Serve ``path`` from the manifest, falling back to the SPA entry point
+
+        Returns:
+            A Response, or None if neither the asset nor the fallback exists
+        """
+        asset = self.assets.get(path) or self.fallback
+        if asset is None:
+            return None
+
+        # Range requests (media seeking) are rare; let Flask handle them
+        if 'Range' in request.headers:
+            return send_from_directory(self.root, os.path.relpath(asset.path, self.root))
+
+        file_path, size, etag = asset.path, asset.size, asset.etag
+        headers = {'Cache-Control': asset.cache_control}
+
+        if asset.variants:
+            headers['Vary'] = 'Accept-Encoding'
+            accept_encodings = request.accept_encodings
+            for encoding, _ in ENCODINGS:
+                variant = asset.variants.get(encoding)
+                if variant and accept_encodings.quality(encoding) > 0:
+                    file_path, size = variant
+                    # Each encoding is a distinct representation
+                    etag = f'{etag}-{encoding}'
+                    headers['Content-Encoding'] = encoding
+                    break
+
+        headers['ETag'] = f'"{etag}"'
+        if request.if_none_match.contains_weak(etag):
+            headers.pop('Content-Encoding', None)
+            return Response(status=304, headers=headers)
+
+        headers['Content-Length'] = str(size)
+        return Response(
+            wrap_file(request.environ, open(file_path, 'rb')),
+            headers=headers,
+            content_type=asset.content_type,
+            direct_passthrough=True
+        )
@@ -0,0 +1,168 @@
+"""
+SSE Stream Replay
+Keeps each chat stream's events in a bounded, expiring buffer so a client
+that drops mid-answer can reconnect with ``Last-Event-ID`` and resume
+(attaching to the still-running upstream call) instead of paying for a new
+LLM call
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.coalescing import RedisEventLog, SharedStream
+
+logger = logging.getLogger(__name__)
+
+
+def parse_event_id(last_event_id):
+    """
+    Split an SSE event id of the form ``<stream_id>:<seq>``
+
+    Returns:
+        (stream_id, seq), or None if malformed
+    """
+    stream_id, _, seq = (last_event_id or '').partition(':')
+    if not stream_id or not seq.isdigit() or len(stream_id) > 64:
+        return None
+    return stream_id, int(seq)
+
+
+class StreamReplayBuffer:
+    """
+    Replayable chat streams by stream id, kept for ``ttl`` seconds
+
+    The upstream is pulled by whoever is reading (see SharedStream). When
+    the last reader disconnects mid-answer, a background thread drains the
+    rest so it's ready for the reconnect (counted by ``lifecycle``, so
+    shutdown waits for it). With ``redis_url`` events are also written to
+    Redis so a reconnect routed to another worker can resume.
+    """
+
+    def __init__(self, ttl=300, max_streams=1000, redis_url=None, timeout=30, lifecycle=None):
+        self.ttl = ttl
+        self.max_streams = max_streams
+        self.lifecycle = lifecycle
+        self._streams = OrderedDict()  # stream_id -> (SharedStream, created_at)
+        self._lock = threading.Lock()
+        self._redis = RedisEventLog(redis_url, timeout) if redis_url else None
+        self.opened = 0
+        self.resumed = 0
+        self.drained = 0
+
+    @property
+    def shared(self):
+        """Whether other workers can resume this worker's streams"""
+        return self._redis is not None
+
+    def open(self, source):
+        """
+        Start buffering a new stream
+
+        Args:
+            source: Iterator of LLMService stream events
+
+        Returns:
+            (stream_id, iterator of (seq, event))
+        """
+        stream_id = uuid.uuid4().hex
+        if self._redis:
+            source = self._mirror(stream_id, source)
+        shared = SharedStream(source)
+        with self._lock:
+            self._evict()
+            self._streams[stream_id] = (shared, time.time())
+        self.opened += 1
+        return stream_id, self._read(stream_id, shared, 0)
+
+    def resume(self, last_event_id):
+        """
+        Events after ``last_event_id``
+
+        Returns:
+            (stream_id, iterator of (seq, event)), or None if the stream is
+            unknown or expired (the client should start a new request)
+        """
+        parsed = parse_event_id(last_event_id)
+        if parsed is None:
+            return None
+        stream_id, seq = parsed
+
+        with self._lock:
+            entry = self._streams.get(stream_id)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            self.resumed += 1
+            return stream_id, self._read(stream_id, entry[0], seq + 1)
+
+        if self._redis and self._redis.exists(self._key(stream_id)):
+            self.resumed += 1
+            events = self._redis.follow(self._key(stream_id), start=seq + 1)
+            return stream_id, enumerate(events, start=seq + 1)
+        return None
+
+    def _read(self, stream_id, shared, start):
+        with self._lock:
+            shared.subscribers += 1
+        try:
+            for seq, event in enumerate(shared.read(start), start=start):
+                yield seq, event
+        finally:
+            with self._lock:
+                shared.subscribers -= 1
+                abandoned = shared.subscribers == 0 and not shared.done
+            if abandoned:
+                self._drain(stream_id, shared)
+
+    def _drain(self, stream_id, shared):
+        # Finish the paid-for answer so a reconnect can replay it, unless this
+        # worker is shutting down and its buffer is the only copy
+        lifecycle = self.lifecycle
+        if lifecycle is not None and lifecycle.draining and not self.shared:
+            shared.close()
+            return
+
+        def run():
+            try:
+                for _ in shared.read(len(shared.events)):
+                    if lifecycle is not None and lifecycle.draining and not self.shared:
+                        shared.close()
+                        return
+                logger.info(f"Drained disconnected stream {stream_id} ({len(shared.events)} events)")
+            finally:
+                if lifecycle is not None:
+                    lifecycle.background_finished()
+
+        self.drained += 1
+        if lifecycle is not None:
+            lifecycle.background_started()
+        threading.Thread(target=run, name='sse-drain', daemon=True).start()
+
+    def _mirror(self, stream_id, source):
+        key = self._key(stream_id)
+        for event in source:
+            try:
+                self._redis.append(key, event, ttl=self.ttl)
+            except Exception as e:
+                logger.warning(f"Stream replay mirror failed: {str(e)}")
+            yield event
+
+    @staticmethod
+    def _key(stream_id):
+        return f'sse:{stream_id}'
+
+    def _evict(self):
+        now = time.time()
+        while self._streams:
+            stream_id, (shared, created_at) = next(iter(self._streams.items()))
+            if now - created_at < self.ttl and len(self._streams) < self.max_streams:
+                break
+            del self._streams[stream_id]
+
+    def stats(self):
+        return {
+            'streams': len(self._streams),
+            'opened': self.opened,
+            'resumed': self.resumed,
+            'drained': self.drained,
+        }
@@ -0,0 +1,388 @@
+"""
+Frontend telemetry ingestion
+Validates RUM beacons, pre-aggregates Web Vitals into percentile sketches,
+groups critical errors by fingerprint and flushes periodic rollups instead
+of logging every beacon
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from pydantic import ValidationError
+from app.models import WebVitalEvent, ClientErrorReport
+
+logger = logging.getLogger(__name__)
+
+
+class DDSketch:
+    """
+    Minimal DDSketch: relative-error quantile sketch with log-spaced buckets
+
+    Quantiles are accurate to within ``relative_accuracy`` of the true value
+    and memory is bounded by ``max_buckets`` (lowest buckets collapse first,
+    which only affects accuracy of very low quantiles).
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if value <= 0:
+            self.zero_count += 1
+            return
+
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50': _round(self.quantile(0.5)),
+            'p75': _round(self.quantile(0.75)),
+            'p95': _round(self.quantile(0.95)),
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+# Page and release of metrics beyond max_keys within one flush interval
+OTHER_PAGE = '(other)'
+
+
+def normalize_page(url):
+    """Reduce a full URL to its path so query strings don't explode cardinality"""
+    if not url:
+        return 'unknown'
+    path = urlsplit(url).path or '/'
+    return path[:256]
+
+
+_LOCATION_RE = re.compile(r':\d+(?::\d+)?(?=\)?$)')
+_URL_PREFIX_RE = re.compile(r'\b[a-z][a-z0-9+.-]*://[^/\s)]+')
+_QUERY_RE = re.compile(r'[?#][^\s):]*')
+_BUNDLE_HASH_RE = re.compile(r'[.-][0-9a-f]{8,}(?=\.(?:m?js|css)\b)')
+_ID_RE = re.compile(r'\b(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|0x[0-9a-f]+|[0-9a-f]{16,})\b', re.I)
+_NUMBER_RE = re.compile(r'\d+')
+
+MAX_FINGERPRINT_FRAMES = 5
+
+
+def normalize_stack(stack):
+    """
+    Reduce a JS stack trace to stable frames
+
+    Drops origins, query strings, bundle content hashes and line/column
+    numbers, so the same bug reported from different deploys, hosts and
+    minified builds yields the same frames.
+    """
+    frames = []
+    for line in (stack or '').splitlines():
+        line = line.strip()
+        if not line or ('at ' not in line and '@' not in line):
+            continue
+        line = _URL_PREFIX_RE.sub('', line)
+        line = _QUERY_RE.sub('', line)
+        line = _BUNDLE_HASH_RE.sub('', line)
+        line = _LOCATION_RE.sub('', line.rstrip(')')).strip()
+        frames.append(line)
+        if len(frames) == MAX_FINGERPRINT_FRAMES:
+            break
+    return frames
+
+
+def normalize_message(message):
+    """Mask ids and numbers that vary between occurrences of one error"""
+    message = _ID_RE.sub('<id>', message or '')
+    return _NUMBER_RE.sub('<n>', message)[:500]
+
+
+def fingerprint_error(error):
+    """Stable fingerprint for a ClientError: type + message + top frames"""
+    parts = [error.type or '', normalize_message(error.message)]
+    frames = normalize_stack(error.stack)
+    if not frames and error.source:
+        # Errors without a stack (resource/network) group by where they came from
+        frames = [_QUERY_RE.sub('', _URL_PREFIX_RE.sub('', error.source))]
+    parts.extend(frames)
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class ErrorGroup:
+    """Counters for one error fingerprint"""
+
+    __slots__ = ('fingerprint', 'type', 'message', 'count', 'interval_count', 'first_seen', 'last_seen')
+
+    def __init__(self, fingerprint, error, now):
+        self.fingerprint = fingerprint
+        self.type = error.type
+        self.message = normalize_message(error.message)
+        self.count = 0
+        self.interval_count = 0
+        self.first_seen = now
+        self.last_seen = now
+
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'type': self.type,
+            'message': self.message,
+            'count': self.count,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+
+class TelemetryIngestor:
+    """
+    In-memory aggregation of frontend RUM metrics and critical errors
+
+    Beacons are validated and folded into per (page, release, metric)
+    sketches. Errors are grouped by fingerprint: only the first occurrence
+    of a group is logged in full, repeats just bump counters. A background
+    thread logs one rollup per interval; cumulative sketches back the query
+    endpoint.
+    """
+
+    def __init__(self, config):
+        self.flush_interval = float(config.get('TELEMETRY_FLUSH_INTERVAL', 60))
+        self.max_keys = int(config.get('TELEMETRY_MAX_KEYS', 1000))
+        self.max_events = int(config.get('TELEMETRY_MAX_EVENTS', 50))
+        self.max_error_groups = int(config.get('TELEMETRY_MAX_ERROR_GROUPS', 1000))
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._totals = OrderedDict()
+        self._error_groups = OrderedDict()
+        self._rejected = 0
+        self._flusher = None
+        self._flusher_pid = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def ingest_metrics(self, payload):
+        """
+        Validate and aggregate a metrics beacon
+
+        Accepts a single event, a list of events, or {"metrics": [...]}.
+
+        Returns:
+            (accepted, rejected) counts
+        """
+        if isinstance(payload, dict) and isinstance(payload.get('metrics'), list):
+            payload = payload['metrics']
+        events = payload if isinstance(payload, list) else [payload]
+
+        accepted = []
+        rejected = max(len(events) - self.max_events, 0)
+        for raw in events[:self.max_events]:
+            try:
+                accepted.append(WebVitalEvent.model_validate(raw))
+            except ValidationError:
+                rejected += 1
+
+        with self._lock:
+            self._rejected += rejected
+            for event in accepted:
+                key = (normalize_page(event.url), event.release or 'unknown', event.metric)
+                self._sketch_pending(key).add(event.value)
+                self._sketch_total(key).add(event.value)
+
+        self._ensure_flusher()
+        return len(accepted), rejected
+
+    def ingest_error(self, payload):
+        """
+        Validate a critical error beacon and fold it into its error group
+
+        Raises:
+            ValidationError: If the payload doesn't match ClientErrorReport
+
+        Returns:
+            The error fingerprint
+        """
+        report = ClientErrorReport.model_validate(payload)
+        fingerprint = fingerprint_error(report.error)
+        now = time.time()
+
+        with self._lock:
+            group = self._error_groups.get(fingerprint)
+            is_new = group is None
+            if is_new:
+                if len(self._error_groups) >= self.max_error_groups:
+                    self._error_groups.popitem(last=False)
+                group = self._error_groups[fingerprint] = ErrorGroup(fingerprint, report.error, now)
+            else:
+                self._error_groups.move_to_end(fingerprint)
+            group.count += 1
+            group.interval_count += 1
+            group.last_seen = now
+
+        if is_new:
+            logger.error(
+                f"Frontend critical error: {report.error.message}",
+                extra={'fingerprint': fingerprint, 'report': report.model_dump(exclude_none=True)}
+            )
+
+        self._ensure_flusher()
+        return fingerprint
+
+    def _sketch_pending(self, key):
+        sketch = self._pending.get(key)
+        if sketch is None:
+            if len(self._pending) >= self.max_keys:
+                # Pages and releases come from the client; fold the excess
+                # into one bucket per metric rather than growing unbounded
+                key = (OTHER_PAGE, OTHER_PAGE, key[2])
+                sketch = self._pending.get(key)
+            if sketch is None:
+                sketch = self._pending[key] = DDSketch()
+        return sketch
+
+    def _sketch_total(self, key):
+        sketch = self._totals.get(key)
+        if sketch is None:
+            if len(self._totals) >= self.max_keys:
+                self._totals.popitem(last=False)
+            sketch = self._totals[key] = DDSketch()
+        else:
+            self._totals.move_to_end(key)
+        return sketch
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def vitals(self, page=None, release=None, quantile=0.75):
+        """
+        Quantiles for Core Web Vitals grouped by page and release
+
+        Returns:
+            List of {'page', 'release', '<metric>': {'count', 'value'}} dicts
+        """
+        grouped = {}
+        with self._lock:
+            for (key_page, key_release, metric), sketch in self._totals.items():
+                if page is not None and key_page != page:
+                    continue
+                if release is not None and key_release != release:
+                    continue
+                entry = grouped.setdefault((key_page, key_release), {
+                    'page': key_page, 'release': key_release
+                })
+                entry[metric] = {'count': sketch.count, 'value': _round(sketch.quantile(quantile))}
+        return list(grouped.values())
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Log one rollup for everything received since the last flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            rejected, self._rejected = self._rejected, 0
+            active_groups = []
+            for group in self._error_groups.values():
+                if group.interval_count:
+                    active_groups.append((group.to_dict(), group.interval_count))
+                    group.interval_count = 0
+
+        if pending or rejected:
+            rollup = [
+                {'page': page, 'release': release, 'metric': metric, **sketch.summary()}
+                for (page, release, metric), sketch in pending.items()
+            ]
+            logger.info("Frontend metrics rollup", extra={'rollup': rollup, 'rejected': rejected})
+
+        if active_groups:
+            minutes = self.flush_interval / 60
+            summary = [
+                {**group, 'interval_count': count, 'per_minute': round(count / minutes, 2)}
+                for group, count in active_groups
+            ]
+            logger.warning(
+                f"Frontend critical errors: {sum(count for _, count in active_groups)} "
+                f"in {len(active_groups)} groups",
+                extra={'error_groups': summary}
+            )
+
+    def _ensure_flusher(self):
+        # Started lazily (and restarted after fork) so each gunicorn worker
+        # owns its own flush thread
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._run, name='telemetry-flush', daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Telemetry flush failed: {str(e)}")
+
+    def stop(self):
+        """Stop the flush thread and write out anything still buffered"""
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,366 @@
+"""
+Tenant Context Cache
+Loads each tenant's receptionist prompt, business info and knowledge base
+once and keeps the assembled prompt (and the PWA bootstrap document) in a
+bounded LRU, refreshed in the background, so per-message prompt assembly
+never hits storage
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.prompt_registry import PromptBundle
+
+logger = logging.getLogger(__name__)
+
+TENANT_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class FileTenantSource:
+    """
+    Tenant data stored as ``<directory>/<tenant_id>.json``
+
+    Expected keys (all optional): ``prompt``, ``business_info`` (str or
+    dict), ``knowledge`` and ``generation`` (profile overrides), plus the
+    PWA presentation keys (``branding``, ``media_slots``, ``services``,
+    ``business_hours``, ``contact_info``, ``ai_assistant``...). Any
+    callable with the same signature (e.g. a database lookup) can be used
+    as a source instead.
+    """
+
+    def __init__(self, directory, index_ttl=300):
+        self.directory = directory
+        self.index_ttl = index_ttl
+        self._index = None  # subdomain -> tenant_id
+        self._indexed_at = 0
+        self._index_lock = threading.Lock()
+
+    def __call__(self, tenant_id):
+        if not TENANT_ID_RE.match(tenant_id):
+            return None
+        path = os.path.join(self.directory, f'{tenant_id}.json')
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def tenant_for_subdomain(self, subdomain):
+        """tenant_id of the file whose ``subdomain`` (default: its tenant_id) matches, or None"""
+        if not TENANT_ID_RE.match(subdomain):
+            return None
+        with self._index_lock:
+            if self._index is None or time.time() - self._indexed_at >= self.index_ttl:
+                self._index = self._build_index()
+                self._indexed_at = time.time()
+            return self._index.get(subdomain)
+
+    def invalidate(self):
+        """Rebuild the subdomain index on the next lookup"""
+        with self._index_lock:
+            self._index = None
+
+    def _build_index(self):
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return {}
+        index = {}
+        for name in names:
+            tenant_id, ext = os.path.splitext(name)
+            if ext != '.json' or not TENANT_ID_RE.match(tenant_id):
+                continue
+            try:
+                data = self(tenant_id)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping tenant file {name} in subdomain index: {e}")
+                continue
+            if isinstance(data, dict):
+                index.setdefault(data.get('subdomain', tenant_id), tenant_id)
+        return index
+
+
+class RedisTenantInvalidation:
+    """
+    Broadcasts tenant invalidations to every worker over Redis pub/sub
+
+    Each process subscribes once (after fork, on its first cache lookup) and
+    drops the tenant from its own cache when a message arrives.
+    """
+
+    CHANNEL = 'tenant-context:invalidate'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def publish(self, tenant_id):
+        self.client.publish(self.CHANNEL, tenant_id)
+
+    def subscribe(self, callback):
+        """Call ``callback(tenant_id)`` for every invalidation (once per process)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.CHANNEL: lambda message: callback(message['data'].decode('utf-8'))})
+                pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except Exception as e:
+                # Entries still expire after TENANT_CACHE_REFRESH/TTL
+                logger.warning(f"Tenant invalidation subscribe failed: {e}")
+
+
+# Rendered by src/js/tenant-loader.js from the ``branding`` object
+PRESENTATION_KEYS = ('media_slots', 'services', 'business_hours', 'contact_info', 'social_links', 'features')
+
+
+class TenantContext:
+    """A tenant's assembled system prompt, generation profile and bootstrap document"""
+
+    __slots__ = ('tenant_id', 'prompt', 'profile', 'business_name', 'loaded_at', 'bootstrap', 'etag')
+
+    def __init__(self, tenant_id, prompt, profile, business_name, loaded_at, bootstrap=b'{}', etag=None):
+        self.tenant_id = tenant_id
+        self.prompt = prompt
+        self.profile = profile
+        self.business_name = business_name
+        self.loaded_at = loaded_at
+        self.bootstrap = bootstrap
+        self.etag = etag
+
+
+def _format_business_info(info):
+    if isinstance(info, dict):
+        return '\n'.join(f"- {key.replace('_', ' ').title()}: {value}" for key, value in info.items())
+    return str(info)
+
+
+def build_tenant_context(tenant_id, data, registry, profiles):
+    """Assemble a TenantContext from raw tenant data"""
+    sections = [data.get('prompt') or registry.get('receptionist').text]
+    if data.get('business_info'):
+        sections.append("## BUSINESS INFORMATION\n" + _format_business_info(data['business_info']))
+    if data.get('knowledge'):
+        sections.append("## KNOWLEDGE BASE\n" + data['knowledge'])
+
+    profile = profiles.resolve('receptionist', tenant_id).with_overrides(data.get('generation') or {})
+    prompt = PromptBundle(f'receptionist:{tenant_id}', '\n\n'.join(sections), profile.to_dict())
+
+    business_info = data.get('business_info')
+    business_name = business_info.get('name') if isinstance(business_info, dict) else None
+
+    bootstrap = json.dumps(build_tenant_bootstrap(tenant_id, data), sort_keys=True,
+                           separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(bootstrap).hexdigest()[:20]
+    return TenantContext(tenant_id, prompt, profile, business_name, time.time(), bootstrap, etag)
+
+
+def build_tenant_bootstrap(tenant_id, data):
+    """
+    Everything the PWA needs for first paint, in one document
+
+    Branding, media slots, services, hours and contact info are merged into
+    ``branding`` (what tenant-loader.js renders); the chat greeting goes in
+    ``ai_assistant``. Services and hours fall back to ``business_info``.
+    """
+    business_info = data.get('business_info') if isinstance(data.get('business_info'), dict) else {}
+    business_name = data.get('business_name') or business_info.get('name')
+
+    branding = dict(data.get('branding') or {})
+    for key in PRESENTATION_KEYS:
+        value = data.get(key)
+        if value is None and key == 'services':
+            value = business_info.get('services')
+        elif value is None and key == 'business_hours':
+            value = business_info.get('business_hours', business_info.get('hours'))
+        if value is not None:
+            branding.setdefault(key, value)
+    if business_name:
+        branding.setdefault('business_name', business_name)
+
+    assistant = dict(data.get('ai_assistant') or {})
+    assistant.setdefault('greeting', data.get('greeting') or (
+        f"Hi! Welcome to {business_name}! How can I help you today?" if business_name
+        else "Hi! How can I help you today?"
+    ))
+
+    return {
+        'tenant_id': tenant_id,
+        'subdomain': data.get('subdomain', tenant_id),
+        'business_name': business_name,
+        'branding': branding,
+        'ai_assistant': assistant,
+    }
+
+
+class TenantContextCache:
+    """
+    Bounded LRU of TenantContexts with stale-while-revalidate refresh
+
+    Entries older than ``refresh_after`` are served as-is while a background
+    reload runs; entries older than ``ttl`` (or missing) load synchronously,
+    once per tenant however many requests miss at the same time. Unknown
+    tenant ids (which clients choose) are remembered for ``negative_ttl``
+    seconds in a separate LRU, so they can't evict real tenants.
+
+    Each worker has its own cache; with ``broadcast`` (a
+    RedisTenantInvalidation) ``invalidate`` reaches all of them.
+    """
+
+    def __init__(self, source, registry, profiles, max_size=256, refresh_after=300, ttl=3600, negative_ttl=60,
+                 negative_max_size=1024, broadcast=None):
+        self.source = source
+        self.registry = registry
+        self.profiles = profiles
+        self.max_size = max_size
+        self.refresh_after = refresh_after
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.negative_max_size = negative_max_size
+        self.broadcast = broadcast
+
+        self._entries = OrderedDict()  # tenant_id -> (TenantContext, loaded_at)
+        self._missing = OrderedDict()  # unknown tenant_id -> checked_at
+        self._loading = {}  # tenant_id -> Future of the load in progress
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+        self._executor_pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tenant_id):
+        """
+        Get a tenant's context
+
+        Returns:
+            TenantContext, or None if the tenant doesn't exist
+        """
+        if self.broadcast is not None:
+            self.broadcast.subscribe(self._drop)
+        now = time.time()
+        future = None
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(tenant_id)
+                self.hits += 1
+                context, loaded_at = entry
+                if now - loaded_at < self.refresh_after:
+                    return context
+            elif entry is None and now - self._missing.get(tenant_id, float('-inf')) < self.negative_ttl:
+                self.hits += 1
+                return None
+            else:
+                self.misses += 1
+                future = self._loading.get(tenant_id)
+                leader = future is None
+                if leader:
+                    future = self._loading[tenant_id] = Future()
+
+        if future is None:
+            # Stale but within ttl: serve it, reload in the background
+            self._schedule_refresh(tenant_id)
+            return context
+        if not leader:
+            return future.result()
+        try:
+            context = self._load(tenant_id)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(tenant_id, None)
+        future.set_result(context)
+        return context
+
+    def get_by_subdomain(self, subdomain):
+        """
+        Get a tenant's context by its PWA subdomain
+
+        Sources without ``tenant_for_subdomain`` use the subdomain as the
+        tenant_id.
+
+        Returns:
+            TenantContext, or None if no tenant has that subdomain
+        """
+        resolve = getattr(self.source, 'tenant_for_subdomain', None)
+        tenant_id = resolve(subdomain) if resolve else subdomain
+        return self.get(tenant_id) if tenant_id else None
+
+    def invalidate(self, tenant_id):
+        """Drop a tenant in every worker so its next request reloads (call after tenant edits)"""
+        self._drop(tenant_id)
+        if self.broadcast is not None:
+            try:
+                self.broadcast.publish(tenant_id)
+            except Exception as e:
+                logger.error(f"Tenant invalidation broadcast failed for {tenant_id}: {e}")
+
+    def _drop(self, tenant_id):
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+            self._missing.pop(tenant_id, None)
+        # The tenant's subdomain may have changed, or the tenant may be new
+        invalidate = getattr(self.source, 'invalidate', None)
+        if invalidate is not None:
+            invalidate()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'unknown': len(self._missing), 'hits': self.hits,
+                    'misses': self.misses}
+
+    def _load(self, tenant_id):
+        data = self.source(tenant_id)
+        context = build_tenant_context(tenant_id, data, self.registry, self.profiles) if data else None
+
+        with self._lock:
+            if context is None:
+                self._entries.pop(tenant_id, None)
+                self._missing[tenant_id] = time.time()
+                self._missing.move_to_end(tenant_id)
+                while len(self._missing) > self.negative_max_size:
+                    self._missing.popitem(last=False)
+            else:
+                self._missing.pop(tenant_id, None)
+                self._entries[tenant_id] = (context, time.time())
+                self._entries.move_to_end(tenant_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        if context is not None:
+            logger.info(f"Tenant context loaded: {tenant_id} prompt v{context.prompt.version}")
+        return context
+
+    def _schedule_refresh(self, tenant_id):
+        with self._lock:
+            if tenant_id in self._refreshing:
+                return
+            self._refreshing.add(tenant_id)
+            # Executors don't survive fork; each worker gets its own
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tenant-refresh')
+                self._executor_pid = os.getpid()
+        self._executor.submit(self._refresh, tenant_id)
+
+    def _refresh(self, tenant_id):
+        try:
+            self._load(tenant_id)
+        except Exception as e:
+            # Keep serving the stale entry until ttl
+            logger.error(f"Tenant refresh failed for {tenant_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(tenant_id)
@@ -0,0 +1,212 @@
+"""
+Tool Execution Service
+Runs CRM tools (availability, bookings, customer lookup, business info) for
+the chat widget and the voice agent, singly or as a batch where independent
+read-only tools run concurrently
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Tool name -> (handler, read_only)
+TOOLS = {}
+
+
+def tool(*names, read_only=True):
+    """
+    Register a tool handler under one or more names
+
+    Handlers take ``(tenant_id, parameters, context)`` and return a dict.
+    ``read_only`` tools may run concurrently within a batch; others run
+    alone, in request order.
+    """
+    def decorator(fn):
+        for name in names:
+            TOOLS[name] = (fn, read_only)
+        return fn
+    return decorator
+
+
+class UnknownToolError(KeyError):
+    """No tool is registered under the requested name"""
+
+
+class ToolContext:
+    """Per-request state shared by the tools of one call or batch"""
+
+    def __init__(self, from_number=None):
+        self.from_number = from_number
+        self._memo = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def memo(self, key, load):
+        """``load()`` once per batch (e.g. business context used by several tools)"""
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._memo:
+                self._memo[key] = load()
+            return self._memo[key]
+
+
+class ToolService:
+    """Dispatches tool calls to registered handlers"""
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool')
+
+    def execute(self, tenant_id, tool_name, parameters=None, context=None):
+        """
+        Run one tool
+
+        Raises:
+            UnknownToolError: If no tool is registered under ``tool_name``
+        """
+        if tool_name not in TOOLS:
+            raise UnknownToolError(tool_name)
+        handler, _ = TOOLS[tool_name]
+        return handler(tenant_id, parameters or {}, context or ToolContext())
+
+    def execute_batch(self, tenant_id, calls, context=None):
+        """
+        Run a batch of tool calls
+
+        Consecutive read-only tools run concurrently on the pool; a tool that
+        writes waits for everything before it and runs alone, so bookings
+        still see the effects of earlier calls in the batch.
+
+        Args:
+            calls: List of dicts with 'tool_name' and 'parameters'
+
+        Returns:
+            Results in request order, each with tool_name, success, data or
+            error, and duration_ms
+        """
+        context = context or ToolContext()
+        results = [None] * len(calls)
+        pending = []  # (index, future) of the current concurrent group
+
+        for index, call in enumerate(calls):
+            read_only = TOOLS.get(call['tool_name'], (None, True))[1]
+            if not read_only:
+                self._collect(pending, results)
+                results[index] = self._timed(tenant_id, call, context)
+            else:
+                pending.append((index, self._executor.submit(self._timed, tenant_id, call, context)))
+        self._collect(pending, results)
+        return results
+
+    @staticmethod
+    def _collect(pending, results):
+        for index, future in pending:
+            results[index] = future.result()
+        pending.clear()
+
+    def _timed(self, tenant_id, call, context):
+        tool_name = call['tool_name']
+        start = time.perf_counter()
+        try:
+            data = self.execute(tenant_id, tool_name, call.get('parameters'), context)
+            outcome = {'tool_name': tool_name, 'success': not (isinstance(data, dict) and data.get('error')),
+                       'data': data}
+        except UnknownToolError:
+            outcome = {'tool_name': tool_name, 'success': False, 'error': f'Unknown tool: {tool_name}'}
+        except Exception as e:
+            logger.error(f"Tool {tool_name} failed for tenant {tenant_id}: {str(e)}", exc_info=True)
+            outcome = {'tool_name': tool_name, 'success': False, 'error': 'Tool execution failed'}
+        outcome['duration_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return outcome
+
+
+# ============================================
+# CRM TOOLS
+# ============================================
+
+def _business_context(tenant_id, context):
+    from .tools.business_tools import BusinessTools
+    return context.memo(('business_context', tenant_id), lambda: BusinessTools.get_business_context(tenant_id))
+
+
+@tool('check_availability')
+def check_availability(tenant_id, parameters, context):
+    from .tools.appointment_tools import AppointmentTools
+    return AppointmentTools.check_availability(
+        tenant_id,
+        parameters.get('date'),
+        parameters.get('service_id')
+    )
+
+
+@tool('book_appointment', read_only=False)
+def book_appointment(tenant_id, parameters, context):
+    from .tools.appointment_tools import AppointmentTools
+    from .tools.customer_tools import CustomerTools
+
+    # First get or create customer
+    customer_phone = parameters.get('customer_phone', context.from_number)
+    customer_name = parameters.get('customer_name', '')
+
+    # Parse name
+    name_parts = customer_name.split(' ', 1) if customer_name else ['', '']
+    first_name = name_parts[0] if name_parts else ''
+    last_name = name_parts[1] if len(name_parts) > 1 else ''
+
+    # Create/update customer
+    customer_result = CustomerTools.create_or_update_customer(
+        tenant_id,
+        customer_phone,
+        first_name,
+        last_name,
+        parameters.get('email')
+    )
+
+    # The chat widget sends one ISO appointment_date instead of date + time
+    date, time_of_day = parameters.get('date'), parameters.get('time')
+    if not date and parameters.get('appointment_date'):
+        date, _, time_of_day = parameters['appointment_date'].partition('T')
+
+    # Book appointment
+    return AppointmentTools.book_appointment(
+        tenant_id,
+        customer_result['customer_id'],
+        parameters.get('service_id'),
+        date,
+        time_of_day,
+        parameters.get('notes')
+    )
+
+
+@tool('get_customer_info', 'lookup_customer')
+def get_customer_info(tenant_id, parameters, context):
+    from .tools.customer_tools import CustomerTools
+    phone = parameters.get('phone', context.from_number)
+    return CustomerTools.get_customer_info(tenant_id, phone)
+
+
+@tool('get_business_info')
+def get_business_info(tenant_id, parameters, context):
+    return _business_context(tenant_id, context)
+
+
+@tool('get_services')
+def get_services(tenant_id, parameters, context):
+    return {'services': _business_context(tenant_id, context).get('services', [])}
+
+
+@tool('get_business_hours')
+def get_business_hours(tenant_id, parameters, context):
+    return {'business_hours': _business_context(tenant_id, context).get('business_hours', [])}
+
+
+@tool('cancel_appointment', read_only=False)
+def cancel_appointment(tenant_id, parameters, context):
+    from .tools.appointment_tools import AppointmentTools
+    return AppointmentTools.cancel_appointment(
+        tenant_id,
+        parameters.get('appointment_id')
+    )
@@ -2,14 +2,15 @@
 Webhook Handlers for ElevenLabs and Vonage
 Connects voice calls to database operations
 """
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, current_app
 import logging
 import json
 from datetime import datetime
 from .middleware import require_tenant
+from .ingress import body_limit
 from .database import db, run_async
-from .tools.customer_tools import CustomerTools
-from .tools.appointment_tools import AppointmentTools
+from .jobs import task
+from .tool_service import ToolContext, UnknownToolError
 
 logger = logging.getLogger(__name__)
 
@@ -169,89 +170,23 @@ def elevenlabs_tool_call():
     
     # Route to appropriate tool handler
     try:
-        result = None
-        
-        if tool_name == 'check_availability':
-            from .tools.appointment_tools import AppointmentTools
-            result = AppointmentTools.check_availability(
-                tenant_id,
-                parameters.get('date'),
-                parameters.get('service_id')
-            )
-        
-        elif tool_name == 'book_appointment':
-            from .tools.appointment_tools import AppointmentTools
-            
-            # First get or create customer
-            customer_phone = parameters.get('customer_phone', from_number)
-            customer_name = parameters.get('customer_name', '')
-            
-            # Parse name
-            name_parts = customer_name.split(' ', 1) if customer_name else ['', '']
-            first_name = name_parts[0] if name_parts else ''
-            last_name = name_parts[1] if len(name_parts) > 1 else ''
-            
-            # Create/update customer
-            customer_result = CustomerTools.create_or_update_customer(
-                tenant_id,
-                customer_phone,
-                first_name,
-                last_name,
-                parameters.get('email')
-            )
-            
-            # Book appointment
-            result = AppointmentTools.book_appointment(
-                tenant_id,
-                customer_result['customer_id'],
-                parameters.get('service_id'),
-                parameters.get('date'),
-                parameters.get('time'),
-                parameters.get('notes')
-            )
-        
-        elif tool_name == 'get_customer_info':
-            phone = parameters.get('phone', from_number)
-            result = CustomerTools.get_customer_info(tenant_id, phone)
-        
-        elif tool_name == 'get_business_info':
-            from .tools.business_tools import BusinessTools
-            result = BusinessTools.get_business_context(tenant_id)
-        
-        elif tool_name == 'cancel_appointment':
-            from .tools.appointment_tools import AppointmentTools
-            result = AppointmentTools.cancel_appointment(
-                tenant_id,
-                parameters.get('appointment_id')
+        try:
+            result = current_app.tool_service.execute(
+                tenant_id, tool_name, parameters, ToolContext(from_number=from_number)
             )
-        
-        else:
+        except UnknownToolError:
             logger.warning(f"Unknown tool: {tool_name}")
             result = {'error': f'Unknown tool: {tool_name}'}
         
-        # Log tool execution
+        # Log tool execution (in the background; the agent is waiting on the result)
         if call_id:
-            log_query = """
-                INSERT INTO tool_executions (
-                    call_id,
-                    tenant_id,
-                    tool_name,
-                    parameters,
-                    response,
-                    status
-                ) VALUES ($1, $2, $3, $4, $5, $6)
-            """
-            
-            run_async(
-                db.execute(
-                    log_query,
-                    call_id,
-                    tenant_id,
-                    tool_name,
-                    json.dumps(parameters),
-                    json.dumps(result),
-                    'success' if not result.get('error') else 'failed'
-                )
+            current_app.job_queue.enqueue(
+                'log_tool_execution',
+                call_id=call_id,
+                tenant_id=tenant_id,
+                tool_name=tool_name,
+                parameters=parameters,
+                result=result
             )
         
         return jsonify(result)
@@ -282,6 +217,7 @@ def conversation_started():
     return jsonify({'status': 'ok'})
 
 @webhooks_bp.route('/webhooks/elevenlabs/conversation-turn', methods=['POST'])
+@body_limit('WEBHOOK_MAX_BODY_BYTES')  # transcripts
 def conversation_turn():
     """Store conversation transcript"""
     data = request.json
@@ -327,6 +263,7 @@ def conversation_turn():
     return jsonify({'status': 'ok'})
 
 @webhooks_bp.route('/webhooks/elevenlabs/conversation-ended', methods=['POST'])
+@body_limit('WEBHOOK_MAX_BODY_BYTES')  # transcripts
 def conversation_ended():
     """Handle conversation end event"""
     data = request.json
@@ -362,44 +299,95 @@ def conversation_ended():
     )
     
     if call_info:
-        # Update usage tracking
-        minutes = (duration + 59) // 60  # Round up to nearest minute
-        usage_query = """
-            UPDATE usage_tracking
-            SET total_minutes = total_minutes + $1
-            WHERE tenant_id = $2
-                AND billing_month = DATE_TRUNC('month', CURRENT_DATE)
-        """
-        
-        run_async(db.execute(usage_query, minutes, call_info['tenant_id']))
-        
-        # Calculate costs
-        elevenlabs_cost = minutes * 0.02  # Business plan rate
-        vonage_cost = minutes * 0.012
-        
-        cost_query = """
-            UPDATE calls
-            SET elevenlabs_cost = $1,
-                vonage_cost = $2,
-                total_cost = $3
-            WHERE call_id = $4
-        """
-        
-        run_async(
-            db.execute(
-                cost_query,
-                elevenlabs_cost,
-                vonage_cost,
-                elevenlabs_cost + vonage_cost,
-                call_info['call_id']
-            )
+        # Cost and usage updates don't affect the response; run them in the background
+        current_app.job_queue.enqueue(
+            'record_call_usage',
+            call_id=call_info['call_id'],
+            tenant_id=call_info['tenant_id'],
+            duration=duration
         )
-        
-        logger.info(f"Call completed: {call_info['call_id']}, Duration: {duration}s, Cost: ${elevenlabs_cost + vonage_cost:.2f}")
+        logger.info(f"Call completed: {call_info['call_id']}, Duration: {duration}s")
     
     return jsonify({'status': 'ok'})
 
+# ============================================
+# BACKGROUND JOBS
+# ============================================
+
+@task('log_tool_execution')
+def log_tool_execution(call_id, tenant_id, tool_name, parameters, result):
+    """Record a tool execution for the call's audit trail"""
+    log_query = """
+        INSERT INTO tool_executions (
+            call_id,
+            tenant_id,
+            tool_name,
+            parameters,
+            response,
+            status
+        ) VALUES ($1, $2, $3, $4, $5, $6)
+    """
+    
+    run_async(
+        db.execute(
+            log_query,
+            call_id,
+            tenant_id,
+            tool_name,
+            json.dumps(parameters),
+            json.dumps(result),
+            'success' if not result.get('error') else 'failed'
+        )
+    )
+
+@task('record_call_usage')
+def record_call_usage(call_id, tenant_id, duration):
+    """
+    Set the call's costs and add its minutes to the tenant's monthly usage
+
+    The cost update is idempotent and runs first; the usage increment is the
+    last statement, so a retry never counts the minutes twice.
+    """
+    minutes = (duration + 59) // 60  # Round up to nearest minute
+    
+    # Calculate costs
+    elevenlabs_cost = minutes * 0.02  # Business plan rate
+    vonage_cost = minutes * 0.012
+    
+    cost_query = """
+        UPDATE calls
+        SET elevenlabs_cost = $1,
+            vonage_cost = $2,
+            total_cost = $3
+        WHERE call_id = $4
+    """
+    
+    run_async(
+        db.execute(
+            cost_query,
+            elevenlabs_cost,
+            vonage_cost,
+            elevenlabs_cost + vonage_cost,
+            call_id
+        )
+    )
+    
+    # Update usage tracking
+    usage_query = """
+        UPDATE usage_tracking
+        SET total_minutes = total_minutes + $1
+        WHERE tenant_id = $2
+            AND billing_month = DATE_TRUNC('month', CURRENT_DATE)
+    """
+    
+    run_async(db.execute(usage_query, minutes, tenant_id))
+    
+    logger.info(f"Call usage recorded: {call_id}, {minutes} min, Cost: ${elevenlabs_cost + vonage_cost:.2f}")
+
 # Register blueprint
 def init_webhooks(app):
     """Initialize webhook routes"""
+    # Vonage and ElevenLabs can't send CSRF tokens
+    if 'csrf' in app.extensions:
+        app.extensions['csrf'].exempt(webhooks_bp)
     app.register_blueprint(webhooks_bp)
\ No newline at end of file
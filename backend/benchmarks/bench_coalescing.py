@@ -0,0 +1,79 @@
+"""
+Request coalescing benchmark
+
+Simulates a campaign burst: concurrent visitors send the same first message
+within a short window. Compares provider calls and visitor-side latency
+with coalescing off and in local (single-worker) mode.
+
+Usage (from backend/):
+    python -m benchmarks.bench_coalescing [--visitors 50] [--window 2.0]
+"""
+import argparse
+import random
+import threading
+import time
+
+from app.coalescing import Coalescer, coalesce_key
+from app.generation_profiles import ProfileStore
+from app.llm_service import LLMService
+from app.prompt_registry import build_default_registry
+from benchmarks.fake_provider import install_fakes
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run(mode, args):
+    registry = build_default_registry()
+    profile = ProfileStore(registry, modes=('sales',)).resolve('sales')
+    messages = [{'role': 'system', 'content': registry.get('sales').text}, {'role': 'user', 'content': 'hi'}]
+    llm_service = install_fakes(LLMService({}), time_scale=args.time_scale)
+    coalescer = Coalescer(mode)
+    key = coalesce_key('openai', None, profile, messages)
+
+    ttfts, totals = [], []
+    lock = threading.Lock()
+
+    def visitor(delay):
+        time.sleep(delay)
+        start = time.perf_counter()
+        ttft = None
+        for event in coalescer.stream(key, lambda: llm_service.chat_openai(messages, stream=True, profile=profile)):
+            if event['type'] == 'chunk' and ttft is None:
+                ttft = time.perf_counter() - start
+        with lock:
+            ttfts.append(ttft / args.time_scale)
+            totals.append((time.perf_counter() - start) / args.time_scale)
+
+    rng = random.Random(args.seed)
+    threads = [threading.Thread(target=visitor, args=(rng.uniform(0, args.window) * args.time_scale,))
+               for _ in range(args.visitors)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return llm_service._openai_client.calls, ttfts, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Request coalescing benchmark')
+    parser.add_argument('--visitors', type=int, default=50)
+    parser.add_argument('--window', type=float, default=2.0, help='Seconds over which the visitors arrive')
+    parser.add_argument('--time-scale', type=float, default=0.1,
+                        help='Fraction of simulated latency actually slept (results are rescaled)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.visitors} identical first messages over {args.window}s "
+          f"(latency rescaled from time-scale {args.time_scale})")
+    print(f"{'mode':<8}{'provider calls':>16}{'ttft p50 s':>12}{'ttft p95 s':>12}{'total p50 s':>13}")
+    for mode in ('off', 'local'):
+        calls, ttfts, totals = run(mode, args)
+        print(f"{mode:<8}{calls:>16}{percentile(ttfts, 0.5):>12.2f}{percentile(ttfts, 0.95):>12.2f}"
+              f"{percentile(totals, 0.5):>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
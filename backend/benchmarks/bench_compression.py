@@ -0,0 +1,92 @@
+"""
+Response compression benchmark
+
+Reports bytes on the wire and CPU time per response for the payload shapes
+the API actually sends: the /api/models listing, a full non-streamed chat
+reply, and an SSE token stream compressed frame-by-frame (flushed after
+every event so latency is unchanged).
+
+Usage (from backend/):
+    python -m benchmarks.bench_compression [--iterations 200]
+"""
+import argparse
+import json
+import time
+
+from app.compression import StreamCompressor, compress_body, brotli
+
+REPLY = (
+    "Totally get it. Quick question though - what are you dealing with right now? "
+    "Missed calls? Staff issues? Helps me frame whether this even makes sense for you. "
+) * 12
+
+
+def models_payload():
+    models = {
+        'openai': [{'id': f'gpt-4-variant-{i}', 'name': f'GPT-4 Variant {i}', 'available': True} for i in range(10)],
+        'claude': [{'id': f'claude-3-variant-{i}', 'name': f'Claude 3 Variant {i}', 'available': True} for i in range(10)],
+    }
+    return json.dumps(models).encode()
+
+
+def chat_payload():
+    return json.dumps({
+        'message': REPLY,
+        'model': 'gpt-4o',
+        'usage': {'prompt_tokens': 2100, 'completion_tokens': 240, 'total_tokens': 2340},
+    }).encode()
+
+
+def sse_frames():
+    frames = [
+        f"data: {json.dumps({'type': 'chunk', 'content': word + ' ', 'model': 'gpt-4o'})}\n\n".encode()
+        for word in REPLY.split()
+    ]
+    frames.append(f"data: {json.dumps({'type': 'done', 'model': 'gpt-4o', 'usage': None})}\n\n".encode())
+    return frames
+
+
+def bench_body(data, encoding, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        out = compress_body(data, encoding)
+    return len(out), (time.process_time() - start) / iterations
+
+
+def bench_stream(frames, encoding, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        compressor = StreamCompressor(encoding)
+        size = sum(len(compressor.compress(frame)) for frame in frames) + len(compressor.finish())
+    return size, (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Response compression benchmark')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    bodies = [('/api/models', models_payload()), ('/api/chat reply', chat_payload())]
+    frames = sse_frames()
+
+    print(f"{'payload':<24}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}")
+    for name, data in bodies:
+        print(f"{name:<24}{'identity':<10}{len(data):>10}{1:>8.2f}{0:>10.3f}")
+        for encoding in encodings:
+            size, cpu = bench_body(data, encoding, args.iterations)
+            print(f"{name:<24}{encoding:<10}{size:>10}{size / len(data):>8.2f}{cpu * 1000:>10.3f}")
+
+    raw = sum(len(frame) for frame in frames)
+    name = f'SSE ({len(frames)} frames)'
+    print(f"{name:<24}{'identity':<10}{raw:>10}{1:>8.2f}{0:>10.3f}")
+    for encoding in encodings:
+        size, cpu = bench_stream(frames, encoding, args.iterations)
+        print(f"{name:<24}{encoding:<10}{size:>10}{size / raw:>8.2f}{cpu * 1000:>10.3f}")
+
+    if brotli is None:
+        print("\nbrotli not installed; only gzip measured")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark: memory per chat request for large histories
+
+Measures with tracemalloc, for a 50-message history of up to 50 000
+characters each (the ChatRequest limits):
+
+    peak      the body plus everything allocated while parsing it and
+              building the provider messages (OpenAI list and Anthropic
+              conversion)
+    call      still allocated while the provider call runs
+    stream    still pinned after the provider request is sent, for the
+              rest of an SSE stream
+
+``legacy`` is the previous path: ``json.loads`` -> Pydantic ``Message``
+models -> ``model_dump()`` dicts -> a new list with the system message
+prepended -> the Claude path filtering it again, with the body and the
+messages referenced until the request ends. ``current`` is the chat
+pipeline (validate -> build_messages) and ``LLMService``'s conversion.
+The SDK's own JSON encoding of the request is the same for both and is
+not included.
+
+Usage (from backend/):
+    python -m benchmarks.bench_messages [--messages 50] [--content-chars 50000]
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from app.chat_pipeline import ChatContext, build_messages_stage, validate_stage
+from app.llm_service import _to_anthropic_messages
+from app.prompt_registry import PromptBundle
+
+
+class LegacyMessage(BaseModel):
+    role: Literal['system', 'user', 'assistant']
+    content: str = Field(..., min_length=1, max_length=50000)
+
+
+class LegacyChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=5000)
+    provider: Optional[str] = 'openai'
+    history: Optional[List[LegacyMessage]] = Field(default_factory=list)
+
+
+PROMPT = PromptBundle('sales', 'You are Aveena, a friendly sales assistant. ' * 40, {})
+
+
+def build_body(messages, content_chars, non_ascii=False):
+    base = 'So we get maybe 50-70 calls a day and miss a lot of them after hours. '
+    if non_ascii:
+        base = base.replace('calls', 'calls — été \U0001F4DE')
+    history = [
+        {'role': 'user' if i % 2 == 0 else 'assistant',
+         'content': f'{i} ' + (base * (content_chars // len(base) + 1))[:content_chars - len(str(i)) - 1]}
+        for i in range(messages)
+    ]
+    return json.dumps({'message': 'How much does it cost?', 'provider': 'claude', 'history': history},
+                      ensure_ascii=False).encode('utf-8')
+
+
+def legacy(body):
+    """Returns (held during the call, held during a stream)"""
+    data = json.loads(body)
+    req = LegacyChatRequest.model_validate(data)
+    messages = [{'role': 'system', 'content': PROMPT.text}]
+    messages.extend(msg.model_dump() for msg in req.history)
+    messages.append({'role': 'user', 'content': req.message})
+    system = next(m['content'] for m in messages if m['role'] == 'system')
+    user_messages = [m for m in messages if m['role'] != 'system']
+    return (body, data, req, messages, system, user_messages), (messages,)
+
+
+def current(body):
+    ctx = ChatContext(body)
+    validate_stage(ctx)
+    ctx.prompt = PROMPT
+    build_messages_stage(ctx)
+    system, user_messages = _to_anthropic_messages(ctx.messages)
+    # chat_stream drops its messages once the provider request is sent
+    return (ctx, system, user_messages), ()
+
+
+def measure(fn, body):
+    """(peak, held during the call, held during a stream) in bytes, body included"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    # A traced copy that only fn references, as in the route after read_body()
+    bodies = [bytes(bytearray(body))]
+    tracemalloc.reset_peak()
+    held_call, held_stream = fn(bodies.pop())
+    gc.collect()
+    call, peak = tracemalloc.get_traced_memory()
+    call -= base
+    del held_call
+    gc.collect()
+    stream = tracemalloc.get_traced_memory()[0] - base
+    del held_stream
+    tracemalloc.stop()
+    return peak - base, call, stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory per chat request with tracemalloc')
+    parser.add_argument('--messages', type=int, default=50)
+    parser.add_argument('--content-chars', type=int, default=50000)
+    args = parser.parse_args()
+
+    body = build_body(2, 40)
+    assert legacy(body)[0][3] == current(body)[0][0].messages
+
+    print(f"{args.messages}-message history, {args.content_chars} chars/message")
+    print(f"{'text':<10}{'body KB':>9}{'path':>9}{'peak KB':>10}{'call KB':>10}{'stream KB':>11}")
+    for non_ascii in (False, True):
+        body = build_body(args.messages, args.content_chars, non_ascii)
+        text = sum(sys.getsizeof(m['content']) for m in json.loads(body)['history']) / 1024
+        for name, fn in (('legacy', legacy), ('current', current)):
+            peak, call, stream = measure(fn, body)
+            print(f"{'non-ascii' if non_ascii else 'ascii':<10}{len(body) / 1024:>9.0f}{name:>9}"
+                  f"{peak / 1024:>10.0f}{call / 1024:>10.0f}{stream / 1024:>11.0f}")
+        print(f"{'':<10}history text as str objects: {text:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Prompt layout / prefix cache benchmark
+
+Plays multi-turn sales conversations, mixing turns that do and don't trigger
+company knowledge, through the chat pipeline in each prompt layout and the
+real LLMService against fake providers that model prefix caching. Reports
+the cached share of prompt tokens, how often a conversation's system prompt
+changed, and time-to-first-token on first vs follow-up turns.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prefix_cache [--conversations 10] [--turns 10] [--provider claude]
+"""
+import argparse
+import json
+import time
+
+from app.chat_pipeline import (
+    ChatPipeline,
+    PROMPT_LAYOUTS,
+    build_messages_stage,
+    make_retrieve_stage,
+    validate_stage,
+)
+from app.generation_profiles import ProfileStore
+from app.llm_service import LLMService
+from app.prefix_cache import PrefixCacheTracker
+from app.prompt_registry import build_default_registry
+from benchmarks.fake_provider import install_fakes
+
+# Alternates between turns with and without knowledge keywords
+USER_TURNS = (
+    "Hi there",
+    "How much does it cost?",
+    "We get maybe 60 calls a day and miss a lot after hours",
+    "Do you do setup for dental offices?",
+    "Honestly that sounds pretty good",
+    "What about cancel terms on the contract?",
+    "Okay, let me think it over",
+)
+
+
+def play(layout, provider, args):
+    registry = build_default_registry()
+    profiles = ProfileStore(registry, modes=('sales', 'receptionist'))
+    pipeline = ChatPipeline([
+        ('validate', validate_stage),
+        ('retrieve', make_retrieve_stage(registry, profiles, layout)),
+        ('build_messages', build_messages_stage),
+    ])
+    llm_service = install_fakes(LLMService({'PROMPT_LAYOUT': layout}), reply_tokens=60,
+                                time_scale=args.time_scale, prefix_cache=True)
+    chat = llm_service.chat_claude if provider == 'claude' else llm_service.chat_openai
+    tracker = PrefixCacheTracker()
+
+    for conversation in range(args.conversations):
+        history = []
+        for turn in range(args.turns):
+            message = USER_TURNS[(conversation + turn) % len(USER_TURNS)]
+            if turn == 0:
+                message = f"{message}, this is caller {conversation}"
+            body = json.dumps({'message': message, 'provider': provider, 'history': history,
+                               'conversation_id': f'c{conversation}'})
+            ctx = pipeline.run(body)
+
+            start = time.perf_counter()
+            ttft, reply = None, []
+            for event in chat(ctx.messages, stream=True, profile=ctx.profile):
+                if event['type'] == 'chunk':
+                    if ttft is None:
+                        ttft = (time.perf_counter() - start) / args.time_scale
+                    reply.append(event['content'])
+                elif event['type'] == 'done':
+                    tracker.record(ctx.conversation_id, ctx.prompt.version, event['usage'], ttft)
+                elif event['type'] == 'error':
+                    raise RuntimeError(event['error'])
+
+            history += [{'role': 'user', 'content': message}, {'role': 'assistant', 'content': ''.join(reply)}]
+    return tracker.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prompt layout / prefix cache benchmark')
+    parser.add_argument('--conversations', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=10)
+    parser.add_argument('--provider', choices=('openai', 'claude'), default='openai')
+    parser.add_argument('--time-scale', type=float, default=0.02,
+                        help='Fraction of simulated latency actually slept (results are rescaled)')
+    args = parser.parse_args()
+
+    print(f"{args.conversations} conversations x {args.turns} turns ({args.provider}, "
+          f"latency rescaled from time-scale {args.time_scale})")
+    print(f"{'layout':<10}{'prompt tok':>12}{'cached tok':>12}{'hit ratio':>11}"
+          f"{'prefix chg':>12}{'ttft 1st ms':>13}{'ttft next ms':>14}")
+    for layout in PROMPT_LAYOUTS:
+        stats = play(layout, args.provider, args)
+        print(f"{layout:<10}{stats['prompt_tokens']:>12}{stats['cached_tokens']:>12}{stats['hit_ratio']:>11.1%}"
+              f"{stats['prefix_changes']:>12}{stats['first_ttft_ms']:>13.0f}{stats['follow_up_ttft_ms']:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
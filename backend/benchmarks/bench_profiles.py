@@ -0,0 +1,80 @@
+"""
+Generation profile benchmark
+
+Runs the real LLMService against the fake provider and reports simulated
+latency (total and time-to-first-token), output tokens and cost per chat
+for the config defaults (DEFAULT_MODEL/MAX_TOKENS, what every chat used
+before profiles) and for each persona profile.
+
+Usage (from backend/):
+    python -m benchmarks.bench_profiles [--chats 5] [--time-scale 0.02]
+"""
+import argparse
+import time
+
+from app.llm_service import LLMService
+from app.prompt_registry import build_default_registry
+from app.generation_profiles import ProfileStore
+from benchmarks.fake_provider import install_fakes, estimate_cost
+
+CONFIG = {'DEFAULT_MODEL': 'gpt-4', 'MAX_TOKENS': 1000, 'TEMPERATURE': 0.7}
+
+
+def run_chat(llm_service, messages, profile, provider):
+    """Stream one chat; return (ttft, total, usage dict, model)"""
+    chat = llm_service.chat_claude if provider == 'claude' else llm_service.chat_openai
+    start = time.perf_counter()
+    ttft = None
+    for event in chat(messages, stream=True, profile=profile):
+        if event['type'] == 'chunk' and ttft is None:
+            ttft = time.perf_counter() - start
+        elif event['type'] == 'done':
+            return ttft, time.perf_counter() - start, event['usage'] or {}, event['model']
+        elif event['type'] == 'error':
+            raise RuntimeError(event['error'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generation profile benchmark')
+    parser.add_argument('--chats', type=int, default=5)
+    parser.add_argument('--reply-tokens', type=int, default=400,
+                        help='Tokens the fake model wants to write before hitting max_tokens')
+    parser.add_argument('--time-scale', type=float, default=0.02,
+                        help='Fraction of simulated latency actually slept (results are rescaled)')
+    args = parser.parse_args()
+
+    registry = build_default_registry()
+    profiles = ProfileStore(registry, modes=('sales', 'receptionist'))
+    llm_service = install_fakes(LLMService(CONFIG), reply_tokens=args.reply_tokens, time_scale=args.time_scale)
+
+    scenarios = [
+        ('config defaults', 'openai', None, 'sales'),
+        ('sales profile', 'openai', profiles.resolve('sales'), 'sales'),
+        ('receptionist profile', 'openai', profiles.resolve('receptionist'), 'receptionist'),
+        ('sales profile (claude)', 'claude', profiles.resolve('sales'), 'sales'),
+    ]
+
+    print(f"{args.chats} streamed chats per scenario (latency rescaled from time-scale {args.time_scale})")
+    print(f"{'scenario':<26}{'model':<30}{'ttft s':>8}{'total s':>9}{'out tok':>9}{'$/chat':>10}")
+    for name, provider, profile, mode in scenarios:
+        messages = [
+            {'role': 'system', 'content': registry.get(mode).text},
+            {'role': 'user', 'content': 'Hey, how much does this cost?'},
+        ]
+        ttfts, totals, outputs, costs = [], [], [], []
+        for _ in range(args.chats):
+            ttft, total, usage, model = run_chat(llm_service, messages, profile, provider)
+            input_tokens = usage.get('prompt_tokens', usage.get('input_tokens', 0))
+            output_tokens = usage.get('completion_tokens', usage.get('output_tokens', 0))
+            ttfts.append(ttft / args.time_scale)
+            totals.append(total / args.time_scale)
+            outputs.append(output_tokens)
+            costs.append(estimate_cost(model, input_tokens, output_tokens))
+
+        n = args.chats
+        print(f"{name:<26}{model:<30}{sum(ttfts) / n:>8.2f}{sum(totals) / n:>9.2f}"
+              f"{sum(outputs) / n:>9.0f}{sum(costs) / n:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
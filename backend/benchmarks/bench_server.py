@@ -0,0 +1,72 @@
+"""
+Benchmark: gunicorn worker presets
+
+Starts the app once per GUNICORN_PRESET (see server_config.py), sized for
+this machine, and runs the same load-test scenarios against the fake LLM
+provider: short requests, blocking chat calls and SSE streams. Streams are
+where the presets differ; a sync worker is held for the whole stream.
+
+Usage (from backend/):
+    python -m benchmarks.bench_server [--presets sync,gthread,gevent] [--concurrency 40] [--duration 5]
+"""
+import argparse
+import tempfile
+
+from benchmarks.fake_llm_server import FakeLLMSettings, make_server
+from benchmarks.loadtest import SCENARIOS, run_scenario, start_app, worker_pids
+from config import Config
+from server_config import PRESET_ALIASES, PRESETS, gunicorn_settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare gunicorn worker presets under load')
+    parser.add_argument('--presets', default=','.join(PRESETS))
+    parser.add_argument('--scenarios', default='health,chat,chat_stream')
+    parser.add_argument('--concurrency', type=int, default=40, help='Virtual users per scenario')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1.0)
+    parser.add_argument('--ttft', type=float, default=0.3, help='Fake provider seconds to first token')
+    parser.add_argument('--tokens-per-sec', type=float, default=60)
+    parser.add_argument('--max-output-tokens', type=int, default=40)
+    args = parser.parse_args()
+    args.server = 'gunicorn'
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+
+    settings = FakeLLMSettings(args.ttft, args.tokens_per_sec, args.max_output_tokens, seed=1)
+    fake_server, fake_url = make_server(settings)
+    print(f"{args.concurrency} virtual users, {args.duration:.0f}s per scenario; fake provider "
+          f"ttft={args.ttft}s {args.tokens_per_sec} tok/s")
+    print(f"{'preset':<10}{'scenario':<14}{'reqs':>7}{'err':>6}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'1st ev p95':>11}{'streams':>9}{'rss MB':>8}")
+
+    try:
+        for preset in [name.strip() for name in args.presets.split(',') if name.strip()]:
+            config = type('PresetConfig', (Config,), {'GUNICORN_PRESET': preset})
+            sizing = gunicorn_settings(config)
+            if sizing['worker_class'] != PRESET_ALIASES.get(preset, preset):
+                print(f"{preset:<10}skipped: {PRESET_ALIASES.get(preset, preset)} is not installed")
+                continue
+            print(f"{preset:<10}{sizing['workers']} worker(s) x {sizing['threads']} thread(s)"
+                  + (f", {sizing['worker_connections']} connections" if 'worker_connections' in sizing else ''))
+
+            args.preset = preset
+            with tempfile.TemporaryDirectory() as workdir:
+                process, port = start_app(args, fake_url, workdir)
+                try:
+                    pids = worker_pids(process, 'gunicorn')
+                    for name in names:
+                        stats = run_scenario(name, SCENARIOS[name], args, port, pids)
+                        fmt = lambda value, width: f"{'-' if value is None else value:>{width}}"  # noqa: E731
+                        print(f"{'':<10}{name:<14}{stats['requests']:>7}{stats['errors']:>6}{stats['rps']:>8}"
+                              f"{fmt(stats['p50_ms'], 9)}{fmt(stats['p95_ms'], 9)}"
+                              f"{fmt(stats['first_event_p95_ms'], 11)}{fmt(stats['max_streams_held'], 9)}"
+                              f"{round(sum(stats['rss_mb_per_worker']), 1):>8}")
+                finally:
+                    process.terminate()
+                    process.wait(timeout=120)
+    finally:
+        fake_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
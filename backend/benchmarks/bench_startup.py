@@ -0,0 +1,81 @@
+"""
+Worker cold-start benchmark
+
+Runs ``create_app()`` in fresh interpreters with ``-X importtime`` and
+reports wall time plus the slowest top-level imports. The "eager" mode
+imports both provider SDKs up front, as app startup did before they were
+loaded lazily, for a before/after comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODES = {
+    'lazy': "from app import create_app; create_app('testing')",
+    'eager': "import openai, anthropic; from app import create_app; create_app('testing')",
+}
+
+
+def run(code):
+    """Run ``code`` under -X importtime; return (wall seconds, stderr lines)"""
+    env = dict(os.environ, OPENAI_API_KEY='sk-bench', ANTHROPIC_API_KEY='sk-ant-bench',
+               LOG_FILE=os.devnull)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - start, result.stderr.splitlines()
+
+
+def import_times(lines, max_depth=1):
+    """
+    Cumulative import time (us) per module from -X importtime output
+
+    Depth 0 is what the entry point imported; depth 1 is what those modules
+    imported in turn (e.g. flask, pydantic, openai under ``app``).
+    """
+    totals = defaultdict(int)
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, raw_name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth <= max_depth:
+            totals[('  ' * depth) + raw_name.strip()] += int(cumulative)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker cold-start benchmark')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    for mode, code in MODES.items():
+        walls = []
+        totals = defaultdict(int)
+        for _ in range(args.runs):
+            wall, lines = run(code)
+            walls.append(wall)
+            for name, us in import_times(lines).items():
+                totals[name] += us
+
+        print(f"\n[{mode}] wall: best {min(walls) * 1000:.0f} ms, mean {sum(walls) / len(walls) * 1000:.0f} ms")
+        print(f"  {'module':<36}{'import ms':>10}")
+        for name, us in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<36}{us / args.runs / 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Static asset serving benchmark
+
+Compares the previous serve_static handler (send_from_directory with an
+exception-driven SPA fallback) against the manifest-backed StaticAssets
+for asset hits, SPA route misses and conditional (If-None-Match) requests.
+
+Usage (from backend/):
+    python -m benchmarks.bench_static [--requests 2000]
+"""
+import argparse
+import gzip
+import os
+import tempfile
+import time
+
+from flask import Flask, send_from_directory
+
+from app.static_assets import StaticAssets
+
+ASSET = 'js/main.3f9a2b1c4d.js'
+
+
+def build_dist(root):
+    """Write a small dist folder: index.html plus a hashed, precompressed bundle"""
+    os.makedirs(os.path.join(root, 'js'))
+    with open(os.path.join(root, 'index.html'), 'w') as f:
+        f.write('<!doctype html><html><body><div id="app"></div></body></html>')
+    bundle = ('function render(){return document.getElementById("app")}\n' * 2000).encode()
+    with open(os.path.join(root, ASSET), 'wb') as f:
+        f.write(bundle)
+    with open(os.path.join(root, ASSET + '.gz'), 'wb') as f:
+        f.write(gzip.compress(bundle))
+
+
+def baseline_app(root):
+    app = Flask('baseline', static_folder=None)
+
+    @app.route('/<path:path>')
+    def serve_static(path):
+        try:
+            return send_from_directory(root, path)
+        except Exception:
+            return send_from_directory(root, 'index.html')
+
+    return app
+
+
+def manifest_app(root):
+    app = Flask('manifest', static_folder=None)
+    assets = StaticAssets(root)
+
+    @app.route('/<path:path>')
+    def serve_static(path):
+        return assets.serve(path)
+
+    return app
+
+
+def _time(client, path, requests, headers):
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+        response.get_data()
+        response.close()
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, response.status_code, len(response.get_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Static asset serving benchmark')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_dist(root)
+        apps = {'baseline': baseline_app(root), 'manifest': manifest_app(root)}
+
+        etag_response = apps['manifest'].test_client().get(ASSET, headers={'Accept-Encoding': 'gzip'})
+        scenarios = [
+            ('asset hit', '/' + ASSET, {'Accept-Encoding': 'gzip'}),
+            ('SPA route miss', '/pricing/enterprise', {}),
+            ('conditional (If-None-Match)', '/' + ASSET,
+             {'Accept-Encoding': 'gzip', 'If-None-Match': etag_response.headers['ETag']}),
+        ]
+
+        print(f"{args.requests} requests per scenario")
+        print(f"{'scenario':<30}{'handler':<10}{'req/s':>10}{'status':>8}{'bytes':>8}")
+        for name, path, headers in scenarios:
+            for label, app in apps.items():
+                rps, status, size = _time(app.test_client(), path, args.requests, headers)
+                print(f"{name:<30}{label:<10}{rps:>10.0f}{status:>8}{size:>8}")
+
+
+if __name__ == '__main__':
+    main()
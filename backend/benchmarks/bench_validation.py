@@ -0,0 +1,95 @@
+"""
+ChatRequest validation micro-benchmark
+
+Compares the previous path (json.loads -> model_validate with a regex role
+pattern -> model_dump per history message) with single-pass
+model_validate_json on the raw body, for a request with a 50-message
+history.
+
+Usage (from backend/):
+    python -m benchmarks.bench_validation [--iterations 2000]
+"""
+import argparse
+import json
+import time
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.models import ChatRequest
+
+
+class LegacyMessage(BaseModel):
+    role: str = Field(..., pattern="^(system|user|assistant)$")
+    content: str = Field(..., min_length=1, max_length=50000)
+
+
+class LegacyChatRequest(BaseModel):
+    """ChatRequest as it was before model_validate_json"""
+    message: str = Field(..., min_length=1, max_length=5000)
+    provider: Optional[str] = Field(default="openai", pattern="^(openai|claude)$")
+    model: Optional[str] = Field(default=None, max_length=100)
+    history: Optional[List[LegacyMessage]] = Field(default_factory=list)
+
+    @field_validator('message')
+    @classmethod
+    def message_not_empty(cls, v: str) -> str:
+        if not v.strip():
+            raise ValueError('Message cannot be empty or whitespace only')
+        return v.strip()
+
+    @field_validator('history')
+    @classmethod
+    def validate_history(cls, v):
+        if len(v) > 50:
+            raise ValueError('Conversation history too long (max 50 messages)')
+        return v
+
+
+def build_body(messages, content_chars):
+    content = ('So we get maybe 50-70 calls a day and miss a lot of them after hours. ' *
+               (content_chars // 70 + 1))[:content_chars]
+    history = [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': content}
+        for i in range(messages)
+    ]
+    return json.dumps({'message': 'How much does it cost?', 'provider': 'openai', 'history': history}).encode()
+
+
+def legacy(body):
+    req = LegacyChatRequest.model_validate(json.loads(body))
+    return [msg.model_dump() for msg in req.history] if req.history else []
+
+
+def current(body):
+    return ChatRequest.model_validate_json(body).history or []
+
+
+def bench(fn, body, iterations):
+    fn(body)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(body)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ChatRequest validation micro-benchmark')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--messages', type=int, default=50)
+    args = parser.parse_args()
+
+    assert legacy(build_body(2, 20)) == current(build_body(2, 20))
+
+    print(f"{args.messages}-message history, {args.iterations} iterations")
+    print(f"{'content/msg':<14}{'body KB':>9}{'legacy us':>12}{'current us':>12}{'speedup':>9}")
+    for content_chars in (100, 1000, 10000):
+        body = build_body(args.messages, content_chars)
+        iterations = max(args.iterations * 100 // content_chars, 20)
+        old = bench(legacy, body, iterations)
+        new = bench(current, body, iterations)
+        print(f"{content_chars:<14}{len(body) / 1024:>9.1f}{old * 1e6:>12.1f}{new * 1e6:>12.1f}{old / new:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,477 @@
+"""
+Voice call lifecycle simulator
+
+Synthesizes Vonage/ElevenLabs webhook traffic for whole calls (answer ->
+call events -> conversation-started -> conversation turns with tool calls
+-> conversation-ended -> completed) at a given number of simultaneous
+calls, or replays a recorded webhook log. Reports latency per webhook
+endpoint and database queries per call, to size the system for N
+simultaneous calls per tenant.
+
+By default the ``webhooks_bp`` blueprint runs in-process against a local
+SQLite database seeded with ``--tenants`` tenants (``--db-latency`` adds a
+network round trip per query); ``--db app`` uses the app's own database
+instead. ``--url`` sends the traffic to a running server (latency only).
+
+Usage (from backend/, or as ``python backend/benchmarks/call_simulator.py``):
+    python -m benchmarks.call_simulator [--calls 200] [--concurrency 20] [--turns 12]
+    python -m benchmarks.call_simulator --record calls.jsonl
+    python -m benchmarks.call_simulator --replay calls.jsonl [--copies 10]
+    python -m benchmarks.call_simulator --url http://localhost:5000
+
+Webhook logs are JSON lines with ``method``, ``path`` and optional
+``query``, ``headers``, ``form``, ``json``, ``offset`` (seconds since the
+call started) and ``call`` (grouping key; defaults to the conversation id
+or Vonage uuid). Call ids handed out by the answer webhook are substituted
+into later ``X-Call-ID`` headers and ``call_id`` query parameters.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import types
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+# backend/, for ``app`` and ``config`` when run as a script from elsewhere
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+TOOL_MIX = [
+    ('check_availability', lambda rng: {'date': f'2026-11-{rng.randint(1, 28):02d}'}),
+    ('get_business_info', lambda rng: {}),
+    ('get_customer_info', lambda rng: {}),
+    ('book_appointment', lambda rng: {'customer_name': 'Sam Caller', 'date': '2026-11-12', 'time': '10:30'}),
+]
+
+SCHEMA = """
+    CREATE TABLE phone_numbers (phone_number TEXT PRIMARY KEY, tenant_id TEXT, status TEXT);
+    CREATE TABLE agent_configurations (tenant_id TEXT, elevenlabs_agent_id TEXT, greeting TEXT, is_active BOOLEAN);
+    CREATE TABLE calls (
+        call_id INTEGER PRIMARY KEY AUTOINCREMENT, tenant_id TEXT, vonage_call_uuid TEXT,
+        elevenlabs_conversation_id TEXT, from_number TEXT, to_number TEXT, status TEXT,
+        started_at TEXT, updated_at TEXT, ended_at TEXT, duration_seconds INTEGER,
+        recording_url TEXT, transcript_url TEXT, summary TEXT,
+        elevenlabs_cost REAL, vonage_cost REAL, total_cost REAL
+    );
+    CREATE INDEX calls_conversation ON calls (elevenlabs_conversation_id);
+    CREATE TABLE conversation_turns (
+        call_id INTEGER, tenant_id TEXT, speaker TEXT, message TEXT, turn_number INTEGER, timestamp TEXT
+    );
+    CREATE TABLE tool_executions (
+        call_id INTEGER, tenant_id TEXT, tool_name TEXT, parameters TEXT, response TEXT, status TEXT
+    );
+    CREATE TABLE usage_tracking (tenant_id TEXT, billing_month TEXT, total_minutes INTEGER);
+"""
+
+# Postgres spellings used by webhooks.py -> SQLite
+SQL_REWRITES = [
+    ("DATE_TRUNC('month', CURRENT_DATE)", "date('now', 'start of month')"),
+    ('NOW()', 'CURRENT_TIMESTAMP'),
+]
+
+
+def tenant_number(index):
+    return f'+1555010{index:04d}'
+
+
+class LocalDatabase:
+    """
+    SQLite stand-in for ``app.database.db`` (asyncpg-style ``$n`` queries)
+
+    Coroutines never suspend, so ``run_async`` drives them without an event
+    loop. ``latency`` seconds are slept per query, outside the lock, to
+    model the round trip to a database server.
+    """
+
+    def __init__(self, tenants=1, latency=0.0):
+        self.latency = latency
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.executescript(SCHEMA)
+        for index in range(tenants):
+            tenant_id = f'tenant-{index}'
+            self._conn.execute('INSERT INTO phone_numbers VALUES (?, ?, ?)', (tenant_number(index), tenant_id, 'active'))
+            self._conn.execute('INSERT INTO agent_configurations VALUES (?, ?, ?, 1)',
+                               (tenant_id, f'agent-{index}', 'Hi, thanks for calling!'))
+            self._conn.execute("INSERT INTO usage_tracking VALUES (?, date('now', 'start of month'), 0)", (tenant_id,))
+
+    def _run(self, query, args):
+        if self.latency:
+            time.sleep(self.latency)
+        query = query.replace('$', '?')
+        for postgres, sqlite in SQL_REWRITES:
+            query = query.replace(postgres, sqlite)
+        with self._lock:
+            cursor = self._conn.execute(query, args)
+            rows = cursor.fetchall()
+            self._conn.commit()
+            return rows
+
+    async def fetch_one(self, query, *args):
+        rows = self._run(query, args)
+        return rows[0] if rows else None
+
+    async def fetch_all(self, query, *args):
+        return self._run(query, args)
+
+    async def fetch_val(self, query, *args):
+        rows = self._run(query, args)
+        return rows[0][0] if rows else None
+
+    async def execute(self, query, *args):
+        self._run(query, args)
+
+    def count(self, table):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    @staticmethod
+    def run_async(coro):
+        try:
+            coro.send(None)
+        except StopIteration as e:
+            return e.value
+        raise RuntimeError('LocalDatabase coroutines must not suspend')
+
+
+class CountingDatabase:
+    """Wraps a database, counting queries by Flask endpoint ('background' outside requests)"""
+
+    QUERY_METHODS = ('fetch_one', 'fetch_all', 'fetch_val', 'fetch', 'execute')
+
+    def __init__(self, db):
+        self._db = db
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if name not in self.QUERY_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            from flask import has_request_context, request
+            tag = request.endpoint if has_request_context() else 'background'
+            with self._lock:
+                self.counts[tag] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+# ============================================
+# CALL SCRIPTS
+# ============================================
+
+def synthesize_call(index, args, rng):
+    """Webhook events for one simulated call, with offsets in seconds"""
+    uuid = f'sim-{index}'
+    conversation_id = f'conv-sim-{index}'
+    call = {'call': uuid}
+    offset = 0.0
+    events = [dict(call, offset=offset, method='POST', path='/webhooks/vonage/answer',
+                   form={'from': f'+1555020{index % 10000:04d}', 'to': tenant_number(index % args.tenants),
+                         'uuid': uuid})]
+    for status in ('ringing', 'answered'):
+        offset += 0.2
+        events.append(dict(call, offset=offset, method='POST', path='/webhooks/vonage/events',
+                           query={'call_id': ''}, json={'uuid': uuid, 'status': status}))
+    offset += 0.5
+    events.append(dict(call, offset=offset, method='POST', path='/webhooks/elevenlabs/conversation-started',
+                       headers={'X-Call-ID': ''}, json={'conversation_id': conversation_id}))
+
+    for turn in range(args.turns):
+        offset += args.turn_interval * rng.uniform(0.5, 1.5)
+        speaker = 'user' if turn % 2 else 'agent'
+        events.append(dict(call, offset=offset, method='POST', path='/webhooks/elevenlabs/conversation-turn',
+                           json={'conversation_id': conversation_id, 'speaker': speaker, 'turn_number': turn,
+                                 'message': f'Simulated {speaker} turn {turn} about booking a cleaning.'}))
+        if speaker == 'user' and rng.random() < args.tool_rate:
+            tool_name, parameters = rng.choice(TOOL_MIX)
+            offset += 0.3
+            events.append(dict(call, offset=offset, method='POST', path='/webhooks/elevenlabs/tool-call',
+                               json={'conversation_id': conversation_id, 'tool': tool_name,
+                                     'parameters': parameters(rng)}))
+
+    offset += 1.0
+    events.append(dict(call, offset=offset, method='POST', path='/webhooks/elevenlabs/conversation-ended',
+                       json={'conversation_id': conversation_id, 'duration_seconds': int(offset),
+                             'summary': 'Caller asked about availability.'}))
+    offset += 0.2
+    events.append(dict(call, offset=offset, method='POST', path='/webhooks/vonage/events',
+                       query={'call_id': ''}, json={'uuid': uuid, 'status': 'completed'}))
+    return events
+
+
+def load_recording(path):
+    """Group a JSON-lines webhook log into per-call event lists, in file order"""
+    calls = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            key = event.get('call') or (event.get('json') or {}).get('conversation_id') \
+                or (event.get('form') or {}).get('uuid') or (event.get('json') or {}).get('uuid')
+            calls.setdefault(key, []).append(event)
+    return list(calls.values())
+
+
+def copy_call(events, suffix):
+    """A replayed call with its Vonage uuid and conversation id made unique"""
+    def rename(value):
+        return f'{value}{suffix}' if value else value
+
+    copies = []
+    for event in events:
+        event = json.loads(json.dumps(event))
+        for section, key in (('form', 'uuid'), ('json', 'uuid'), ('json', 'conversation_id'), ('query', 'uuid')):
+            if key in (event.get(section) or {}):
+                event[section][key] = rename(event[section][key])
+        copies.append(event)
+    return copies
+
+
+# ============================================
+# TARGETS
+# ============================================
+
+class InProcessTarget:
+    """Flask test client for an app with ``webhooks_bp`` registered"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def client(self):
+        test_client = self.app.test_client()
+
+        def send(method, path, query, headers, form, body):
+            response = test_client.open(path, method=method, query_string=query, headers=headers,
+                                        data=form, json=body)
+            return response.status_code, response.get_json(silent=True)
+        return send
+
+
+class HttpTarget:
+    """Keep-alive HTTP connection per simulated call"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+
+    def client(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+        def send(method, path, query, headers, form, body):
+            headers = dict(headers)
+            if form is not None:
+                data = urlencode(form)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            elif body is not None:
+                data = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+            else:
+                data = None
+            conn.request(method, f'{path}?{urlencode(query)}' if query else path, body=data, headers=headers)
+            response = conn.getresponse()
+            raw = response.read()
+            try:
+                return response.status, json.loads(raw)
+            except ValueError:
+                return response.status, None
+        return send
+
+
+def build_app(args):
+    """The app with ``webhooks_bp`` registered and its database swapped for a counting one"""
+    local = None
+    if args.db == 'local':
+        # Installed as app.database before app.webhooks imports it, so the
+        # blueprint loads even where the app's own database module is absent
+        local = LocalDatabase(args.tenants, args.db_latency)
+        sys.modules['app.database'] = types.SimpleNamespace(db=local, run_async=local.run_async)
+    try:
+        from app import webhooks
+    except ImportError as e:
+        sys.exit(f"app.webhooks is not importable in this tree ({e}); use --url against a running server")
+    from app import create_app
+    from app.tool_service import TOOLS
+
+    counting = CountingDatabase(webhooks.db)
+    webhooks.db = counting
+
+    app = create_app('testing')
+    webhooks.init_webhooks(app)
+
+    if local is not None:
+        # Tools read the tenant's CRM tables; with the local database, stand in
+        # with one query and --tool-latency seconds of work each
+        def stand_in(name):
+            def handler(tenant_id, parameters, context):
+                webhooks.run_async(webhooks.db.fetch_one('SELECT COUNT(*) FROM calls WHERE tenant_id = $1', tenant_id))
+                time.sleep(args.tool_latency)
+                return {'tool': name, 'ok': True}
+            return handler
+        for name, (_, read_only) in list(TOOLS.items()):
+            TOOLS[name] = (stand_in(name), read_only)
+    return app, counting, local
+
+
+# ============================================
+# RUNNER
+# ============================================
+
+def endpoint_name(path):
+    return path.rstrip('/').rsplit('/', 1)[-1]
+
+
+def play_call(send, events, time_scale, record):
+    """Send one call's events at their offsets, substituting the live call id"""
+    started = time.perf_counter()
+    call_id = None
+    for event in events:
+        delay = started + event.get('offset', 0) * time_scale - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        headers = dict(event.get('headers') or {})
+        query = dict(event.get('query') or {})
+        if call_id is not None:
+            if 'X-Call-ID' in headers:
+                headers['X-Call-ID'] = call_id
+            if 'call_id' in query:
+                query['call_id'] = call_id
+        # Drop placeholders that were never filled (e.g. the answer webhook failed)
+        headers = {key: value for key, value in headers.items() if value != ''}
+        query = {key: value for key, value in query.items() if value != ''}
+
+        start = time.perf_counter()
+        try:
+            status, payload = send(event['method'], event['path'], query, headers, event.get('form'), event.get('json'))
+        except (OSError, http.client.HTTPException) as e:
+            status, payload = type(e).__name__, None
+        record(endpoint_name(event['path']), status, time.perf_counter() - start)
+
+        if event['path'].endswith('/vonage/answer') and isinstance(payload, list):
+            for action in payload:
+                for endpoint in action.get('endpoint', []):
+                    call_id = endpoint.get('headers', {}).get('X-Call-ID', call_id)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def run(calls, target, args):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    lock = threading.Lock()
+    queue = list(reversed(calls))
+
+    def record(name, status, elapsed):
+        with lock:
+            latencies[name].append(elapsed)
+            statuses[name][status] += 1
+
+    def worker():
+        send = target.client()
+        while True:
+            with lock:
+                if not queue:
+                    return
+                events = queue.pop()
+            play_call(send, events, args.time_scale, record)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(args.concurrency, len(calls)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vonage/ElevenLabs call lifecycle simulator')
+    parser.add_argument('--calls', type=int, default=200, help='Synthesized calls')
+    parser.add_argument('--concurrency', type=int, default=20, help='Simultaneous calls')
+    parser.add_argument('--tenants', type=int, default=1, help='Tenants the calls are spread over')
+    parser.add_argument('--turns', type=int, default=12, help='Conversation turns per call')
+    parser.add_argument('--tool-rate', type=float, default=0.3, help='Chance of a tool call after a caller turn')
+    parser.add_argument('--turn-interval', type=float, default=4.0, help='Mean seconds between turns')
+    parser.add_argument('--time-scale', type=float, default=0.05,
+                        help='Fraction of the call timeline actually slept')
+    parser.add_argument('--replay', help='Replay a JSON-lines webhook log instead of synthesizing calls')
+    parser.add_argument('--copies', type=int, default=1, help='Times each replayed call is played')
+    parser.add_argument('--record', help='Write the synthesized calls as a webhook log and exit')
+    parser.add_argument('--url', help='Send webhooks to a running server instead of an in-process app')
+    parser.add_argument('--db', choices=('local', 'app'), default='local',
+                        help="In-process database: seeded SQLite or the app's own")
+    parser.add_argument('--db-latency', type=float, default=0.001, help='Seconds added per local query')
+    parser.add_argument('--tool-latency', type=float, default=0.01, help='Seconds of work per stand-in tool')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.replay:
+        recorded = load_recording(args.replay)
+        calls = [copy_call(events, f'-r{copy}' if args.copies > 1 else '')
+                 for copy in range(args.copies) for events in recorded]
+    else:
+        rng = random.Random(args.seed)
+        calls = [synthesize_call(index, args, rng) for index in range(args.calls)]
+
+    if args.record:
+        with open(args.record, 'w') as f:
+            for events in calls:
+                for event in events:
+                    f.write(json.dumps(event) + '\n')
+        print(f"Wrote {sum(map(len, calls))} webhook events for {len(calls)} calls to {args.record}")
+        return
+
+    counting = local = app = None
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        app, counting, local = build_app(args)
+        target = InProcessTarget(app)
+
+    latencies, statuses, wall = run(calls, target, args)
+    if app is not None:
+        # Tool logs and usage updates run on the job queue after the response
+        app.job_queue.stop(timeout=30)
+
+    requests = sum(len(values) for values in latencies.values())
+    print(f"{len(calls)} calls, {args.concurrency} simultaneous, {args.tenants} tenant(s), "
+          f"{requests} webhooks in {wall:.1f}s ({requests / wall:.0f}/s)")
+    endpoints = {endpoint_name(rule.rule): rule.endpoint for rule in app.url_map.iter_rules()} if app else {}
+    print(f"{'endpoint':<24}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'db q/req':>10}")
+    for name, values in sorted(latencies.items()):
+        errors = sum(count for status, count in statuses[name].items()
+                     if not (isinstance(status, int) and status < 400))
+        queries = counting.counts.get(endpoints.get(name), 0) / len(values) if counting else None
+        print(f"{name:<24}{len(values):>9}{errors:>8}{percentile(values, 0.5) * 1000:>9.1f}"
+              f"{percentile(values, 0.95) * 1000:>9.1f}{percentile(values, 0.99) * 1000:>9.1f}"
+              f"{'-' if queries is None else f'{queries:.1f}':>10}")
+        for status, count in sorted(statuses[name].items(), key=str):
+            if not (isinstance(status, int) and status < 400):
+                print(f"    {status}: {count}")
+
+    if counting:
+        total = sum(counting.counts.values())
+        background = counting.counts.get('background', 0)
+        print(f"DB queries per call: {total / len(calls):.1f} "
+              f"({(total - background) / len(calls):.1f} in requests, {background / len(calls):.1f} in background jobs)")
+        stats = app.job_queue.stats()
+        print(f"Background jobs: {stats['succeeded']} ok, {stats['dead']} dead, avg wait {stats['avg_wait_ms']} ms")
+    if local:
+        print(f"Local DB: {local.count('calls')} calls, {local.count('conversation_turns')} turns, "
+              f"{local.count('tool_executions')} tool executions")
+
+
+if __name__ == '__main__':
+    main()
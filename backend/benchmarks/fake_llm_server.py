@@ -0,0 +1,233 @@
+"""
+Fake OpenAI/Anthropic HTTP server for load tests
+
+Speaks enough of ``POST /v1/chat/completions`` and ``POST /v1/messages``
+(streaming and non-streaming) for the provider SDKs, so the app can be run
+unmodified with ``OPENAI_BASE_URL`` / ``ANTHROPIC_BASE_URL`` pointed here.
+Time to first token, token rate, output length and error rate are
+configurable; errors are returned as HTTP 500/429 like the real APIs.
+
+Usage (from backend/):
+    python -m benchmarks.fake_llm_server [--port 8765] [--ttft 0.3] [--tokens-per-sec 60]
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fake_provider import WORDS
+
+
+class FakeLLMSettings:
+    """Simulated provider behaviour shared by all request handlers"""
+
+    def __init__(self, ttft=0.3, tokens_per_sec=60, max_output_tokens=40, error_rate=0.0,
+                 rate_limit_rate=0.0, seed=None):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.max_output_tokens = max_output_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.open_streams = 0
+        self.max_open_streams = 0
+
+    def roll(self):
+        """HTTP error status to inject for this request, or None"""
+        with self.lock:
+            self.requests += 1
+            value = self.rng.random()
+            if value < self.error_rate:
+                self.errors += 1
+                return 500
+            if value < self.error_rate + self.rate_limit_rate:
+                self.errors += 1
+                return 429
+        return None
+
+    def stream_opened(self, delta):
+        with self.lock:
+            self.open_streams += delta
+            self.max_open_streams = max(self.max_open_streams, self.open_streams)
+
+    def to_dict(self):
+        return {
+            'ttft': self.ttft,
+            'tokens_per_sec': self.tokens_per_sec,
+            'max_output_tokens': self.max_output_tokens,
+            'error_rate': self.error_rate,
+            'rate_limit_rate': self.rate_limit_rate,
+        }
+
+
+def _prompt_tokens(messages, system=None):
+    def text(content):
+        if isinstance(content, list):
+            return ' '.join(block.get('text', '') for block in content if isinstance(block, dict))
+        return content or ''
+    chars = len(text(system)) + sum(len(text(m.get('content'))) for m in messages)
+    return max(chars // 4, 1)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    settings = None  # FakeLLMSettings, set by make_server
+    ids = itertools.count(1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        path = self.path.split('?', 1)[0]
+        if path.endswith('/chat/completions'):
+            self._handle(body, openai=True)
+        elif path.endswith('/messages'):
+            self._handle(body, openai=False)
+        else:
+            self._json(404, {'error': {'type': 'not_found', 'message': f'Unknown path {path}'}})
+
+    def _handle(self, body, openai):
+        settings = self.settings
+        status = settings.roll()
+        if status is not None:
+            kind = 'rate_limit_error' if status == 429 else 'api_error'
+            self._json(status, {'error': {'type': kind, 'message': f'Injected {status}'}})
+            return
+
+        prompt = _prompt_tokens(body.get('messages', []), body.get('system'))
+        out = min(body.get('max_tokens') or settings.max_output_tokens, settings.max_output_tokens)
+        words = [WORDS[i % len(WORDS)] + ' ' for i in range(out)]
+        model = body.get('model', 'fake')
+        time.sleep(settings.ttft)
+
+        if not body.get('stream'):
+            time.sleep(out / settings.tokens_per_sec)
+            self._json(200, self._openai_message(model, words, prompt) if openai
+                       else self._anthropic_message(model, words, prompt))
+            return
+
+        settings.stream_opened(1)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            events = self._openai_stream(model, words, prompt) if openai \
+                else self._anthropic_stream(model, words, prompt)
+            for index, event in enumerate(events):
+                if index:
+                    time.sleep(1 / settings.tokens_per_sec)
+                self.wfile.write(event.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            settings.stream_opened(-1)
+            self.close_connection = True
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # OpenAI wire format
+
+    def _openai_message(self, model, words, prompt):
+        return {
+            'id': f'chatcmpl-{next(self.ids)}', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(words)},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt, 'completion_tokens': len(words),
+                      'total_tokens': prompt + len(words), 'prompt_tokens_details': {'cached_tokens': 0}},
+        }
+
+    def _openai_stream(self, model, words, prompt):
+        base = {'id': f'chatcmpl-{next(self.ids)}', 'object': 'chat.completion.chunk',
+                'created': int(time.time()), 'model': model}
+        for word in words:
+            yield 'data: ' + json.dumps(dict(base, choices=[
+                {'index': 0, 'delta': {'content': word}, 'finish_reason': None}])) + '\n\n'
+        yield 'data: ' + json.dumps(dict(base, choices=[
+            {'index': 0, 'delta': {}, 'finish_reason': 'stop'}])) + '\n\n'
+        yield 'data: ' + json.dumps(dict(base, choices=[], usage={
+            'prompt_tokens': prompt, 'completion_tokens': len(words), 'total_tokens': prompt + len(words),
+            'prompt_tokens_details': {'cached_tokens': 0}})) + '\n\n'
+        yield 'data: [DONE]\n\n'
+
+    # Anthropic wire format
+
+    def _anthropic_message(self, model, words, prompt):
+        return {
+            'id': f'msg_{next(self.ids)}', 'type': 'message', 'role': 'assistant', 'model': model,
+            'content': [{'type': 'text', 'text': ''.join(words)}],
+            'stop_reason': 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': prompt, 'output_tokens': len(words)},
+        }
+
+    def _anthropic_stream(self, model, words, prompt):
+        def event(name, payload):
+            return f'event: {name}\ndata: {json.dumps(dict(payload, type=name))}\n\n'
+
+        yield event('message_start', {'message': {
+            'id': f'msg_{next(self.ids)}', 'type': 'message', 'role': 'assistant', 'model': model,
+            'content': [], 'stop_reason': None, 'stop_sequence': None,
+            'usage': {'input_tokens': prompt, 'output_tokens': 1}}})
+        yield event('content_block_start', {'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+        for word in words:
+            yield event('content_block_delta', {'index': 0, 'delta': {'type': 'text_delta', 'text': word}})
+        yield event('content_block_stop', {'index': 0})
+        yield event('message_delta', {'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                      'usage': {'output_tokens': len(words)}})
+        yield event('message_stop', {})
+
+
+def make_server(settings, host='127.0.0.1', port=0):
+    """
+    Start a fake provider server in a background thread
+
+    Returns:
+        (server, base_url); stop it with ``server.shutdown()``
+    """
+    handler = type('BoundFakeLLMHandler', (FakeLLMHandler,), {'settings': settings})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-llm', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenAI/Anthropic server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ttft', type=float, default=0.3, help='Seconds before the first token')
+    parser.add_argument('--tokens-per-sec', type=float, default=60)
+    parser.add_argument('--max-output-tokens', type=int, default=40)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests failing with 429')
+    args = parser.parse_args()
+
+    settings = FakeLLMSettings(args.ttft, args.tokens_per_sec, args.max_output_tokens,
+                               args.error_rate, args.rate_limit_rate)
+    server, url = make_server(settings, port=args.port)
+    print(f"Fake LLM server on {url}")
+    print(f"  OPENAI_BASE_URL={url}/v1 ANTHROPIC_BASE_URL={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
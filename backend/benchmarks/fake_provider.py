@@ -0,0 +1,212 @@
+"""
+Fake OpenAI/Anthropic clients for benchmarks
+
+Drop-in stand-ins for the SDK client objects LLMService uses. Latency is
+simulated from a per-model time-to-first-token and token rate, output length
+honours max_tokens, and errors can be injected at a fixed rate. With
+``prefix_cache=True`` the fakes also model provider prompt caching: the
+longest prompt prefix (hashed in 128-token blocks, at least 1024 tokens)
+shared with a recent request is reported as cached and shortens time-to-first-token.
+"""
+import hashlib
+import random
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+# (time to first token in seconds, output tokens per second)
+MODEL_SPEEDS = {
+    'gpt-4': (0.9, 20),
+    'gpt-4-turbo-preview': (0.7, 35),
+    'gpt-4o': (0.4, 80),
+    'gpt-4o-mini': (0.3, 110),
+    'gpt-3.5-turbo': (0.3, 100),
+    'claude-3-5-sonnet-20241022': (0.6, 60),
+    'claude-3-opus-20240229': (1.2, 25),
+}
+DEFAULT_SPEED = (0.5, 50)
+
+# USD per 1M tokens (input, output)
+MODEL_PRICING = {
+    'gpt-4': (30.0, 60.0),
+    'gpt-4-turbo-preview': (10.0, 30.0),
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gpt-3.5-turbo': (0.5, 1.5),
+    'claude-3-5-sonnet-20241022': (3.0, 15.0),
+    'claude-3-opus-20240229': (15.0, 75.0),
+}
+
+# Share of time-to-first-token spent on prompt processing (what caching saves)
+PREFILL_SHARE = 0.75
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+CACHE_MAX_BLOCKS = 100000
+
+WORDS = ('Totally get it. What kind of business are you running right now and how many '
+         'calls do you miss on a typical day? ').split()
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _text(content):
+    """Message content as text (Anthropic system prompts may be content blocks)"""
+    if isinstance(content, list):
+        return ''.join(block.get('text', '') for block in content)
+    return content
+
+
+def _has_breakpoint(content):
+    return isinstance(content, list) and any('cache_control' in block for block in content)
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure"""
+
+
+class _FakeModel:
+    """Shared latency/length/error simulation"""
+
+    def __init__(self, reply_tokens=400, time_scale=1.0, error_rate=0.0, ttft=None, token_rate=None, seed=None,
+                 prefix_cache=False):
+        self.reply_tokens = reply_tokens
+        self.time_scale = time_scale
+        self.error_rate = error_rate
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.prefix_cache = prefix_cache
+        self._cached_blocks = OrderedDict()  # hash of prompt[:n blocks] -> None, LRU
+
+    def _speed(self, model, cached_share=0.0):
+        ttft, rate = MODEL_SPEEDS.get(model, DEFAULT_SPEED)
+        ttft = self.ttft if self.ttft is not None else ttft
+        return (ttft * (1 - PREFILL_SHARE * cached_share),
+                self.token_rate if self.token_rate is not None else rate)
+
+    def _sleep(self, seconds):
+        if self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _begin(self, messages, max_tokens, explicit_breakpoints=False):
+        """
+        Returns (prompt_tokens, cached_tokens, output_tokens)
+
+        With ``explicit_breakpoints`` (Anthropic) only the prompt up to the
+        last message carrying ``cache_control`` is cacheable; otherwise
+        (OpenAI) caching is automatic over the whole prompt.
+        """
+        self.calls += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise FakeProviderError('Injected provider error (503)')
+        parts = [f"{m['role']}:{_text(m['content'])}\n" for m in messages]
+        prompt = ''.join(parts)
+        if explicit_breakpoints:
+            last = max((i for i, m in enumerate(messages) if _has_breakpoint(m['content'])), default=-1)
+            prompt = prompt[:sum(len(part) for part in parts[:last + 1])]
+        prompt_tokens = sum(len(part) for part in parts) // 4 + 1
+        return prompt_tokens, self._cached_tokens(prompt), min(self.reply_tokens, max_tokens)
+
+    def _cached_tokens(self, prompt):
+        if not self.prefix_cache or not prompt:
+            return 0
+        block_chars = CACHE_BLOCK_TOKENS * 4
+        digest = hashlib.sha1()
+        hits = 0
+        matching = True
+        for start in range(0, len(prompt) - block_chars + 1, block_chars):
+            digest.update(prompt[start:start + block_chars].encode('utf-8'))
+            key = digest.digest()
+            if matching and key in self._cached_blocks:
+                hits += 1
+                self._cached_blocks.move_to_end(key)
+            else:
+                matching = False
+                self._cached_blocks[key] = None
+        while len(self._cached_blocks) > CACHE_MAX_BLOCKS:
+            self._cached_blocks.popitem(last=False)
+        tokens = hits * CACHE_BLOCK_TOKENS
+        return tokens if tokens >= CACHE_MIN_TOKENS else 0
+
+    def _tokens(self, count):
+        return [WORDS[i % len(WORDS)] + ' ' for i in range(count)]
+
+    def _stream_tokens(self, model, count, cached_share=0.0):
+        ttft, rate = self._speed(model, cached_share)
+        self._sleep(ttft)
+        for token in self._tokens(count):
+            self._sleep(1 / rate)
+            yield token
+
+    def _complete(self, model, count, cached_share=0.0):
+        ttft, rate = self._speed(model, cached_share)
+        self._sleep(ttft + count / rate)
+        return ''.join(self._tokens(count))
+
+
+class FakeOpenAI(_FakeModel):
+    """Mimics ``openai.OpenAI().chat.completions.create``"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, max_tokens=1000, stream=False, stream_options=None, **kwargs):
+        prompt_tokens, cached_tokens, completion_tokens = self._begin(messages, max_tokens)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens))
+        cached_share = cached_tokens / prompt_tokens
+        if not stream:
+            message = SimpleNamespace(content=self._complete(model, completion_tokens, cached_share))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        return self._stream(model, completion_tokens, usage, cached_share)
+
+    def _stream(self, model, completion_tokens, usage, cached_share):
+        for token in self._stream_tokens(model, completion_tokens, cached_share):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+class FakeAnthropic(_FakeModel):
+    """Mimics ``anthropic.Anthropic().messages.create``"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = SimpleNamespace(create=self.create)
+
+    def create(self, model, messages, max_tokens=1000, system=None, stream=False, **kwargs):
+        all_messages = ([{'role': 'system', 'content': system}] if system else []) + messages
+        prompt_tokens, cached_tokens, output_tokens = self._begin(all_messages, max_tokens, explicit_breakpoints=True)
+        # Anthropic reports cache reads separately from (uncached) input tokens
+        usage = SimpleNamespace(input_tokens=prompt_tokens - cached_tokens, output_tokens=output_tokens,
+                                cache_read_input_tokens=cached_tokens, cache_creation_input_tokens=0)
+        cached_share = cached_tokens / prompt_tokens
+        if not stream:
+            return SimpleNamespace(
+                content=[SimpleNamespace(text=self._complete(model, output_tokens, cached_share))],
+                usage=usage
+            )
+        return self._stream(model, usage, output_tokens, cached_share)
+
+    def _stream(self, model, usage, output_tokens, cached_share):
+        yield SimpleNamespace(type='message_start', message=SimpleNamespace(
+            usage=SimpleNamespace(input_tokens=usage.input_tokens, output_tokens=1,
+                                  cache_read_input_tokens=usage.cache_read_input_tokens,
+                                  cache_creation_input_tokens=0)))
+        for token in self._stream_tokens(model, output_tokens, cached_share):
+            yield SimpleNamespace(type='content_block_delta', delta=SimpleNamespace(text=token))
+        yield SimpleNamespace(type='message_delta', usage=SimpleNamespace(output_tokens=output_tokens))
+        yield SimpleNamespace(type='message_stop')
+
+
+def install_fakes(llm_service, **kwargs):
+    """Replace an LLMService's provider clients with fakes"""
+    llm_service._openai_client = FakeOpenAI(**kwargs)
+    llm_service._anthropic_client = FakeAnthropic(**kwargs)
+    llm_service.config = dict(llm_service.config, OPENAI_API_KEY='fake', ANTHROPIC_API_KEY='fake')
+    return llm_service
@@ -0,0 +1,491 @@
+"""
+End-to-end load test
+
+Runs the real app under gunicorn (gthread workers) against the fake
+OpenAI/Anthropic server from ``benchmarks.fake_llm_server`` and drives each
+scenario with closed-loop virtual users over keep-alive connections.
+Reports RPS, latency percentiles, time to first SSE event, streams held
+open at once and peak RSS per worker, and saves/compares JSON baselines.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest [--scenarios chat,chat_stream] [--concurrency 20] [--duration 5]
+    python -m benchmarks.loadtest --save benchmarks/baselines/loadtest.json
+    python -m benchmarks.loadtest --compare benchmarks/baselines/loadtest.json [--tolerance 0.2]
+
+``--compare`` exits with status 1 if any scenario regressed by more than
+the tolerance (RPS down, p95/p99 latency or RSS up).
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, namedtuple
+
+from benchmarks.bench_static import ASSET, build_dist
+from benchmarks.fake_llm_server import FakeLLMSettings, make_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Scenario = namedtuple('Scenario', 'method path body headers csrf stream')
+
+_ids = itertools.count(1)
+
+
+def _chat_body(provider='openai'):
+    # Unique per request so coalescing doesn't collapse the load
+    return lambda: {'message': f'How much does it cost for a dental office? ({next(_ids)})', 'provider': provider}
+
+
+def _json(payload):
+    return lambda: payload
+
+
+SCENARIOS = {
+    'health': Scenario('GET', '/api/health', None, {}, False, False),
+    'chat': Scenario('POST', '/api/chat', _chat_body(), {}, True, False),
+    'chat_stream': Scenario('POST', '/api/chat/stream', _chat_body(), {}, True, True),
+    'chat_stream_claude': Scenario('POST', '/api/chat/stream', _chat_body('claude'), {}, True, True),
+    'webhook_vonage_answer': Scenario(
+        'GET', '/webhooks/vonage/answer?from=15550100&to=15550199&uuid=load-test', None, {}, False, False),
+    'webhook_vonage_events': Scenario(
+        'POST', '/webhooks/vonage/events?call_id=load-test',
+        _json({'uuid': 'load-test', 'status': 'answered'}), {}, False, False),
+    'webhook_tool_call': Scenario(
+        'POST', '/webhooks/elevenlabs/tool-call',
+        _json({'conversation_id': 'load-test', 'tool': 'get_business_info', 'parameters': {}}),
+        {'X-Tenant-ID': 'load-test'}, False, False),
+    'webhook_conversation_started': Scenario(
+        'POST', '/webhooks/elevenlabs/conversation-started', _json({'conversation_id': 'load-test'}),
+        {'X-Call-ID': 'load-test'}, False, False),
+    'webhook_conversation_turn': Scenario(
+        'POST', '/webhooks/elevenlabs/conversation-turn',
+        _json({'conversation_id': 'load-test', 'speaker': 'user', 'message': 'Hi', 'turn_number': 1}),
+        {}, False, False),
+    'webhook_conversation_ended': Scenario(
+        'POST', '/webhooks/elevenlabs/conversation-ended',
+        _json({'conversation_id': 'load-test', 'duration_seconds': 42}), {}, False, False),
+    'static_index': Scenario('GET', '/', None, {'Accept-Encoding': 'gzip, br'}, False, False),
+    'static_asset': Scenario('GET', f'/{ASSET}', None, {'Accept-Encoding': 'gzip, br'}, False, False),
+    'static_revalidate': Scenario('GET', f'/{ASSET}', None, {'If-None-Match': None}, False, False),
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ============================================
+# APP UNDER TEST
+# ============================================
+
+def start_app(args, fake_url, workdir):
+    """Run the app in a subprocess and wait until /api/health answers"""
+    dist = os.path.join(workdir, 'dist')
+    build_dist(dist)
+    os.makedirs(os.path.join(workdir, 'tenants'))
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        FLASK_ENV='testing',  # no rate limits
+        OPENAI_API_KEY='load-test', ANTHROPIC_API_KEY='load-test',
+        OPENAI_BASE_URL=f'{fake_url}/v1', ANTHROPIC_BASE_URL=fake_url,
+        FRONTEND_DIST=dist, TENANT_DATA_DIR=os.path.join(workdir, 'tenants'),
+        LOG_FILE=os.path.join(workdir, 'app-{pid}.log'), LOG_LEVEL='WARNING',
+    )
+    if getattr(args, 'preset', None):
+        # Worker model and sizing from gunicorn.conf.py / server_config.py
+        env['GUNICORN_PRESET'] = args.preset
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                   '--log-level', 'warning', 'app:create_app()']
+    elif args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(args.workers), '--worker-class', 'gthread', '--threads', str(args.threads),
+                   '--timeout', '120', '--log-level', 'warning', 'app:create_app()']
+    else:
+        command = [sys.executable, '-c',
+                   f"from app import create_app; create_app().run(port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup:\n{process.stderr.read().decode()[-2000:]}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return process, port
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('App did not become healthy within 30s')
+
+
+def worker_pids(process, server):
+    """gunicorn worker pids (Linux), or the server process itself"""
+    if server != 'gunicorn':
+        return [process.pid]
+    try:
+        with open(f'/proc/{process.pid}/task/{process.pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """Peak RSS per worker while a scenario runs"""
+
+    def __init__(self, pids, interval=0.25):
+        self.pids = pids
+        self.interval = interval
+        self.peak = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            for pid in self.pids:
+                value = rss_mb(pid)
+                if value is not None:
+                    self.peak[pid] = max(self.peak.get(pid, 0), value)
+            if self._stop.wait(self.interval):
+                return
+
+
+# ============================================
+# LOAD GENERATION
+# ============================================
+
+class VirtualUser:
+    """One client with a keep-alive connection and (if needed) a CSRF session"""
+
+    def __init__(self, port, timeout=60):
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+        self.cookie = None
+        self.csrf_token = None
+        self.etag = None
+        self.content_type = None
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.timeout)
+        return self.conn
+
+    def reset(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+
+    def login(self):
+        conn = self._connection()
+        conn.request('GET', '/api/csrf-token')
+        response = conn.getresponse()
+        self.csrf_token = json.loads(response.read())['csrf_token']
+        self.cookie = response.getheader('Set-Cookie', '').split(';', 1)[0]
+
+    def send(self, scenario, on_stream_open=None):
+        """
+        One request
+
+        Returns:
+            (status, seconds to first SSE event or None)
+        """
+        headers = dict(scenario.headers)
+        if 'If-None-Match' in headers:
+            if self.etag is None:
+                self.etag = self._fetch_etag(scenario.path)
+            headers['If-None-Match'] = self.etag
+        body = None
+        if scenario.body is not None:
+            body = json.dumps(scenario.body())
+            headers['Content-Type'] = 'application/json'
+        if scenario.csrf:
+            if self.csrf_token is None:
+                self.login()
+            headers['X-CSRFToken'] = self.csrf_token
+            headers['Cookie'] = self.cookie
+
+        start = time.perf_counter()
+        conn = self._connection()
+        conn.request(scenario.method, scenario.path, body=body, headers=headers)
+        response = conn.getresponse()
+        self.content_type = response.getheader('Content-Type', '')
+        if not scenario.stream or response.status != 200:
+            response.read()
+            return response.status, None
+
+        first_event = None
+        if on_stream_open:
+            on_stream_open(1)
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if first_event is None and line.startswith(b'data:'):
+                    first_event = time.perf_counter() - start
+        finally:
+            if on_stream_open:
+                on_stream_open(-1)
+        return response.status, first_event
+
+    def _fetch_etag(self, path):
+        conn = self._connection()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        return response.getheader('ETag')
+
+
+def unrouted_reason(scenario, port):
+    """Why a scenario's endpoint isn't served by this app (e.g. blueprint not registered), or None"""
+    client = VirtualUser(port)
+    try:
+        status, _ = client.send(scenario)
+    finally:
+        client.reset()
+    if status in (404, 405):
+        return f'HTTP {status}'
+    if scenario.path.startswith(('/api/', '/webhooks/')) and client.content_type.startswith('text/html'):
+        return 'answered by the SPA fallback'
+    return None
+
+
+def run_scenario(name, scenario, args, port, pids):
+    latencies, first_events = [], []
+    statuses = Counter()
+    lock = threading.Lock()
+    streams = {'open': 0, 'max': 0}
+
+    def stream_open(delta):
+        with lock:
+            streams['open'] += delta
+            streams['max'] = max(streams['max'], streams['open'])
+
+    def user(client, deadline, record):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status, first_event = client.send(scenario, stream_open if record else None)
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                status, first_event = type(e).__name__, None
+                client.reset()
+            elapsed = time.perf_counter() - start
+            if record:
+                with lock:
+                    statuses[status] += 1
+                    latencies.append(elapsed)
+                    if first_event is not None:
+                        first_events.append(first_event)
+
+    def phase(duration, record):
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=user, args=(client, deadline, record), daemon=True)
+                   for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # Sessions and lazily created provider clients shouldn't count
+    clients = [VirtualUser(port) for _ in range(args.concurrency)]
+    if scenario.csrf:
+        for client in clients:
+            client.login()
+    if args.warmup:
+        phase(args.warmup, record=False)
+
+    started = time.perf_counter()
+    with RssSampler(pids) as sampler:
+        phase(args.duration, record=True)
+    wall = time.perf_counter() - started
+    for client in clients:
+        client.reset()
+
+    ok = sum(count for status, count in statuses.items() if isinstance(status, int) and status < 400)
+    ms = lambda value: round(value * 1000, 1) if value is not None else None  # noqa: E731
+    return {
+        'requests': len(latencies),
+        'errors': len(latencies) - ok,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'rps': round(len(latencies) / wall, 1),
+        'p50_ms': ms(percentile(latencies, 0.5)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'first_event_p50_ms': ms(percentile(first_events, 0.5)),
+        'first_event_p95_ms': ms(percentile(first_events, 0.95)),
+        'max_streams_held': streams['max'] if scenario.stream else None,
+        'rss_mb_per_worker': [round(value, 1) for value in sampler.peak.values()],
+        'rss_mb_max': round(max(sampler.peak.values()), 1) if sampler.peak else None,
+    }
+
+
+# ============================================
+# BASELINES
+# ============================================
+
+# metric -> True if higher is better
+COMPARED_METRICS = {'rps': True, 'p95_ms': False, 'p99_ms': False, 'rss_mb_max': False}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print per-scenario deltas against a saved baseline
+
+    Returns:
+        List of (scenario, metric, baseline value, current value) regressions
+    """
+    regressions = []
+    print(f"\nvs baseline ({baseline['meta'].get('timestamp')}), tolerance {tolerance:.0%}")
+    print(f"{'scenario':<30}{'metric':<12}{'baseline':>10}{'current':>10}{'change':>9}")
+    for name, current in results['scenarios'].items():
+        previous = baseline['scenarios'].get(name)
+        if previous is None or 'skipped' in previous or 'skipped' in current:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            if regressed:
+                regressions.append((name, metric, before, after))
+            print(f"{name:<30}{metric:<12}{before:>10}{after:>10}{change:>+9.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end load test against a fake LLM provider')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', type=int, default=20, help='Virtual users per scenario')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1.0, help='Unmeasured seconds before each scenario')
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=16, help='gthread threads per worker')
+    parser.add_argument('--ttft', type=float, default=0.3, help='Fake provider seconds to first token')
+    parser.add_argument('--tokens-per-sec', type=float, default=60)
+    parser.add_argument('--max-output-tokens', type=int, default=40)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of provider calls failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share failing with 429')
+    parser.add_argument('--save', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Compare against this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    settings = FakeLLMSettings(args.ttft, args.tokens_per_sec, args.max_output_tokens,
+                               args.error_rate, args.rate_limit_rate, seed=1)
+    fake_server, fake_url = make_server(settings)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'server': args.server,
+            'workers': args.workers if args.server == 'gunicorn' else 1,
+            'threads': args.threads if args.server == 'gunicorn' else None,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'fake_provider': settings.to_dict(),
+        },
+        'scenarios': {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process, port = start_app(args, fake_url, workdir)
+        try:
+            pids = worker_pids(process, args.server)
+            print(f"App on :{port} ({args.server}, {len(pids)} worker(s)); fake provider {fake_url} "
+                  f"ttft={args.ttft}s {args.tokens_per_sec} tok/s error_rate={args.error_rate}")
+            print(f"{'scenario':<30}{'reqs':>7}{'err':>6}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                  f"{'1st ev p50':>11}{'streams':>9}{'rss MB':>8}")
+            for name in names:
+                reason = unrouted_reason(SCENARIOS[name], port)
+                if reason:
+                    print(f"{name:<30}skipped: not routed ({reason})")
+                    results['scenarios'][name] = {'skipped': f'not routed ({reason})'}
+                    continue
+                stats = run_scenario(name, SCENARIOS[name], args, port, pids)
+                results['scenarios'][name] = stats
+                fmt = lambda value, width: f"{'-' if value is None else value:>{width}}"  # noqa: E731
+                print(f"{name:<30}{stats['requests']:>7}{stats['errors']:>6}{stats['rps']:>8}"
+                      f"{fmt(stats['p50_ms'], 9)}{fmt(stats['p95_ms'], 9)}{fmt(stats['p99_ms'], 9)}"
+                      f"{fmt(stats['first_event_p50_ms'], 11)}{fmt(stats['max_streams_held'], 9)}"
+                      f"{fmt(stats['rss_mb_max'], 8)}")
+                if stats['errors']:
+                    print(f"{'':<30}statuses: {stats['statuses']}")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            fake_server.shutdown()
+
+    results['meta']['provider_requests'] = settings.requests
+    results['meta']['provider_max_open_streams'] = settings.max_open_streams
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
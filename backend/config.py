@@ -35,7 +35,12 @@ class Config:
 
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
-    LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')
+    LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')  # may contain {pid}
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN')  # e.g. 'midnight'; size-based if unset
+    LOG_INFO_SAMPLE_RATE = float(os.environ.get('LOG_INFO_SAMPLE_RATE', 1.0))
 
     # LLM Configuration
     DEFAULT_MODEL = os.environ.get('DEFAULT_MODEL', 'gpt-4')
@@ -43,6 +48,135 @@ class Config:
     TEMPERATURE = float(os.environ.get('TEMPERATURE', 0.7))
     STREAM_ENABLED = os.environ.get('STREAM_ENABLED', 'True') == 'True'
 
+    # Drop the oldest history turns beyond this many (estimated) tokens; unset = keep all
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.environ['CHAT_HISTORY_TOKEN_BUDGET']) if os.environ.get('CHAT_HISTORY_TOKEN_BUDGET') else None
+    # Send per-stage timings in a Server-Timing header (internal detail; off in production)
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'False') == 'True'
+
+    # Prompt layout: 'dynamic' (knowledge in the system prompt on keyword match)
+    # or 'stable' (fixed persona + compact knowledge prefix, retrieved content
+    # after the history) for provider prefix caching
+    PROMPT_LAYOUT = os.environ.get('PROMPT_LAYOUT', 'dynamic')
+    PREFIX_CACHE_MAX_CONVERSATIONS = int(os.environ.get('PREFIX_CACHE_MAX_CONVERSATIONS', 10000))
+
+    # Single-flight for identical concurrent first messages: off, local (per
+    # worker) or redis (across workers, via pub/sub)
+    COALESCE_MODE = os.environ.get('COALESCE_MODE', 'local')
+    COALESCE_MAX_CHARS = int(os.environ.get('COALESCE_MAX_CHARS', 200))
+    COALESCE_TIMEOUT = int(os.environ.get('COALESCE_TIMEOUT', 30))
+    COALESCE_REDIS_URL = os.environ.get('COALESCE_REDIS_URL', os.environ.get('REDIS_URL'))
+
+    # SSE replay buffer for Last-Event-ID resumption; set STREAM_REPLAY_REDIS_URL
+    # to resume on any worker
+    STREAM_REPLAY_TTL = int(os.environ.get('STREAM_REPLAY_TTL', 300))
+    STREAM_REPLAY_MAX_STREAMS = int(os.environ.get('STREAM_REPLAY_MAX_STREAMS', 1000))
+    STREAM_REPLAY_REDIS_URL = os.environ.get('STREAM_REPLAY_REDIS_URL')
+
+    # Background jobs: local (in-process, bounded) or redis (durable)
+    JOB_QUEUE_MODE = os.environ.get('JOB_QUEUE_MODE', 'local')
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 1000))
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_RETRIES = int(os.environ.get('JOB_MAX_RETRIES', 3))
+    JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 2.0))  # seconds, doubled per attempt
+    JOB_DEAD_LETTER_SIZE = int(os.environ.get('JOB_DEAD_LETTER_SIZE', 1000))
+    JOB_REDIS_URL = os.environ.get('JOB_REDIS_URL', os.environ.get('REDIS_URL'))
+
+    # CRM tool execution: concurrent read-only tools per batch request
+    TOOL_WORKERS = int(os.environ.get('TOOL_WORKERS', 4))
+    TOOL_BATCH_MAX_CALLS = int(os.environ.get('TOOL_BATCH_MAX_CALLS', 10))
+    # Shared secret (X-Service-Token) for server-to-server tool calls that name
+    # the tenant in X-Tenant-ID; without it only JWTs are accepted
+    TOOL_SERVICE_TOKEN = os.environ.get('TOOL_SERVICE_TOKEN')
+
+    # Per-tenant generation profile overrides (JSON):
+    # {"<tenant_id>": {"sales": {"model": "gpt-4o-mini", "max_tokens": 120}}}
+    TENANT_PROFILE_OVERRIDES = os.environ.get('TENANT_PROFILE_OVERRIDES')
+
+    # Import provider SDKs at startup (for gunicorn --preload); otherwise
+    # they load on the first request that needs them
+    PRELOAD_SDKS = os.environ.get('PRELOAD_SDKS', 'False') == 'True'
+
+    # Tenant prompt/knowledge cache
+    TENANT_DATA_DIR = os.environ.get('TENANT_DATA_DIR', 'tenants')  # <tenant_id>.json files
+    # Chats for a tenant without a file: 404 instead of the default sales persona
+    REJECT_UNKNOWN_TENANTS = os.environ.get('REJECT_UNKNOWN_TENANTS', 'False') == 'True'
+    TENANT_CACHE_SIZE = int(os.environ.get('TENANT_CACHE_SIZE', 256))
+    TENANT_CACHE_REFRESH = int(os.environ.get('TENANT_CACHE_REFRESH', 300))  # seconds, background reload
+    TENANT_CACHE_TTL = int(os.environ.get('TENANT_CACHE_TTL', 3600))  # seconds, hard expiry
+    # Pub/sub for invalidations across workers (without it, only the worker
+    # handling the invalidate request drops its copy)
+    TENANT_CACHE_REDIS_URL = os.environ.get('TENANT_CACHE_REDIS_URL', os.environ.get('REDIS_URL'))
+    # PWA bootstrap document: browser cache lifetime, then served stale while revalidating (304)
+    TENANT_BOOTSTRAP_MAX_AGE = int(os.environ.get('TENANT_BOOTSTRAP_MAX_AGE', 60))
+    TENANT_BOOTSTRAP_SWR = int(os.environ.get('TENANT_BOOTSTRAP_SWR', 86400))
+    # Shared secret for POST /api/tenants/<id>/invalidate (disabled if unset)
+    TENANT_ADMIN_TOKEN = os.environ.get('TENANT_ADMIN_TOKEN')
+    # Shared secret (X-Admin-Token) for operator endpoints such as per-conversation
+    # and dead-letter metrics; they answer 404 if unset
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or TENANT_ADMIN_TOKEN
+
+    # Response compression
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True') == 'True'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # bytes
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip 1-9
+    COMPRESS_BR_QUALITY = int(os.environ.get('COMPRESS_BR_QUALITY', 4))  # brotli 0-11
+    COMPRESS_SSE = os.environ.get('COMPRESS_SSE', 'True') == 'True'
+
+    # Request bodies: default per-route cap (enforced while reading), larger
+    # caps for chat (default: the largest valid ChatRequest, see models.py)
+    # and voice transcript webhooks, and body bytes read and held per worker
+    MAX_CONTENT_LENGTH = int(os.environ.get('INGRESS_MAX_BYTES', 64 * 1024))
+    CHAT_MAX_BODY_BYTES = int(os.environ['CHAT_MAX_BODY_BYTES']) if os.environ.get('CHAT_MAX_BODY_BYTES') else None
+    WEBHOOK_MAX_BODY_BYTES = int(os.environ.get('WEBHOOK_MAX_BODY_BYTES', 4 * 1024 * 1024))
+    INGRESS_MEMORY_BUDGET = int(os.environ.get('INGRESS_MEMORY_BUDGET', 64 * 1024 * 1024))
+
+    # Graceful shutdown: on SIGTERM, SSE streams get STREAM_DRAIN_TIMEOUT
+    # seconds to finish (then a reconnect or error event); cut streams'
+    # upstreams and then queued jobs/telemetry/logs each get
+    # SHUTDOWN_FLUSH_TIMEOUT seconds to flush
+    STREAM_DRAIN_TIMEOUT = float(os.environ.get('STREAM_DRAIN_TIMEOUT', 60))
+    SHUTDOWN_FLUSH_TIMEOUT = float(os.environ.get('SHUTDOWN_FLUSH_TIMEOUT', 10))
+    STREAM_RECONNECT_MS = int(os.environ.get('STREAM_RECONNECT_MS', 1000))
+
+    # Gunicorn worker model (see server_config.py): sync, gthread or gevent,
+    # sized from CPUs/memory unless WEB_CONCURRENCY / GUNICORN_THREADS are set.
+    # GUNICORN_STREAM_SHARE is the expected fraction of in-flight requests
+    # that are SSE streams (more streams -> more threads per worker)
+    GUNICORN_PRESET = os.environ.get('GUNICORN_PRESET', 'gthread')
+    WEB_CONCURRENCY = int(os.environ['WEB_CONCURRENCY']) if os.environ.get('WEB_CONCURRENCY') else None
+    GUNICORN_THREADS = int(os.environ['GUNICORN_THREADS']) if os.environ.get('GUNICORN_THREADS') else None
+    GUNICORN_STREAM_SHARE = float(os.environ.get('GUNICORN_STREAM_SHARE', 0.5))
+    GUNICORN_WORKER_RSS_MB = int(os.environ.get('GUNICORN_WORKER_RSS_MB', 150))
+    GUNICORN_WORKER_CONNECTIONS = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+    GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+    GUNICORN_KEEPALIVE = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+    GUNICORN_MAX_REQUESTS = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+    GUNICORN_MAX_REQUESTS_JITTER = float(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0.1))  # share of max
+
+    # /readyz: probes run in the background every HEALTH_PROBE_INTERVAL
+    # seconds; only READYZ_CRITICAL probes (redis, database, openai,
+    # anthropic) make the instance not ready
+    DATABASE_URL = os.environ.get('DATABASE_URL')
+    HEALTH_PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', 15))
+    HEALTH_PROBE_TIMEOUT = float(os.environ.get('HEALTH_PROBE_TIMEOUT', 2))
+    READYZ_CRITICAL = os.environ.get('READYZ_CRITICAL', 'redis,database')
+
+    # Request profiling: requests with X-Profile: <PROFILE_TOKEN> and a
+    # random 1-in-PROFILE_SAMPLE_RATE are sampled and saved as collapsed
+    # stacks; off when neither is set
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'logs/profiles')
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+    # Frontend telemetry (RUM metrics / critical errors)
+    TELEMETRY_MAX_BYTES = int(os.environ.get('TELEMETRY_MAX_BYTES', 64 * 1024))
+    TELEMETRY_MAX_EVENTS = int(os.environ.get('TELEMETRY_MAX_EVENTS', 50))
+    TELEMETRY_FLUSH_INTERVAL = float(os.environ.get('TELEMETRY_FLUSH_INTERVAL', 60))
+    TELEMETRY_MAX_KEYS = int(os.environ.get('TELEMETRY_MAX_KEYS', 1000))
+    TELEMETRY_MAX_ERROR_GROUPS = int(os.environ.get('TELEMETRY_MAX_ERROR_GROUPS', 1000))
+
     # Security Headers
     FORCE_HTTPS = False
     HSTS_MAX_AGE = 31536000  # 1 year
@@ -56,6 +190,7 @@ class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
     SESSION_COOKIE_SECURE = False  # Allow HTTP in dev
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'True') == 'True'
 
 class ProductionConfig(Config):
     """Production configuration"""
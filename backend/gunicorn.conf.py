@@ -0,0 +1,39 @@
+"""
+Gunicorn settings (loaded automatically when gunicorn runs from backend/)
+
+The worker model comes from GUNICORN_PRESET (sync, gthread, gevent) and is
+sized for this machine by server_config.py; inspect it with
+``python server_config.py``. Command-line flags still override it. On
+SIGTERM (deploys) or after its max_requests-th request (recycling, which
+sends no signal) each worker drains its streams and flushes queued work
+before exiting; see app/lifecycle.py.
+"""
+from config import Config
+from server_config import gunicorn_settings
+
+globals().update(gunicorn_settings(Config))
+
+
+def _lifecycle(worker):
+    return getattr(getattr(worker, 'wsgi', None), 'lifecycle', None)
+
+
+def post_worker_init(worker):
+    lifecycle = _lifecycle(worker)
+    if lifecycle is not None:
+        lifecycle.install_signal_handler()
+
+
+def post_request(worker, req, environ, resp):
+    # max_requests recycling only sets worker.alive = False; without this the
+    # streams still in flight would never get a drain deadline
+    if worker.nr >= worker.max_requests or not worker.alive:
+        lifecycle = _lifecycle(worker)
+        if lifecycle is not None:
+            lifecycle.begin_drain()
+
+
+def worker_exit(server, worker):
+    lifecycle = _lifecycle(worker)
+    if lifecycle is not None:
+        lifecycle.shutdown()
@@ -0,0 +1,43 @@
+"""
+Container health check
+
+Stdlib only, so Docker/compose health checks don't import the app or any
+third-party package. Exits 0 if the endpoint answers 200, 1 otherwise.
+
+Usage:
+    python healthcheck.py [--ready] [--url http://localhost:5001] [--timeout 3]
+"""
+import argparse
+import http.client
+import os
+import sys
+from urllib.parse import urlsplit
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check /livez (or /readyz)')
+    parser.add_argument('--url', default=os.environ.get('HEALTHCHECK_URL', 'http://localhost:5001'))
+    parser.add_argument('--ready', action='store_true', help='Check /readyz instead of /livez')
+    parser.add_argument('--timeout', type=float, default=3.0)
+    args = parser.parse_args()
+
+    parts = urlsplit(args.url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    conn = connection_class(parts.hostname, parts.port, timeout=args.timeout)
+    try:
+        conn.request('GET', '/readyz' if args.ready else '/livez')
+        response = conn.getresponse()
+        body = response.read()
+    except OSError as e:
+        print(f'unhealthy: {e}', file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    if response.status != 200:
+        print(f'unhealthy: HTTP {response.status} {body[:200].decode("utf-8", "replace")}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,6 +21,7 @@ if __name__ == '__main__':
     Available endpoints:
     - GET  /                    Frontend (if built)
     - GET  /api/health          Health check
+    - GET  /livez, /readyz      Liveness / readiness probes
     - GET  /api/models          List available models
     - POST /api/chat            Chat (non-streaming)
     - POST /api/chat/stream     Chat (streaming SSE)
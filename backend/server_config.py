@@ -0,0 +1,139 @@
+"""
+Gunicorn worker-model presets
+
+Turns ``Config`` (GUNICORN_* settings) into gunicorn settings, sizing
+workers and threads from the CPUs and memory actually available to the
+container (cgroup limits included) and the expected share of in-flight
+requests that are SSE streams. ``gunicorn.conf.py`` applies the result.
+
+Presets:
+    sync     One request per worker. Only for short requests: a stream holds
+             the whole worker and is killed after ``timeout``.
+    gthread  Threads per worker (default). Streams hold a thread, not a
+             worker; the heartbeat keeps long streams alive.
+    gevent   Greenlets (needs ``pip install gevent``), for streaming-heavy
+             traffic with thousands of mostly idle connections.
+
+Usage (from backend/):
+    python server_config.py [--preset gthread] [--cpus 4] [--memory-mb 2048]
+"""
+import argparse
+import importlib.util
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+PRESETS = ('sync', 'gthread', 'gevent')
+PRESET_ALIASES = {'async': 'gevent', 'threads': 'gthread'}
+
+
+def available_cpus():
+    """CPUs this process may use, honouring a cgroup v2 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(math.ceil(int(quota) / int(period)), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def available_memory_mb():
+    """Memory limit of the container (cgroup v2/v1), else physical memory"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 50:  # v1 reports ~2**63 when unlimited
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def gunicorn_settings(config, cpus=None, memory_mb=None):
+    """
+    Gunicorn settings for ``config.GUNICORN_PRESET``
+
+    Args:
+        config: Config class (or any object with the GUNICORN_* attributes)
+        cpus: Override the detected CPU count
+        memory_mb: Override the detected memory limit
+
+    Returns:
+        Dict of gunicorn setting names to values
+    """
+    preset = PRESET_ALIASES.get(config.GUNICORN_PRESET, config.GUNICORN_PRESET)
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown GUNICORN_PRESET: {config.GUNICORN_PRESET} (expected one of {', '.join(PRESETS)})")
+    if preset == 'gevent' and importlib.util.find_spec('gevent') is None:
+        logger.warning("GUNICORN_PRESET=gevent but gevent is not installed; using gthread")
+        preset = 'gthread'
+
+    cpus = cpus or available_cpus()
+    memory_mb = memory_mb if memory_mb is not None else available_memory_mb()
+    stream_share = min(max(config.GUNICORN_STREAM_SHARE, 0.0), 1.0)
+
+    if preset == 'sync':
+        workers, threads = 2 * cpus + 1, 1
+    elif preset == 'gthread':
+        # A stream holds its thread for seconds, a normal request for ms
+        workers, threads = cpus + 1, round(4 + 28 * stream_share)
+    else:
+        workers, threads = cpus, 1
+
+    # Leave a quarter of memory for the master, page cache and spikes
+    if memory_mb:
+        workers = min(workers, max(int(memory_mb * 0.75 // config.GUNICORN_WORKER_RSS_MB), 1))
+    workers = config.WEB_CONCURRENCY or workers
+    threads = config.GUNICORN_THREADS or threads
+
+    settings = {
+        'worker_class': preset,
+        'workers': workers,
+        'threads': threads,
+        'timeout': config.GUNICORN_TIMEOUT,
+        'keepalive': config.GUNICORN_KEEPALIVE,
+        # Recycle workers so slow leaks can't grow RSS forever; jitter keeps
+        # them from restarting together. Recycling sends no SIGTERM, so
+        # gunicorn.conf.py's post_request hook starts the stream drain
+        'max_requests': config.GUNICORN_MAX_REQUESTS,
+        'max_requests_jitter': int(config.GUNICORN_MAX_REQUESTS * config.GUNICORN_MAX_REQUESTS_JITTER),
+        # Time from SIGTERM to SIGKILL: the stream drain, waiting for cut
+        # streams' upstreams, and the flush (see StreamLifecycle.shutdown)
+        'graceful_timeout': int(config.STREAM_DRAIN_TIMEOUT + 2 * config.SHUTDOWN_FLUSH_TIMEOUT + 5),
+    }
+    if preset == 'gevent':
+        settings['worker_connections'] = config.GUNICORN_WORKER_CONNECTIONS
+    return settings
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Show the gunicorn settings for a preset')
+    parser.add_argument('--preset', default=Config.GUNICORN_PRESET, help=', '.join(PRESETS))
+    parser.add_argument('--cpus', type=int)
+    parser.add_argument('--memory-mb', type=int)
+    args = parser.parse_args()
+
+    config = type('PresetConfig', (Config,), {'GUNICORN_PRESET': args.preset})
+    cpus = args.cpus or available_cpus()
+    memory_mb = args.memory_mb or available_memory_mb()
+    print(f"{cpus} CPU(s), {memory_mb} MB, stream share {Config.GUNICORN_STREAM_SHARE}")
+    for name, value in gunicorn_settings(config, cpus, memory_mb).items():
+        print(f"{name} = {value!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Shared fixtures
+
+Apps are built with the testing config; per-test settings are patched onto
+TestingConfig (Config reads the environment at import time).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import TestingConfig  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Factory: ``make_app(SETTING=value, ...)`` returns a new app"""
+    def make(**settings):
+        from app import create_app
+        defaults = {
+            'LOG_FILE': str(tmp_path / 'app.log'),
+            'TENANT_DATA_DIR': str(tmp_path / 'tenants'),
+            'WTF_CSRF_ENABLED': False,
+        }
+        for name, value in {**defaults, **settings}.items():
+            monkeypatch.setattr(TestingConfig, name, value, raising=False)
+        (tmp_path / 'tenants').mkdir(exist_ok=True)
+        return create_app('testing')
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def write_tenant(tmp_path):
+    """Write ``<tenant_id>.json`` into the test app's TENANT_DATA_DIR"""
+    def write(tenant_id, data):
+        import json
+        (tmp_path / 'tenants').mkdir(exist_ok=True)
+        (tmp_path / 'tenants' / f'{tenant_id}.json').write_text(json.dumps(data))
+    return write
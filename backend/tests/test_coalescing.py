@@ -0,0 +1,99 @@
+import threading
+
+from app.coalescing import Coalescer, RedisFlights
+
+
+def run_in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', fn()), daemon=True)
+    thread.start()
+    return thread, result
+
+
+def test_distinct_calls_do_not_wait_for_each_other():
+    coalescer = Coalescer('local')
+    release = threading.Event()
+    slow_started = threading.Event()
+
+    def slow():
+        slow_started.set()
+        release.wait(5)
+        return {'success': True, 'message': 'slow'}
+
+    slow_thread, _ = run_in_thread(lambda: coalescer.call('a', slow))
+    assert slow_started.wait(2)
+
+    # 'a' is still running its provider call; 'b' must not queue behind it
+    fast_thread, fast = run_in_thread(lambda: coalescer.call('b', lambda: {'success': True, 'message': 'fast'}))
+    fast_thread.join(2)
+    assert fast.get('value') == {'success': True, 'message': 'fast'}
+
+    release.set()
+    slow_thread.join(2)
+
+
+def test_distinct_streams_open_outside_the_lock():
+    coalescer = Coalescer('local')
+    release = threading.Event()
+
+    def slow_factory():
+        release.wait(5)  # e.g. chat.completions.create waiting for headers
+        return iter([{'type': 'done'}])
+
+    slow_thread, _ = run_in_thread(lambda: list(coalescer.stream('a', slow_factory)))
+    fast_thread, fast = run_in_thread(lambda: list(coalescer.stream('b', lambda: iter([{'type': 'done'}]))))
+    fast_thread.join(2)
+    assert fast.get('value') == [{'type': 'done'}]
+
+    release.set()
+    slow_thread.join(2)
+
+
+def test_identical_concurrent_calls_share_one_result():
+    coalescer = Coalescer('local')
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {'success': True, 'message': 'shared'}
+
+    leader, leader_result = run_in_thread(lambda: coalescer.call('k', fn))
+    while not calls:
+        pass
+    follower, follower_result = run_in_thread(lambda: coalescer.call('k', fn))
+    while coalescer.followers == 0:
+        pass
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert len(calls) == 1
+    assert leader_result['value'] == {'success': True, 'message': 'shared'}
+    assert follower_result['value'] == {'success': True, 'message': 'shared', 'coalesced': True}
+
+
+class DownRedis:
+    """Takes the leader key, then fails every write"""
+
+    def __init__(self):
+        self.deleted = []
+
+    def set(self, key, value, nx=False, ex=None):
+        return True
+
+    def delete(self, key):
+        self.deleted.append(key)
+
+    def pipeline(self):
+        raise ConnectionError('Redis went away')
+
+
+def test_leader_keeps_streaming_when_the_mirror_fails():
+    flights = RedisFlights('redis://localhost:6379/0')  # from_url doesn't connect
+    flights.client = flights.log.client = DownRedis()
+    events = [{'type': 'chunk', 'content': 'Hi'}, {'type': 'chunk', 'content': '!'}, {'type': 'done'}]
+
+    assert list(flights.stream('k', lambda: iter(events))) == events
+    assert flights.client.deleted == ['coalesce:k']
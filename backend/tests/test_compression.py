@@ -0,0 +1,41 @@
+"""Response compression: SSE frames must be decodable as they arrive"""
+import zlib
+
+import pytest
+from flask import Response
+
+from app.compression import StreamCompressor
+
+FRAMES = [f'data: {{"type": "chunk", "content": "token {i} "}}\n\n'.encode() for i in range(5)]
+
+
+def decompressor(encoding):
+    if encoding == 'br':
+        brotli = pytest.importorskip('brotli')
+        return brotli.Decompressor().process
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br'])
+def test_each_frame_decodes_without_waiting_for_the_next(encoding):
+    decompress = decompressor(encoding)
+    compressor = StreamCompressor(encoding)
+    for frame in FRAMES:
+        assert decompress(compressor.compress(frame)) == frame
+    assert decompress(compressor.finish()) == b''
+
+
+def test_sse_response_is_flushed_per_frame(make_app):
+    app = make_app(COMPRESS_SSE=True)
+
+    @app.route('/test/events')
+    def events():
+        return Response(iter(FRAMES), mimetype='text/event-stream')
+
+    response = app.test_client().get('/test/events', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    decompress = decompressor('gzip')
+    body = response.response
+    for frame in FRAMES:
+        assert decompress(next(body)) == frame
+    response.close()
@@ -0,0 +1,25 @@
+"""Gunicorn hooks"""
+import os
+import runpy
+from types import SimpleNamespace
+
+from app.lifecycle import StreamLifecycle
+
+CONF = runpy.run_path(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+
+
+def make_worker(nr, max_requests, alive=True):
+    return SimpleNamespace(nr=nr, max_requests=max_requests, alive=alive,
+                           wsgi=SimpleNamespace(lifecycle=StreamLifecycle()))
+
+
+def test_recycled_worker_starts_draining():
+    worker = make_worker(nr=100, max_requests=100, alive=False)
+    CONF['post_request'](worker, None, {}, None)
+    assert worker.wsgi.lifecycle.draining
+
+
+def test_busy_worker_keeps_serving():
+    worker = make_worker(nr=10, max_requests=100)
+    CONF['post_request'](worker, None, {}, None)
+    assert not worker.wsgi.lifecycle.draining
@@ -0,0 +1,70 @@
+"""Request body caps"""
+import io
+import json
+
+import pytest
+from flask import jsonify
+
+from app.ingress import IngressBusy, IngressGuard, MeteredInput, body_limit, read_body
+from app.models import CHAT_REQUEST_MAX_BYTES, HISTORY_CONTENT_MAX_CHARS, HISTORY_MAX_MESSAGES
+
+
+def test_largest_valid_chat_body_is_accepted(client):
+    # Escaped non-ASCII: 6 bytes per character
+    history = [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': 'é' * HISTORY_CONTENT_MAX_CHARS}
+               for i in range(HISTORY_MAX_MESSAGES)]
+    body = json.dumps({'message': 'Hello', 'history': history})
+    assert len(body) > 1024 * 1024
+
+    response = client.post('/api/chat', data=body, content_type='application/json')
+    assert response.status_code not in (400, 413)
+
+
+def test_oversize_chat_body_is_rejected(app):
+    client = app.test_client()
+    response = client.post('/api/chat', data=b'x' * (CHAT_REQUEST_MAX_BYTES + 1), content_type='application/json')
+    assert response.status_code == 413
+    assert app.ingress.stats()['rejected_too_large'] == 1
+
+
+def test_body_limit_by_config_key(make_app):
+    app = make_app(WEBHOOK_MAX_BODY_BYTES=2 * 1024 * 1024)
+
+    @app.route('/test/transcript', methods=['POST'])
+    @body_limit('WEBHOOK_MAX_BODY_BYTES')
+    def transcript():
+        return jsonify({'bytes': len(read_body())})
+
+    client = app.test_client()
+    response = client.post('/test/transcript', data=b'x' * (1024 * 1024))
+    assert response.status_code == 200
+    assert client.post('/test/transcript', data=b'x' * (3 * 1024 * 1024)).status_code == 413
+
+
+def test_declared_length_is_not_charged_until_read():
+    guard = IngressGuard(budget=1000)
+    metered = MeteredInput(io.BytesIO(b'x' * 3000), guard, free_bytes=100)
+    assert guard.stats()['in_flight_bytes'] == 0
+    assert len(metered.read(100)) == 100
+    assert len(metered.read(800)) == 800
+    assert guard.stats()['in_flight_bytes'] == 900
+    with pytest.raises(IngressBusy):
+        metered.read(800)
+
+
+def test_small_bodies_are_admitted_when_the_budget_is_spent(make_app):
+    app = make_app(INGRESS_MEMORY_BUDGET=1024 * 1024)
+
+    @app.route('/test/echo', methods=['POST'])
+    @body_limit(4 * 1024 * 1024)
+    def echo():
+        return jsonify({'bytes': len(read_body())})
+
+    client = app.test_client()
+    # Other requests hold the whole budget
+    app.ingress.reserve(1024 * 1024, force=True)
+    assert client.post('/test/echo', data=b'x' * 1024).status_code == 200
+    response = client.post('/test/echo', data=b'x' * (2 * 1024 * 1024))
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert app.ingress.stats()['in_flight_bytes'] == 1024 * 1024
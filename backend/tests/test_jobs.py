@@ -0,0 +1,138 @@
+import fnmatch
+import time
+
+import pytest
+
+from app import jobs
+from app.jobs import JobQueue, LocalJobBackend, RedisJobBackend, task
+
+
+class FakeRedis:
+    """The few Redis commands RedisJobBackend's heartbeat and requeue use, with key expiry"""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+
+    def set(self, key, value, ex=None):
+        self.values[key] = (value, time.monotonic() + ex if ex else None)
+
+    def exists(self, key):
+        value = self.values.get(key)
+        return int(value is not None and (value[1] is None or value[1] > time.monotonic()))
+
+    def scan_iter(self, pattern):
+        keys = list(self.lists) + [key for key in self.values if self.exists(key)]
+        return [key.encode() for key in keys if fnmatch.fnmatch(key, pattern)]
+
+    def rpoplpush(self, source, destination):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        item = items.pop()
+        self.lists.setdefault(destination, []).insert(0, item)
+        return item
+
+
+def redis_backend(client, name):
+    """RedisJobBackend on ``client`` as if it ran in process ``name``"""
+    cls = type('ProcessBackend', (RedisJobBackend,), {'processing': f'jobs:processing:{name}'})
+    backend = cls('redis://localhost:6379/0')  # from_url doesn't connect
+    backend.client = client
+    return backend
+
+
+def test_long_running_job_is_not_requeued(monkeypatch):
+    monkeypatch.setattr(jobs, 'HEARTBEAT_INTERVAL', 0.05)
+    monkeypatch.setattr(jobs, 'ALIVE_TTL', 0.2)
+    client = FakeRedis()
+
+    busy = redis_backend(client, 'host:1')
+    busy._heartbeat()
+    client.lists[busy.processing] = [b'{"name": "slow"}']  # a job whose handler is still running
+
+    time.sleep(0.5)  # well past ALIVE_TTL without another get()
+    redis_backend(client, 'host:2')._requeue_orphans()
+    assert client.lists[busy.processing] == [b'{"name": "slow"}']
+    assert not client.lists.get(RedisJobBackend.QUEUE)
+
+
+def test_dead_worker_jobs_are_requeued():
+    client = FakeRedis()
+    client.lists['jobs:processing:host:1'] = [b'{"name": "orphan"}']
+    redis_backend(client, 'host:2')._requeue_orphans()
+    assert client.lists[RedisJobBackend.QUEUE] == [b'{"name": "orphan"}']
+
+
+def test_failing_job_is_retried_then_dead_lettered():
+    attempts = []
+
+    @task('test_always_fails', max_retries=1)
+    def always_fails(value):
+        attempts.append(value)
+        raise RuntimeError('boom')
+
+    queue = JobQueue(LocalJobBackend(), workers=1, retry_backoff=0.01)
+    queue.enqueue('test_always_fails', value=1)
+    deadline = time.time() + 3
+    while not queue.counts['dead'] and time.time() < deadline:
+        time.sleep(0.02)
+    queue.stop(timeout=1)
+
+    assert attempts == [1, 1]
+    assert queue.dead_letters()[0]['error'] == 'boom'
+
+
+def test_retry_pending_at_shutdown_runs_before_exit():
+    attempts = []
+
+    @task('test_fails_once')
+    def fails_once(call_id):
+        attempts.append(call_id)
+        if len(attempts) == 1:
+            raise RuntimeError('db timeout')
+
+    queue = JobQueue(LocalJobBackend(), workers=1, retry_backoff=60)
+    queue.enqueue('test_fails_once', call_id='c1')
+    deadline = time.time() + 3
+    while not queue.backend.depth()['delayed'] and time.time() < deadline:
+        time.sleep(0.02)
+    queue.stop(timeout=2)
+
+    assert attempts == ['c1', 'c1']
+    assert queue.stats()['succeeded'] == 1 and queue.backend.depth()['delayed'] == 0
+
+
+def test_jobs_left_at_shutdown_are_dead_lettered_and_later_ones_run_inline():
+    ran = []
+
+    @task('test_slow')
+    def slow(value):
+        time.sleep(0.3)
+        ran.append(value)
+
+    queue = JobQueue(LocalJobBackend(), workers=1)
+    queue.enqueue('test_slow', value=1)
+    queue.enqueue('test_slow', value=2)
+    time.sleep(0.05)
+    queue.stop(timeout=0.1)
+    time.sleep(0.3)
+    assert [job['kwargs'] for job in queue.dead_letters()] == [{'value': 2}]
+
+    queue.enqueue('test_slow', value=3)
+    assert ran == [1, 3]
+    assert queue.stats()['inline'] == 1
+
+
+@pytest.fixture
+def admin_client(make_app):
+    return make_app(ADMIN_TOKEN='s3cret').test_client()
+
+
+def test_dead_letters_need_the_admin_token(admin_client):
+    assert admin_client.get('/api/metrics/jobs?dead=1').status_code == 401
+    assert admin_client.get('/api/metrics/jobs/dead').status_code == 401
+    assert admin_client.get('/api/metrics/jobs/dead', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    assert admin_client.get('/api/metrics/jobs/dead', headers={'X-Admin-Token': 'é'}).status_code == 401
+    response = admin_client.get('/api/metrics/jobs/dead', headers={'X-Admin-Token': 's3cret'})
+    assert response.status_code == 200 and response.get_json() == {'dead_letters': []}
@@ -0,0 +1,81 @@
+"""Graceful shutdown of SSE streams"""
+import json
+import threading
+import time
+
+import pytest
+
+from app.lifecycle import StreamLifecycle
+from app.llm_service import LLMService
+from app.stream_replay import StreamReplayBuffer
+
+
+def slow_answer(closed, chunks=5, delay=0.05):
+    try:
+        for i in range(chunks):
+            time.sleep(delay)
+            yield {'type': 'chunk', 'content': f'{i} '}
+        yield {'type': 'done', 'usage': {}}
+    finally:
+        closed.set()
+
+
+@pytest.fixture
+def shared_replay(monkeypatch):
+    """Replay buffers behave as if backed by Redis"""
+    monkeypatch.setattr(StreamReplayBuffer, 'shared', True)
+
+
+def test_shutdown_waits_for_drains_into_a_shared_log(shared_replay):
+    lifecycle = StreamLifecycle(drain_timeout=0, flush_timeout=5)
+    replay = StreamReplayBuffer(lifecycle=lifecycle)
+    stream_id, events = replay.open(slow_answer(threading.Event()))
+    next(events)
+    events.close()  # the client went away; a drain thread finishes the answer
+    assert lifecycle.stats()['background_drains'] == 1
+
+    flushed = []
+    lifecycle.on_shutdown('jobs', lambda: flushed.append(len(replay._streams[stream_id][0].events)))
+    lifecycle.shutdown()
+    assert flushed == [6]
+    assert lifecycle.background == 0
+
+
+def test_local_log_is_not_drained_while_shutting_down():
+    lifecycle = StreamLifecycle(drain_timeout=0, flush_timeout=5)
+    replay = StreamReplayBuffer(lifecycle=lifecycle)
+    closed = threading.Event()
+    _, events = replay.open(slow_answer(closed))
+    next(events)
+    lifecycle.begin_drain()
+    events.close()
+    assert closed.is_set()
+    assert lifecycle.background == 0
+
+
+def cut_stream(app, client, monkeypatch):
+    """Start a stream, begin draining past its deadline, and read the rest"""
+    monkeypatch.setattr(LLMService, 'chat_openai',
+                        lambda self, messages, **kwargs: slow_answer(threading.Event()))
+    response = client.post('/api/chat/stream', json={'message': 'Hello'}, buffered=False)
+    body = response.response
+    first = next(body)
+    app.lifecycle.drain_timeout = 0
+    app.lifecycle.begin_drain()
+    rest = b''.join(body)
+    response.close()
+    return first + rest
+
+
+def test_cut_stream_gets_an_error_without_a_shared_log(app, client, monkeypatch):
+    body = cut_stream(app, client, monkeypatch).decode()
+    assert 'event: reconnect' not in body
+    last = json.loads(body.strip().rsplit('data: ', 1)[1])
+    assert last['type'] == 'error'
+    assert app.lifecycle.cut == 1
+
+
+def test_cut_stream_gets_reconnect_with_a_shared_log(app, client, monkeypatch, shared_replay):
+    body = cut_stream(app, client, monkeypatch).decode()
+    assert 'event: reconnect' in body
+    app.lifecycle.wait_background(5)
@@ -0,0 +1,19 @@
+"""Queued logging"""
+import json
+import logging
+import os
+
+from app import logging_config
+
+
+def test_forked_worker_writes_to_its_own_pid_file(make_app, tmp_path, monkeypatch):
+    make_app(LOG_FILE=str(tmp_path / 'app.{pid}.log'))
+    logging_config._listener.stop()  # fork leaves the child without this thread
+
+    monkeypatch.setattr(os, 'getpid', lambda: 4242)
+    logging_config._restart_listener_after_fork()
+    logging.getLogger('test').warning('from the worker')
+    logging_config.stop_queue_logging()
+
+    lines = (tmp_path / 'app.4242.log').read_text().splitlines()
+    assert [json.loads(line)['message'] for line in lines] == ['from the worker']
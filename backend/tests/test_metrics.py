@@ -0,0 +1,13 @@
+"""Operator metrics endpoints"""
+import pytest
+
+OPERATOR_METRICS = ['/api/metrics/coalescing', '/api/metrics/streams', '/api/metrics/ingress', '/api/metrics/jobs',
+                    '/api/metrics/prefix-cache', '/api/metrics/profiling']
+
+
+@pytest.mark.parametrize('path', OPERATOR_METRICS)
+def test_operator_metrics_need_the_admin_token(make_app, path):
+    client = make_app(ADMIN_TOKEN='s3cret').test_client()
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={'X-Admin-Token': 'wrong'}).status_code == 401
+    assert client.get(path, headers={'X-Admin-Token': 's3cret'}).status_code == 200
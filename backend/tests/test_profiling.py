@@ -0,0 +1,39 @@
+"""Request profiler triggers and stats"""
+import pytest
+
+
+@pytest.fixture
+def profiled(make_app, tmp_path):
+    app = make_app(PROFILE_TOKEN='profile-secret', PROFILE_DIR=str(tmp_path / 'profiles'), ADMIN_TOKEN='admin')
+    return app, app.test_client()
+
+
+def test_header_token_triggers_a_profile(profiled):
+    app, client = profiled
+    response = client.get('/api/health', headers={'X-Profile': 'profile-secret'})
+    assert 'X-Profile-Id' in response.headers
+    response.close()
+    assert app.profiler.counts['token'] == 1
+
+
+def test_query_token_and_non_ascii_header_do_not(profiled):
+    app, client = profiled
+    assert 'X-Profile-Id' not in client.get('/api/health?profile=profile-secret').headers
+    response = client.get('/api/health', headers={'X-Profile': 'é'})
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert app.profiler.counts['token'] == 0
+
+
+def test_stats_need_the_admin_token_and_hide_the_directory(profiled):
+    _, client = profiled
+    assert client.get('/api/metrics/profiling').status_code == 401
+    response = client.get('/api/metrics/profiling', headers={'X-Admin-Token': 'admin'})
+    assert response.status_code == 200
+    assert 'directory' not in response.get_json()
+
+
+def test_profiler_is_not_installed_under_gevent(make_app):
+    app = make_app(PROFILE_TOKEN='profile-secret', GUNICORN_PRESET='gevent')
+    assert app.profiler is None
+    assert 'X-Profile-Id' not in app.test_client().get('/api/health', headers={'X-Profile': 'profile-secret'}).headers
@@ -0,0 +1,49 @@
+"""Last-Event-ID resumption of chat streams"""
+import json
+
+from app.llm_service import LLMService
+from app.stream_replay import StreamReplayBuffer
+
+
+def answer():
+    for word in ('Hello', 'there', 'friend'):
+        yield {'type': 'chunk', 'content': word}
+    yield {'type': 'done', 'usage': {}}
+
+
+def parse_sse(body):
+    """(id, data) of each event in an SSE body"""
+    events = []
+    for block in body.decode().strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+def test_resume_returns_only_later_events():
+    replay = StreamReplayBuffer()
+    stream_id, events = replay.open(answer())
+    assert [seq for seq, _ in events] == [0, 1, 2, 3]
+
+    _, rest = replay.resume(f'{stream_id}:1')
+    assert [(seq, event.get('content')) for seq, event in rest] == [(2, 'friend'), (3, None)]
+    assert replay.resume(f'{stream_id}:abc') is None
+    assert replay.resume('unknown:1') is None
+
+
+def test_reconnect_with_last_event_id_replays_the_rest(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(LLMService, 'chat_openai', lambda self, messages, **kwargs: calls.append(1) or answer())
+    first = parse_sse(client.post('/api/chat/stream', json={'message': 'Hello'}).data)
+    assert [event['type'] for _, event in first] == ['chunk', 'chunk', 'chunk', 'done']
+
+    last_seen = first[1][0]
+    resumed = parse_sse(client.get('/api/chat/stream/resume', headers={'Last-Event-ID': last_seen}).data)
+    assert resumed == first[2:]
+
+    # EventSource reconnects re-POST with the header; the answer is not requested again
+    again = parse_sse(client.post('/api/chat/stream', json={'message': 'Hello'},
+                                  headers={'Last-Event-ID': last_seen}).data)
+    assert again == first[2:]
+    assert calls == [1]
+    assert client.get('/api/chat/stream/resume', headers={'Last-Event-ID': 'gone:3'}).status_code == 404
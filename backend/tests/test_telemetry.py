@@ -0,0 +1,36 @@
+"""Client error grouping"""
+from app.models import ClientError
+from app.telemetry import fingerprint_error, normalize_stack
+
+CHROME_STACK = """TypeError: Cannot read properties of undefined (reading 'name')
+    at renderServices (https://acme.inboundai365.com/assets/tenant-loader.3f9a2c1b7e.js:12:345)
+    at https://acme.inboundai365.com/assets/app.js?v=42:7:19"""
+
+FIREFOX_STACK = """renderServices@https://bright.inboundai365.com/assets/tenant-loader.8d0e4f6a91.js:14:12
+@https://bright.inboundai365.com/assets/app.js?v=43:9:3"""
+
+
+def test_stack_frames_drop_origin_query_hash_and_location():
+    assert normalize_stack(CHROME_STACK) == ['at renderServices (/assets/tenant-loader.js', 'at /assets/app.js']
+    assert normalize_stack(FIREFOX_STACK) == ['renderServices@/assets/tenant-loader.js', '@/assets/app.js']
+
+
+def test_same_bug_from_different_deploys_groups_together():
+    first = ClientError(type='TypeError', message="Cannot read properties of undefined (reading 'name')",
+                        stack=CHROME_STACK)
+    redeployed = ClientError(type='TypeError', message="Cannot read properties of undefined (reading 'name')",
+                             stack=CHROME_STACK.replace('3f9a2c1b7e', '0b1c2d3e4f').replace(':12:345', ':80:2'))
+    assert fingerprint_error(first) == fingerprint_error(redeployed)
+
+    other_call = ClientError(type='TypeError', message='Failed to load call 1234 (id 0x1f)', stack=None)
+    same_kind = ClientError(type='TypeError', message='Failed to load call 98 (id 0xab)', stack=None)
+    assert fingerprint_error(other_call) == fingerprint_error(same_kind)
+    assert fingerprint_error(first) != fingerprint_error(other_call)
+
+
+def test_stackless_errors_group_by_source():
+    def missing(source):
+        return fingerprint_error(ClientError(type='resource', message='Failed to load', source=source))
+
+    assert missing('https://a.example/img/logo.png?v=1') == missing('https://b.example/img/logo.png?v=2')
+    assert missing('https://a.example/img/logo.png') != missing('https://a.example/img/hero.png')
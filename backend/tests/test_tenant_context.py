@@ -0,0 +1,191 @@
+import threading
+import time
+
+import jwt
+
+from app.generation_profiles import ProfileStore
+from app.llm_service import LLMService
+from app.prompt_registry import build_default_registry
+from app.tenant_context import FileTenantSource, TenantContextCache
+
+CHAT_BODY = {'message': 'Hello'}
+
+
+def make_cache(source, **kwargs):
+    prompts = build_default_registry()
+    profiles = ProfileStore(prompts, modes=('sales', 'receptionist'))
+    return TenantContextCache(source, prompts, profiles, **kwargs)
+
+
+def test_unknown_ids_do_not_evict_known_tenants():
+    cache = make_cache(lambda tenant_id: {'prompt': 'hi'} if tenant_id.startswith('real') else None,
+                       max_size=2, negative_max_size=3)
+    real = [cache.get('real-1'), cache.get('real-2')]
+    for i in range(50):
+        assert cache.get(f'random-{i}') is None
+
+    loads_before = cache.misses
+    assert [cache.get('real-1'), cache.get('real-2')] == real
+    assert cache.misses == loads_before
+    assert cache.stats()['unknown'] == 3
+
+
+def test_unknown_tenant_is_remembered():
+    calls = []
+    cache = make_cache(lambda tenant_id: calls.append(tenant_id))
+    assert cache.get('nope') is None
+    assert cache.get('nope') is None
+    assert calls == ['nope']
+
+
+def test_concurrent_misses_load_once():
+    calls = []
+
+    def slow_source(tenant_id):
+        calls.append(tenant_id)
+        time.sleep(0.2)
+        return {'prompt': 'hi'}
+
+    cache = make_cache(slow_source)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('acme'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['acme']
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert cache.stats()['misses'] == 8
+
+
+def test_failed_load_reaches_every_waiter_and_is_retried():
+    attempts = []
+
+    def flaky(tenant_id):
+        attempts.append(tenant_id)
+        if len(attempts) == 1:
+            raise OSError('disk')
+        return {'prompt': 'hi'}
+
+    cache = make_cache(flaky)
+    try:
+        cache.get('acme')
+    except OSError:
+        pass
+    assert cache.get('acme') is not None
+    assert len(attempts) == 2
+
+
+def test_bearer_token_without_jwt_secret_is_401(client, monkeypatch):
+    monkeypatch.delenv('JWT_SECRET', raising=False)
+    token = jwt.encode({'tenant_id': 'acme'}, 'whatever', algorithm='HS256')
+    response = client.post('/api/chat', json=CHAT_BODY, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+
+
+def test_invalid_bearer_token_is_401(client, monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'secret')
+    token = jwt.encode({'tenant_id': 'acme'}, 'not-the-secret', algorithm='HS256')
+    response = client.post('/api/chat', json=CHAT_BODY, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+
+
+def capture_prompts(monkeypatch):
+    """System prompts sent to the (stubbed) LLM"""
+    prompts = []
+
+    def chat_openai(self, messages, **kwargs):
+        prompts.append(messages[0]['content'])
+        return {'success': True, 'message': 'Hi', 'model': 'stub', 'usage': {}}
+    monkeypatch.setattr(LLMService, 'chat_openai', chat_openai)
+    return prompts
+
+
+def test_tenant_without_data_gets_the_default_persona(client, monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'secret')
+    prompts = capture_prompts(monkeypatch)
+    token = jwt.encode({'tenant_id': 'ghost'}, 'secret', algorithm='HS256')
+    response = client.post('/api/chat', json=CHAT_BODY, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert prompts[0].startswith(build_default_registry().get('sales').text[:100])
+
+
+def test_unknown_tenant_is_404_when_configured(make_app, monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'secret')
+    client = make_app(REJECT_UNKNOWN_TENANTS=True).test_client()
+    token = jwt.encode({'tenant_id': 'ghost'}, 'secret', algorithm='HS256')
+    response = client.post('/api/chat', json=CHAT_BODY, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Unknown tenant'}
+
+
+def test_subdomain_host_selects_tenant(client, write_tenant, monkeypatch):
+    write_tenant('1b2c3d', {'subdomain': 'acme-dental', 'prompt': 'You are the Acme Dental receptionist.'})
+    prompts = capture_prompts(monkeypatch)
+    response = client.post('/api/chat', json=CHAT_BODY, headers={'Host': 'acme-dental.inboundai365.com'})
+    assert response.status_code == 200
+    assert prompts[0].startswith('You are the Acme Dental receptionist.')
+
+
+class LocalBus:
+    """In-process stand-in for RedisTenantInvalidation shared by several caches"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def publish(self, tenant_id):
+        for callback in self.callbacks:
+            callback(tenant_id)
+
+
+def test_invalidate_reaches_every_worker():
+    version = {'n': 1}
+    bus = LocalBus()
+    workers = [make_cache(lambda tenant_id: {'prompt': f"v{version['n']}"}, broadcast=bus) for _ in range(3)]
+    assert all('v1' in worker.get('acme').prompt.text for worker in workers)
+
+    version['n'] = 2
+    workers[0].invalidate('acme')
+    assert all('v2' in worker.get('acme').prompt.text for worker in workers)
+
+
+def test_bootstrap_by_subdomain(client, write_tenant):
+    write_tenant('1b2c3d', {'subdomain': 'acme-dental', 'business_info': {'name': 'Acme Dental'}})
+    response = client.get('/api/subdomains/acme-dental/bootstrap')
+    assert response.status_code == 200
+    assert response.get_json()['tenant_id'] == '1b2c3d'
+    assert client.get('/api/subdomains/1b2c3d/bootstrap').status_code == 404
+    assert client.get('/api/subdomains/unknown/bootstrap').status_code == 404
+
+
+def test_subdomain_lookups_use_an_index(tmp_path, write_tenant, monkeypatch):
+    write_tenant('1b2c3d', {'subdomain': 'acme-dental'})
+    source = FileTenantSource(str(tmp_path / 'tenants'))
+    reads = []
+    read = FileTenantSource.__call__
+    monkeypatch.setattr(FileTenantSource, '__call__',
+                        lambda self, tenant_id: reads.append(tenant_id) or read(self, tenant_id))
+    cache = make_cache(source)
+
+    for i in range(100):
+        assert cache.get_by_subdomain(f'random-{i}') is None
+    assert source.tenant_for_subdomain('acme-dental') == '1b2c3d'
+    assert reads == ['1b2c3d']
+
+    write_tenant('9z8y7x', {'subdomain': 'bright-smiles'})
+    assert source.tenant_for_subdomain('bright-smiles') is None
+    cache.invalidate('9z8y7x')
+    assert source.tenant_for_subdomain('bright-smiles') == '9z8y7x'
+
+
+def test_invalidate_with_non_ascii_token_is_401(make_app):
+    client = make_app(TENANT_ADMIN_TOKEN='secret').test_client()
+    response = client.post('/api/tenants/acme/invalidate', headers={'X-Admin-Token': 'é'})
+    assert response.status_code == 401
+    response = client.post('/api/tenants/acme/invalidate', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
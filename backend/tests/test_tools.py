@@ -0,0 +1,68 @@
+"""CRM tool endpoints: tenant authentication"""
+import jwt
+import pytest
+
+from app.tool_service import TOOLS, tool
+
+CALL = {'tool_name': 'test_whoami', 'parameters': {}}
+
+
+@pytest.fixture(autouse=True)
+def whoami_tool():
+    tool('test_whoami')(lambda tenant_id, parameters, context: {'tenant_id': tenant_id})
+    yield
+    TOOLS.pop('test_whoami', None)
+
+
+@pytest.mark.parametrize('path', ['/api/crm/tools/execute', '/api/crm/tools/batch'])
+def test_bare_tenant_header_is_rejected(client, path):
+    body = CALL if path.endswith('execute') else {'calls': [CALL]}
+    response = client.post(path, json=body, headers={'X-Tenant-ID': 'acme'})
+    assert response.status_code == 401
+
+
+def test_verified_jwt_sets_the_tenant(client, monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'secret')
+    token = jwt.encode({'tenant_id': 'acme'}, 'secret', algorithm='HS256')
+    response = client.post('/api/crm/tools/execute', json=CALL,
+                           headers={'Authorization': f'Bearer {token}', 'X-Tenant-ID': 'other'})
+    assert response.status_code == 200
+    assert response.get_json()['data'] == {'tenant_id': 'acme'}
+
+
+def test_forged_jwt_is_rejected(client, monkeypatch):
+    monkeypatch.setenv('JWT_SECRET', 'secret')
+    token = jwt.encode({'tenant_id': 'acme'}, 'not-the-secret', algorithm='HS256')
+    response = client.post('/api/crm/tools/execute', json=CALL, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+
+
+def test_service_token_allows_tenant_header(make_app):
+    client = make_app(TOOL_SERVICE_TOKEN='service-secret').test_client()
+    response = client.post('/api/crm/tools/batch', json={'calls': [CALL]},
+                           headers={'X-Service-Token': 'service-secret', 'X-Tenant-ID': 'acme'})
+    assert response.status_code == 200
+    assert response.get_json()['results'][0]['data'] == {'tenant_id': 'acme'}
+
+    for supplied in ('wrong', 'é'):
+        response = client.post('/api/crm/tools/batch', json={'calls': [CALL]},
+                               headers={'X-Service-Token': supplied, 'X-Tenant-ID': 'acme'})
+        assert response.status_code == 401
+
+
+def test_server_timing_follows_config(make_app):
+    headers = {'X-Service-Token': 'service-secret', 'X-Tenant-ID': 'acme'}
+    for enabled in (False, True):
+        client = make_app(TOOL_SERVICE_TOKEN='service-secret', SERVER_TIMING=enabled).test_client()
+        response = client.post('/api/crm/tools/batch', json={'calls': [CALL]}, headers=headers)
+        assert ('Server-Timing' in response.headers) is enabled
+
+
+def test_tenant_header_is_not_allowed_cross_origin(make_app):
+    client = make_app(CORS_ORIGINS=['https://widget.example']).test_client()
+    response = client.options('/api/crm/tools/execute', headers={
+        'Origin': 'https://widget.example',
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': 'X-Tenant-ID',
+    })
+    assert 'Access-Control-Allow-Headers' not in response.headers
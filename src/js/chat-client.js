@@ -90,14 +90,14 @@ class ChatClient {
     if (this.csrfToken) {
       headers['X-CSRFToken'] = this.csrfToken;
     }
-    // Add tenant ID from global tenant configuration
+    // Add tenant from global tenant configuration: the token carries it;
+    // a bare X-Tenant-ID only works same-origin (not allowed by CORS)
     if (window.tenantContext) {
       const { tenant_id, api_token } = window.tenantContext;
-      if (tenant_id) {
-        headers['X-Tenant-ID'] = tenant_id;
-      }
       if (api_token) {
         headers['Authorization'] = `Bearer ${api_token}`;
+      } else if (tenant_id) {
+        headers['X-Tenant-ID'] = tenant_id;
       }
     }
     return headers;
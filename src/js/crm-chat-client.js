@@ -107,15 +107,16 @@ class CRMChatClient extends ChatClient {
   }
 
   /**
-   * Get CRM headers with tenant ID
+   * Get CRM headers: the tool endpoints take the tenant from the bearer token
    * @private
    */
   getCRMHeaders() {
     const headers = {
       'Content-Type': 'application/json'
     };
-    if (this.tenantId) {
-      headers['X-Tenant-ID'] = this.tenantId;
+    const apiToken = window.tenantContext && window.tenantContext.api_token;
+    if (apiToken) {
+      headers['Authorization'] = `Bearer ${apiToken}`;
     }
     return headers;
   }
@@ -308,6 +309,54 @@ class CRMChatClient extends ChatClient {
     }
   }
 
+  /**
+   * Run several CRM tools in one request
+   * Read-only tools run concurrently on the server; results keep request order
+   * @param {Array<{tool_name: string, parameters: object}>} calls - Tool invocations
+   * @returns {Promise<Array>} Per-tool results ({tool_name, success, data|error, duration_ms})
+   */
+  async executeTools(calls) {
+    if (!this.hasTenant()) {
+      throw new Error('No tenant configured. Cannot execute tools.');
+    }
+
+    const response = await fetch(`${this.crmApiBase}/tools/batch`, {
+      method: 'POST',
+      headers: this.getCRMHeaders(),
+      body: JSON.stringify({ calls })
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.message || error.error || 'Failed to execute tools');
+    }
+
+    const data = await response.json();
+    return data.results;
+  }
+
+  /**
+   * Load everything the widget needs on open in a single round trip
+   * @param {string} phone - Optional customer phone to look up
+   * @returns {Promise<object>} {services, businessHours, customer}
+   */
+  async loadInitialData(phone = null) {
+    const calls = [
+      { tool_name: 'get_services', parameters: {} },
+      { tool_name: 'get_business_hours', parameters: {} }
+    ];
+    if (phone) {
+      calls.push({ tool_name: 'lookup_customer', parameters: { phone } });
+    }
+
+    const [services, hours, customer] = await this.executeTools(calls);
+    return {
+      services: services.success ? services.data.services || [] : [],
+      businessHours: hours.success ? hours.data.business_hours || [] : [],
+      customer: customer && customer.success ? customer.data : null
+    };
+  }
+
   /**
    * Override sendMessage to include tenant context in system message
    * @param {string} message - User message
@@ -8,13 +8,15 @@ class CRMClient {
      * Initialize CRM Client
      * @param {string} tenantId - Tenant UUID (e.g., '11111111-1111-1111-1111-111111111111')
      * @param {string} apiUrl - Backend API URL (e.g., 'http://localhost:5000')
+     * @param {string} apiToken - JWT whose tenant_id claim is tenantId
      */
-    constructor(tenantId, apiUrl = 'http://localhost:5000') {
+    constructor(tenantId, apiUrl = 'http://localhost:5000', apiToken = null) {
         if (!tenantId) {
             throw new Error('CRMClient requires a valid tenant ID');
         }
 
         this.tenantId = tenantId;
+        this.apiToken = apiToken;
         this.apiUrl = apiUrl.replace(/\/$/, ''); // Remove trailing slash
         this.endpoint = `${this.apiUrl}/api/crm/tools/execute`;
     }
@@ -31,7 +33,7 @@ class CRMClient {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'X-Tenant-ID': this.tenantId
+                    ...(this.apiToken && { 'Authorization': `Bearer ${this.apiToken}` })
                 },
                 body: JSON.stringify({
                     tool_name: toolName,
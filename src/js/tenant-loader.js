@@ -20,6 +20,7 @@
   })();
 
   const API_BASE_URL = `${DEFAULT_API_URL}/subdomain`;
+  const BOOTSTRAP_URL = (subdomain) => `${DEFAULT_API_URL}/subdomains/${encodeURIComponent(subdomain)}/bootstrap`;
   
   // Detect subdomain
   function getSubdomain() {
@@ -675,6 +676,23 @@
     return params.get('admin') === 'true';
   }
   
+  // Fetch config from the subdomain lookup endpoint
+  async function lookupTenantConfig(subdomain) {
+    const response = await fetch(`${API_BASE_URL}/lookup/${subdomain}`);
+
+    if (!response.ok) {
+      throw new Error(`Failed to load configuration: ${response.status}`);
+    }
+
+    const result = await response.json();
+
+    if (!result.success || !result.data) {
+      throw new Error('Invalid tenant configuration response');
+    }
+
+    return result.data;
+  }
+
   // Load tenant configuration
   async function loadTenantConfig(subdomain) {
     try {
@@ -685,20 +703,22 @@
         applyConfiguration(config);
       }
       
-      // Fetch fresh config from new subdomain lookup endpoint
-      const response = await fetch(`${API_BASE_URL}/lookup/${subdomain}`);
-
-      if (!response.ok) {
+      // Fetch the precomputed bootstrap document (branding, media slots,
+      // services, hours, greeting). It carries an ETag, so repeat visits
+      // are answered from the HTTP cache or with a 304.
+      let config;
+      const response = await fetch(BOOTSTRAP_URL(subdomain), {
+        cache: isPreviewMode() ? 'no-cache' : 'default'
+      });
+
+      if (response.ok) {
+        config = await response.json();
+      } else if (response.status === 404) {
+        // Tenant not provisioned on this backend; use the subdomain lookup
+        config = await lookupTenantConfig(subdomain);
+      } else {
         throw new Error(`Failed to load configuration: ${response.status}`);
       }
-
-      const result = await response.json();
-
-      if (!result.success || !result.data) {
-        throw new Error('Invalid tenant configuration response');
-      }
-
-      const config = result.data;
       
       // Cache for 5 minutes
       if (!isPreviewMode()) {